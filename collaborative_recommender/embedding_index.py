@@ -0,0 +1,206 @@
+"""Top-K retrieval over item embeddings.
+
+Items are rows of a dense ``items × dim`` matrix and a query scores every
+item by dot product. The exact search walks the matrix in blocks, keeping
+only the running top ``k`` of each query, so memory stays bounded for large
+catalogs. With ``n_lists`` the rows are also clustered into an inverted file
+(IVF) and a query only scores the rows of its ``n_probe`` closest lists; with
+``quantize`` the rows are stored as ``int8`` codes with one scale per row.
+Both approximate modes trade a little recall for speed or memory.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def _top_k(
+    scores: np.ndarray,
+    ids: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Best ``k`` columns of each row, by decreasing score then id."""
+
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        ids = np.take_along_axis(ids, part, axis=1)
+    order = np.lexsort((ids, -scores))
+    return (
+        np.take_along_axis(scores, order, axis=1),
+        np.take_along_axis(ids, order, axis=1),
+    )
+
+
+class EmbeddingIndex:
+    """Maximum inner product search over item vectors.
+
+    Parameters
+    ----------
+    keys : Iterable[Any]
+        Item of each row of ``vectors``.
+    vectors : np.ndarray
+        ``len(keys) × dim`` item embeddings.
+    n_lists : int
+        Number of IVF clusters; ``0`` searches exhaustively.
+    n_probe : int
+        Lists scored per query in IVF mode.
+    quantize : bool
+        Store ``int8`` codes instead of ``float64`` rows.
+    block_size : int
+        Rows scored at a time by the exhaustive search.
+    seed : int
+        Seed of the IVF clustering.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[Any],
+        vectors: np.ndarray,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        quantize: bool = False,
+        block_size: int = 4096,
+        seed: int = 0,
+    ) -> None:
+        self.keys: List[Any] = list(keys)
+        vectors = np.asarray(vectors, dtype=float)
+        if vectors.ndim != 2 or len(vectors) != len(self.keys):
+            raise ValueError("vectors must have one row per key")
+        self.dim = vectors.shape[1]
+        self.n_probe = n_probe
+        self.block_size = block_size
+
+        self._scale: Optional[np.ndarray] = None
+        if quantize:
+            scale = np.abs(vectors).max(axis=1, initial=0.0) / 127.0
+            scale[scale == 0.0] = 1.0
+            codes = np.rint(vectors / scale[:, None])
+            self._rows = codes.astype(np.int8)
+            self._scale = scale
+        else:
+            self._rows = vectors
+
+        # IVF lists as CSR arrays: rows of list ``c`` are
+        # ``_members[_offsets[c]:_offsets[c + 1]]``
+        self._centroids: Optional[np.ndarray] = None
+        if n_lists and len(vectors) > n_lists:
+            self._build_lists(vectors, n_lists, seed)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+    ) -> List[Tuple[Any, float]]:
+        """Return the ``k`` best ``(item, score)`` pairs for ``query``."""
+
+        return self.search_batch(np.asarray(query)[None, :], k)[0]
+
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int,
+    ) -> List[List[Tuple[Any, float]]]:
+        """Run :meth:`search` for each row of ``queries``.
+
+        Returns
+        -------
+        List[List[Tuple[Any, float]]]
+            For each query, up to ``k`` items by decreasing score; ties
+            keep the index order.
+        """
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=float))
+        k = min(k, len(self.keys))
+        if k <= 0:
+            return [[] for _ in queries]
+        if self._centroids is None:
+            scores, ids = self._exact(queries, k)
+        else:
+            scores, ids = self._probe(queries, k)
+        results = []
+        for row_scores, row_ids in zip(scores.tolist(), ids.tolist()):
+            pairs = zip(row_ids, row_scores)
+            results.append([(self.keys[i], s) for i, s in pairs if i >= 0])
+        return results
+
+    def _score(self, queries: np.ndarray, rows: Any) -> np.ndarray:
+        """Dot products of ``queries`` with ``rows`` (a slice or ids)."""
+
+        scores = queries @ self._rows[rows].T
+        if self._scale is not None:
+            scores *= self._scale[rows]
+        return scores
+
+    def _exact(
+        self,
+        queries: np.ndarray,
+        k: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        best_scores = np.empty((len(queries), 0))
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.keys), self.block_size):
+            end = min(start + self.block_size, len(self.keys))
+            scores = self._score(queries, slice(start, end))
+            ids = np.broadcast_to(np.arange(start, end), scores.shape)
+            best_scores, best_ids = _top_k(
+                np.hstack([best_scores, scores]),
+                np.hstack([best_ids, ids]),
+                k,
+            )
+        return best_scores, best_ids
+
+    def _probe(
+        self,
+        queries: np.ndarray,
+        k: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        n_probe = min(self.n_probe, len(self._centroids))
+        closeness = queries @ self._centroids.T
+        lists = np.argpartition(-closeness, n_probe - 1, axis=1)
+        best_scores = np.full((len(queries), k), -np.inf)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for q, probed in enumerate(lists[:, :n_probe]):
+            spans = zip(self._offsets[probed], self._offsets[probed + 1])
+            members = np.concatenate([self._members[s:e] for s, e in spans])
+            if not len(members):
+                continue
+            scores = self._score(queries[q : q + 1], members)  # noqa: E203
+            found_scores, found_ids = _top_k(scores, members[None, :], k)
+            best_scores[q, : found_scores.shape[1]] = found_scores[0]
+            best_ids[q, : found_ids.shape[1]] = found_ids[0]
+        return best_scores, best_ids
+
+    def _build_lists(
+        self,
+        vectors: np.ndarray,
+        n_lists: int,
+        seed: int,
+        n_iter: int = 10,
+    ) -> None:
+        """Cluster the rows with spherical k-means on the inner product."""
+
+        rng = np.random.default_rng(seed)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = vectors / np.where(norms > 0.0, norms, 1.0)
+        centroids = unit[rng.choice(len(unit), n_lists, replace=False)]
+        for _ in range(n_iter):
+            assign = np.argmax(unit @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, unit)
+            sizes = np.linalg.norm(sums, axis=1, keepdims=True)
+            # empty lists keep their previous centroid
+            moved = sums / np.maximum(sizes, 1e-12)
+            centroids = np.where(sizes > 0.0, moved, centroids)
+        assign = np.argmax(unit @ centroids.T, axis=1)
+
+        self._centroids = centroids
+        self._members = np.argsort(assign, kind="stable")
+        self._offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        sizes = np.bincount(assign, minlength=n_lists)
+        np.cumsum(sizes, out=self._offsets[1:])
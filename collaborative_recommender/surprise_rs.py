@@ -1,38 +1,324 @@
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .embedding_index import EmbeddingIndex
+
+ALGORITHMS = ("mean", "svd")
 
 
 class SurpriseRS:
-    """Minimal recommender used for tests without external dependencies.
+    """Collaborative recommender with a mean baseline and an SVD model.
+
+    It is written on numpy alone, without the ``surprise`` package.
+    ``algorithm="mean"`` scores each item by its mean rating; per-item
+    rating sums and counts are kept in arrays indexed by an interned item
+    id, so :meth:`predict` does not scan the ratings and new ratings are
+    added with :meth:`add_rating` without refitting.
+
+    ``algorithm="svd"`` scores with a biased latent-factor model,
+    ``mu + b_u + b_i + p_u · q_i``, the SVD of the ``surprise`` package,
+    trained with vectorized mini-batch SGD over integer user and item ids.
 
-    The class stores the provided ratings and computes simple mean ratings for
-    each item. It intentionally avoids using the ``surprise`` package.
+    Parameters
+    ----------
+    algorithm : str
+        ``"mean"`` (item mean rating) or ``"svd"``.
+    n_factors : int
+        Number of latent factors of ``"svd"``.
+    n_epochs : int
+        Passes over the ratings in :meth:`fit`.
+    lr : float
+        SGD learning rate.
+    reg : float
+        L2 regularization of biases and factors.
+    batch_size : int
+        Ratings per vectorized SGD step.
+    seed : int, optional
+        Seed of the factor initialization and of the shuffling.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        algorithm: str = "mean",
+        n_factors: int = 50,
+        n_epochs: int = 20,
+        lr: float = 0.005,
+        reg: float = 0.02,
+        batch_size: int = 256,
+        seed: Optional[int] = None,
+    ) -> None:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.n_factors = n_factors
+        self.n_epochs = n_epochs
+        self.lr = lr
+        self.reg = reg
+        self.batch_size = batch_size
+        self._rng = np.random.default_rng(seed)
+
         self.ratings: Dict[Tuple[Any, Any], float] = {}
         self.global_mean: float = 0.0
+        self.item_index: Dict[Any, int] = {}
+        self.user_index: Dict[Any, int] = {}
+        self._item_sum = np.zeros(0)
+        self._item_count = np.zeros(0, dtype=np.int64)
+        self._total = 0.0
+        # latent-factor model, rows indexed by interned ids
+        self._user_bias = np.zeros(0)
+        self._item_bias = np.zeros(0)
+        self._user_factors = np.zeros((0, n_factors))
+        self._item_factors = np.zeros((0, n_factors))
+        self._embedding_index: Optional[EmbeddingIndex] = None
+        self._index_options: Dict[str, Any] = {}
 
     def fit(self, ratings: Dict[Tuple[Any, Any], float]) -> None:
-        """Store ratings and compute a global mean."""
-        self.ratings = ratings
-        if ratings:
-            self.global_mean = sum(ratings.values()) / len(ratings)
-        else:
-            self.global_mean = 0.0
+        """Store ratings and compute a global mean and the item index."""
+        self.ratings = dict(ratings)
+        self.item_index = {}
+        self.user_index = {}
+        ids = np.fromiter(
+            (self._intern(i) for _, i in self.ratings),
+            dtype=np.int64,
+            count=len(self.ratings),
+        )
+        values = np.fromiter(self.ratings.values(), float, len(ids))
+        n_items = len(self.item_index)
+        self._item_sum = np.bincount(ids, weights=values, minlength=n_items)
+        self._item_count = np.bincount(ids, minlength=n_items)
+        self._total = float(values.sum())
+        self._update_mean()
+        self._embedding_index = None
+
+        if self.algorithm == "svd":
+            users = np.fromiter(
+                (self._intern_user(u) for u, _ in self.ratings),
+                dtype=np.int64,
+                count=len(self.ratings),
+            )
+            self._init_factors(len(self.user_index), n_items)
+            step = self.batch_size
+            for _ in range(self.n_epochs):
+                order = self._rng.permutation(len(values))
+                for start in range(0, len(order), step):
+                    batch = order[start : start + step]  # noqa: E203
+                    self._sgd_step(users[batch], ids[batch], values[batch])
+
+    def partial_fit(self, ratings: Dict[Tuple[Any, Any], float]) -> None:
+        """Add or replace ratings without refitting."""
+        for (user_id, item), rating in ratings.items():
+            self.add_rating(user_id, item, rating)
+
+    def add_rating(self, user_id: Any, item: Any, rating: float) -> None:
+        """Add one rating in O(1); a repeated ``(user, item)`` replaces it.
+
+        The ``"svd"`` model also takes one SGD step on the new rating.
+        """
+        idx = self.item_index.get(item)
+        if idx is None:
+            idx = self._intern(item)
+            if idx >= len(self._item_sum):
+                # grow geometrically so insertion stays amortized O(1)
+                size = max(2 * len(self._item_sum), 8)
+                self._item_sum = np.resize(self._item_sum, size)
+                self._item_count = np.resize(self._item_count, size)
+                self._item_sum[idx:] = 0.0
+                self._item_count[idx:] = 0
+        previous = self.ratings.get((user_id, item))
+        if previous is not None:
+            self._item_sum[idx] -= previous
+            self._item_count[idx] -= 1
+            self._total -= previous
+        self.ratings[(user_id, item)] = rating
+        self._item_sum[idx] += rating
+        self._item_count[idx] += 1
+        self._total += rating
+        self._update_mean()
+        self._embedding_index = None
+
+        if self.algorithm == "svd":
+            user = self._intern_user(user_id)
+            self._grow_factors(len(self.user_index), len(self.item_index))
+            self._sgd_step(
+                np.array([user]),
+                np.array([idx]),
+                np.array([float(rating)]),
+            )
 
     def predict(self, user_id: Any, items: List[Any]) -> Dict[Any, float]:
         """Return a simple relevance score for each item."""
-        # mean rating per item considering all users
-        item_sum: Dict[Any, float] = {}
-        item_count: Dict[Any, int] = {}
-        for (u, i), r in self.ratings.items():
-            item_sum[i] = item_sum.get(i, 0.0) + r
-            item_count[i] = item_count.get(i, 0) + 1
-
+        if self.algorithm == "svd":
+            scores = self.predict_batch([user_id], items)[0]
+            return dict(zip(items, scores.tolist()))
         relevance: Dict[Any, float] = {}
         for item in items:
-            if item in item_sum:
-                relevance[item] = item_sum[item] / item_count[item]
+            idx = self.item_index.get(item)
+            if idx is not None and self._item_count[idx]:
+                mean = self._item_sum[idx] / self._item_count[idx]
+                relevance[item] = float(mean)
             else:
                 relevance[item] = self.global_mean
         return relevance
+
+    def predict_batch(
+        self,
+        users: Iterable[Any],
+        items: Iterable[Any],
+    ) -> np.ndarray:
+        """Score every ``(user, item)`` pair in one call.
+
+        Returns
+        -------
+        np.ndarray
+            ``len(users) × len(items)`` matrix of predicted ratings.
+            Unknown users and items fall back to the biases that are known
+            (the global mean when none is).
+        """
+        users, items = list(users), list(items)
+        if self.algorithm == "mean" or not self.ratings:
+            relevance = self.predict(None, items) if self.ratings else {}
+            means = [relevance.get(i, self.global_mean) for i in items]
+            return np.tile(np.asarray(means, dtype=float), (len(users), 1))
+
+        item_rows = self._lookup(self.item_index, items)
+        user_rows = self._lookup(self.user_index, users)
+        known_items, known_users = item_rows >= 0, user_rows >= 0
+        item_rows[~known_items] = 0
+        user_rows[~known_users] = 0
+        q = self._item_factors[item_rows] * known_items[:, None]
+        p = self._user_factors[user_rows] * known_users[:, None]
+        bi = np.where(known_items, self._item_bias[item_rows], 0.0)
+        bu = np.where(known_users, self._user_bias[user_rows], 0.0)
+        return self.global_mean + bu[:, None] + bi[None, :] + p @ q.T
+
+    def item_embeddings(self) -> Tuple[List[Any], np.ndarray]:
+        """Item vectors ranked by their dot product with a user vector.
+
+        The dot product with :meth:`user_embedding` orders the items as
+        :meth:`predict` does.
+
+        For ``"svd"`` an item is ``[b_i, q_i]`` and a user ``[1, p_u]``,
+        which drops the per-user constant ``mu + b_u``; for ``"mean"`` it
+        is the item mean against ``[1]``.
+        """
+        items = list(self.item_index)
+        n = len(items)
+        if self.algorithm == "svd":
+            biases, factors = self._item_bias[:n], self._item_factors[:n]
+            vectors = np.column_stack([biases, factors])
+        else:
+            counts = np.maximum(self._item_count[:n], 1)
+            vectors = (self._item_sum[:n] / counts)[:, None]
+        return items, vectors
+
+    def user_embedding(self, user_id: Any) -> np.ndarray:
+        """Query vector of ``user_id``, see :meth:`item_embeddings`."""
+        if self.algorithm != "svd":
+            return np.ones(1)
+        row = self.user_index.get(user_id)
+        if row is None:
+            factors = np.zeros(self.n_factors)
+        else:
+            factors = self._user_factors[row]
+        return np.concatenate([[1.0], factors])
+
+    def embedding_index(self, **kwargs: Any) -> EmbeddingIndex:
+        """Top-K index over :meth:`item_embeddings`.
+
+        The index is kept until the ratings or ``kwargs`` change;
+        ``kwargs`` (e.g. ``n_lists`` for the approximate IVF mode) are
+        passed to :class:`EmbeddingIndex`.
+        """
+        if self._embedding_index is None or kwargs != self._index_options:
+            index = EmbeddingIndex(*self.item_embeddings(), **kwargs)
+            self._embedding_index, self._index_options = index, kwargs
+        return self._embedding_index
+
+    def current_index(self) -> EmbeddingIndex:
+        """The index :meth:`top_k` searches.
+
+        That is the index last built by :meth:`embedding_index`, whatever
+        its options, or a new exact one.
+        """
+        if self._embedding_index is None:
+            return self.embedding_index()
+        return self._embedding_index
+
+    def top_k(self, user_id: Any, k: int) -> List[Any]:
+        """The ``k`` items with the highest predicted rating.
+
+        See :meth:`current_index` for the index used.
+        """
+        index = self.current_index()
+        found = index.search(self.user_embedding(user_id), k)
+        return [item for item, _ in found]
+
+    def _sgd_step(
+        self,
+        users: np.ndarray,
+        items: np.ndarray,
+        values: np.ndarray,
+    ) -> None:
+        """One vectorized SGD update on a batch of ratings."""
+        p = self._user_factors[users]
+        q = self._item_factors[items]
+        bu = self._user_bias[users]
+        bi = self._item_bias[items]
+        err = values - (self.global_mean + bu + bi + (p * q).sum(axis=1))
+
+        lr, reg = self.lr, self.reg
+        # ``np.add.at`` accumulates repeated users/items within the batch
+        np.add.at(self._user_bias, users, lr * (err - reg * bu))
+        np.add.at(self._item_bias, items, lr * (err - reg * bi))
+        np.add.at(self._user_factors, users, lr * (err[:, None] * q - reg * p))
+        np.add.at(self._item_factors, items, lr * (err[:, None] * p - reg * q))
+
+    def _init_factors(self, n_users: int, n_items: int) -> None:
+        self._user_bias = np.zeros(n_users)
+        self._item_bias = np.zeros(n_items)
+        shape = (n_users, self.n_factors)
+        self._user_factors = self._rng.normal(0.0, 0.1, shape)
+        shape = (n_items, self.n_factors)
+        self._item_factors = self._rng.normal(0.0, 0.1, shape)
+
+    def _grow_factors(self, n_users: int, n_items: int) -> None:
+        """Make room for newly interned users and items."""
+        if n_users > len(self._user_bias):
+            self._user_bias, self._user_factors = self._grown(
+                self._user_bias, self._user_factors, n_users
+            )
+        if n_items > len(self._item_bias):
+            self._item_bias, self._item_factors = self._grown(
+                self._item_bias, self._item_factors, n_items
+            )
+
+    def _grown(
+        self,
+        bias: np.ndarray,
+        factors: np.ndarray,
+        n: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # grow geometrically so online insertion stays amortized O(1)
+        extra = max(2 * len(bias), n, 8) - len(bias)
+        new_factors = self._rng.normal(0.0, 0.1, (extra, self.n_factors))
+        return (
+            np.concatenate([bias, np.zeros(extra)]),
+            np.vstack([factors, new_factors]),
+        )
+
+    @staticmethod
+    def _lookup(index: Dict[Any, int], keys: Iterable[Any]) -> np.ndarray:
+        return np.array([index.get(k, -1) for k in keys], dtype=np.int64)
+
+    def _intern(self, item: Any) -> int:
+        return self.item_index.setdefault(item, len(self.item_index))
+
+    def _intern_user(self, user_id: Any) -> int:
+        return self.user_index.setdefault(user_id, len(self.user_index))
+
+    def _update_mean(self) -> None:
+        if self.ratings:
+            self.global_mean = self._total / len(self.ratings)
+        else:
+            self.global_mean = 0.0
@@ -1,13 +1,61 @@
-from rdflib import Graph
+from rdflib import Graph, Namespace, URIRef
 from typing import List
 
+from ontology.attribute_index import attribute_index
+from ontology.queries import register, run
 
-def query_by_preference(rdf_graph: Graph, user_uri: str) -> List[str]:
+AV = Namespace("http://amazingvideo.org#")
+# user preference property -> movie property it matches
+PREFERENCES = {
+    AV.prefereTematica: AV.tematica,
+    AV.prefereAtor: AV.temAtor,
+    AV.prefereDiretor: AV.temDiretor,
+}
+
+QUERY = "query_by_preference"
+
+register(
+    QUERY,
+    """
+    PREFIX : <http://amazingvideo.org#>
+
+    SELECT DISTINCT ?filme WHERE {
+      { ?user  :prefereTematica ?t .
+        ?filme :tematica        ?t . }
+      UNION
+      { ?user  :prefereAtor     ?a .
+        ?filme :temAtor         ?a . }
+      UNION
+      { ?user  :prefereDiretor  ?d .
+        ?filme :temDiretor      ?d . }
+    }
+    """,
+)
+
+
+def preference_index(rdf_graph: Graph):
+    """The :class:`AttributeIndex` :func:`query_by_preference` reads.
+
+    It is built on first use; callers sharing the graph across threads
+    build it beforehand.
+    """
+    properties = set(PREFERENCES) | set(PREFERENCES.values())
+    return attribute_index(rdf_graph, properties)
+
+
+def query_by_preference(
+    rdf_graph: Graph,
+    user_uri: str,
+    method: str = "index",
+) -> List[str]:
     """Retrieve movies that match a user's declared preferences.
 
-    The SPARQL query checks for preferred genres, actors and directors and
+    The lookup checks for preferred genres, actors and directors and
     returns unique movie identifiers that satisfy at least one of these
-    criteria.
+    criteria. By default it is answered from an :class:`AttributeIndex`
+    of the graph, movies matching more preferences first; ``"sparql"``
+    runs the equivalent prepared query with ``user_uri`` bound as
+    ``?user``, in no particular order.
 
     Parameters
     ----------
@@ -15,31 +63,32 @@ def query_by_preference(rdf_graph: Graph, user_uri: str) -> List[str]:
         Ontology graph produced by ``build_ontology_graph``.
     user_uri : str
         Full URI of the user.
+    method : str
+        ``"index"`` or ``"sparql"``.
 
     Returns
     -------
     List[str]
         Local names of matching movies without duplicates.
-    """
-    sparql = f"""
-    PREFIX : <http://amazingvideo.org#>
 
-    SELECT DISTINCT ?filme WHERE {{
-      {{ <{user_uri}> :prefereTematica ?t .
-         ?filme        :tematica       ?t . }}
-      UNION
-      {{ <{user_uri}> :prefereAtor    ?a .
-         ?filme        :temAtor        ?a . }}
-      UNION
-      {{ <{user_uri}> :prefereDiretor ?d .
-         ?filme        :temDiretor     ?d . }}
-    }}
+    Raises
+    ------
+    ValueError
+        If ``method`` is unknown.
     """
+    user = URIRef(user_uri)
+    if method == "index":
+        index = preference_index(rdf_graph)
+        wanted = PREFERENCES.items()
+        pairs = [(index.values(user, pref), p) for pref, p in wanted]
+        matches = [filme for filme, _ in index.shared(pairs)]
+    elif method == "sparql":
+        matches = [row[0] for row in run(rdf_graph, QUERY, user=user)]
+    else:
+        raise ValueError(f"Unknown method: {method}")
 
-    results = rdf_graph.query(sparql)
     filmes: List[str] = []
-    for row in results:
-        filme_uri = row[0]
+    for filme_uri in matches:
         filmes.append(str(filme_uri).split("#")[-1])
 
     return filmes
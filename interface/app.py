@@ -1,29 +1,51 @@
 from __future__ import annotations
 
+import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from typing import List, Tuple, Dict, Optional
 
 import pandas as pd
-import requests
-from flask import Flask, render_template, request
+from flask import Flask, jsonify, render_template, request
 from rdflib import Graph, URIRef
 
-from ontology.build_ontology import build_ontology_graph
+from interface.tasks import ResultCache
+from metadata.cache import MetadataCache
+from metadata.search import SearchIndex
+from metadata.service import WIKIDATA_URL, Metadata, MetadataService, qid
+from ontology.graph_cache import GRAPH_CACHE
 from pipeline.generate_logical_recommendations import recommend_logical
 from pipeline.generate_recommendations import generate_recommendations
 
 DATA_PATH = "data/raw/serendipity_films_full.ttl.gz"
-WIKIDATA_URL = "https://query.wikidata.org/sparql"
-PLACEHOLDER_IMG = "https://placehold.co/200x300?text=Poster"
+PER_PAGE = 40
+MAX_PER_PAGE = 200
+WORKERS = 2
+# tasks that may run for minutes (the serendipity pipeline)
+SLOW_TASKS = frozenset({"serendipitous"})
+# seconds an API request waits for its result before answering 202
+API_WAIT = 20.0
 
 app = Flask(__name__)
 
 graph: Graph | None = None
 catalog_df: pd.DataFrame | None = None
+search_index: SearchIndex | None = None
+# details and recommendations run here, off the request threads
+results = ResultCache(ThreadPoolExecutor(max_workers=WORKERS))
+# slow tasks get their own worker, so fast lookups never queue behind them;
+# the pipeline computes novelty one call at a time anyway
+slow_results = ResultCache(ThreadPoolExecutor(max_workers=1))
+# answers are kept on disk, so page views after a restart stay offline
+metadata = MetadataService(WIKIDATA_URL, cache=MetadataCache())
 
 
 def load_graph(path: str = DATA_PATH) -> Graph:
-    """Load the inferred ontology graph."""
-    return build_ontology_graph(path)
+    """Inferred ontology graph, the one the pipelines use.
+
+    :data:`GRAPH_CACHE` holds a single copy per file, so the interface and
+    the recommenders share it.
+    """
+    return GRAPH_CACHE.get(path, "inferred")
 
 
 def load_catalog() -> pd.DataFrame:
@@ -36,151 +58,216 @@ def load_catalog() -> pd.DataFrame:
     return pd.DataFrame({"uri": uris})
 
 
+def _search_text(uri: str, meta: Optional[Metadata]) -> str:
+    """Label and identifier of a film, as the search index sees them."""
+    name = re.split(r"[/#]", uri)[-1]
+    if meta is None or meta.label == qid(uri):
+        return name
+    return f"{meta.label} {name}"
+
+
+def build_search_index(uris: List[str]) -> SearchIndex:
+    """Index the catalog by the labels already in the metadata cache.
+
+    Films without a cached label are found by their identifier until a
+    page showing them resolves it (see :func:`index`).
+    """
+    cached = {}
+    if metadata.cache is not None:
+        cached = metadata.cache.get_many(qid(u) for u in uris)
+    return SearchIndex(_search_text(u, cached.get(qid(u))) for u in uris)
+
+
 def fetch_label_year(uri: str) -> Tuple[str, Optional[str]]:
     """Get label and year from Wikidata."""
-    qid = uri.split("/")[-1]
-    query = f"""
-    SELECT ?l ?date WHERE {{
-      OPTIONAL {{ wd:{qid} rdfs:label ?l FILTER(lang(?l)='en') }}
-      OPTIONAL {{ wd:{qid} wdt:P577 ?date }}
-    }} LIMIT 1
-    """
-    try:
-        resp = requests.get(
-            WIKIDATA_URL,
-            params={"query": query},
-            headers={"Accept": "application/sparql-results+json"},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        bindings = resp.json().get("results", {}).get("bindings", [])
-        if bindings:
-            b = bindings[0]
-            label = b.get("l", {}).get("value", qid)
-            date = b.get("date", {}).get("value")
-            year = date[:4] if date else None
-            return label, year
-    except Exception:
-        pass
-    return qid, None
+    return metadata.label_year(uri)
 
 
 def fetch_image(uri: str) -> str:
     """Return the image URL (P18) for a Wikidata item."""
-    qid = uri.split("/")[-1]
-    query = f"SELECT ?img WHERE {{ wd:{qid} wdt:P18 ?img }} LIMIT 1"
-    try:
-        resp = requests.get(
-            WIKIDATA_URL,
-            params={"query": query},
-            headers={"Accept": "application/sparql-results+json"},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        results = resp.json().get("results", {}).get("bindings", [])
-        if results:
-            return results[0]["img"]["value"]
-    except Exception:
-        pass
-    return PLACEHOLDER_IMG
+    return metadata.image(uri)
 
 
 def get_details(graph: Graph, uri: str) -> Dict[str, List[str]]:
-    """Collect genres, directors and cast from the local graph."""
+    """Collect genres, directors and cast from the local graph.
+
+    Their labels are resolved together, in as few requests as possible.
+    """
     base = "http://www.wikidata.org/prop/direct/"
-    p_genre = URIRef(base + "P136")
-    p_director = URIRef(base + "P57")
-    p_cast = URIRef(base + "P161")
-
-    # fmt: off
-    genres = [
-        fetch_label_year(str(o))[0]
-        for o in graph.objects(URIRef(uri), p_genre)
-    ]
-    directors = [
-        fetch_label_year(str(o))[0]
-        for o in graph.objects(URIRef(uri), p_director)
-    ]
-    cast = [
-        fetch_label_year(str(o))[0]
-        for o in graph.objects(URIRef(uri), p_cast)
-    ]
-    # fmt: on
-    return {"genres": genres, "directors": directors, "cast": cast}
+    props = {"genres": "P136", "directors": "P57", "cast": "P161"}
+    subject = URIRef(uri)
+    found = {
+        key: [str(o) for o in graph.objects(subject, URIRef(base + p))]
+        for key, p in props.items()
+    }
+    labels = metadata.fetch(u for uris in found.values() for u in uris)
+    items = found.items()
+    return {key: [labels[u].label for u in uris] for key, uris in items}
 
 
-@app.route("/")
-def index():
+def _cards(uris: List[str], meta: Dict[str, Metadata]):
+    """``(uri, image, label)`` of each film, as the template expects."""
+    return [(u, meta[u].image, meta[u].label) for u in uris]
+
+
+def _page_args() -> Tuple[str, int, int]:
+    """``q``, ``page`` and ``per_page`` of the request, within bounds."""
     q = request.args.get("q", "")
-    selected = request.args.get("selected")
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = request.args.get("per_page", PER_PAGE, type=int)
+    return q, page, min(max(per_page, 1), MAX_PER_PAGE)
+
+
+def catalog_page(q: str, page: int, per_page: int):
+    """One page of the films matching ``q``.
+
+    Returns
+    -------
+    Tuple[List[int], List[str], int, int, int]
+        Catalog rows and URIs of the page, the page number (clamped to the
+        last page), the number of pages and the number of matches.
+    """
+    docs = search_index.search(q)
+    total = len(docs)
+    pages = max((total + per_page - 1) // per_page, 1)
+    page = min(page, pages)
+    docs = docs[(page - 1) * per_page : page * per_page]  # noqa: E203
+    uris = catalog_df["uri"].iloc[docs].tolist()
+    return docs, uris, page, pages, total
+
+
+def _learn_labels(docs: List[int], uris: List[str], meta) -> None:
+    """Make the labels resolved for a page searchable."""
+    texts = {d: _search_text(u, meta[u]) for d, u in zip(docs, uris)}
+    search_index.update(texts)
+
+
+def _items(uris: List[str], meta: Dict[str, Metadata]) -> List[dict]:
+    """JSON form of the films in ``uris``."""
+    return [
+        {
+            "uri": u,
+            "label": meta[u].label,
+            "year": meta[u].year,
+            "image": meta[u].image,
+        }
+        for u in uris
+    ]
+
+
+@app.route("/api/catalog")
+def api_catalog():
+    """Paginated search results as JSON, with each film's metadata."""
+    q, page, per_page = _page_args()
+    docs, uris, page, pages, total = catalog_page(q, page, per_page)
+    meta = metadata.fetch(uris)
+    _learn_labels(docs, uris, meta)
+    items = _items(uris, meta)
+    return jsonify(page=page, pages=pages, total=total, items=items)
+
+
+def film_details(uri: str) -> dict:
+    """Title, year, poster, genres, directors and cast of a film."""
+    details = get_details(graph, uri)
+    meta = metadata.fetch([uri])[uri]
+    return {
+        "uri": uri,
+        "title": meta.label,
+        "year": meta.year,
+        "image": meta.image,
+        **details,
+    }
+
+
+def logical_recommendations(uri: str) -> List[dict]:
+    """Films sharing the most attributes with ``uri``."""
+    # served from the neighbour table when it was built offline
+    uris = recommend_logical(uri, DATA_PATH, method="table")
+    return _items(uris, metadata.fetch(uris))
+
+
+def serendipitous_recommendations(uri: str) -> List[dict]:
+    """Novel films for a user who liked ``uri``."""
+    serendip = generate_recommendations(
+        "user",
+        {("user", URIRef(uri)): 5.0},
+        DATA_PATH,
+        top_n=5,
+        alpha=1.0,
+        beta=0.0,
+    )
+    uris = [f"http://www.wikidata.org/entity/{name}" for name in serendip]
+    return _items(uris, metadata.fetch(uris))
+
+
+TASKS = {
+    "details": film_details,
+    "logical": logical_recommendations,
+    "serendipitous": serendipitous_recommendations,
+}
 
-    filtered = catalog_df
-    if q:
-        filtered = catalog_df[catalog_df["uri"].str.contains(q, case=False)]
 
-    uris = filtered["uri"].tolist()
-    posters = [(u, fetch_image(u), fetch_label_year(u)[0]) for u in uris]
+def _submit(kind: str, uri: str):
+    cache = slow_results if kind in SLOW_TASKS else results
+    return cache.submit((kind, uri), TASKS[kind], uri)
 
-    title = year = None
-    details = {"genres": [], "directors": [], "cast": []}
-    recs_log: List[Tuple[str, str, str]] = []
-    recs_ser: List[Tuple[str, str, str]] = []
+
+@app.route("/api/<kind>")
+def api_film(kind: str):
+    """Details or recommendations of the film ``?uri=``, as JSON.
+
+    The result is computed on the worker pool and kept per film. If it is
+    not ready within ``API_WAIT`` seconds the answer is ``202`` and the
+    client asks again.
+    """
+    uri = request.args.get("uri")
+    if kind not in TASKS:
+        return jsonify(error=f"unknown resource: {kind}"), 404
+    if not uri:
+        return jsonify(error="missing uri"), 400
+    try:
+        return jsonify(_submit(kind, uri).result(timeout=API_WAIT))
+    except TimeoutError:
+        return jsonify(status="pending"), 202
+    except Exception:
+        # the details stay in the server log, not in the response
+        app.logger.exception("%s of %s failed", kind, uri)
+        return jsonify(error="internal error"), 500
+
+
+@app.route("/")
+def index():
+    q, page, per_page = _page_args()
+    selected = request.args.get("selected")
+    docs, uris, page, pages, _ = catalog_page(q, page, per_page)
 
     if selected:
-        title, year = fetch_label_year(selected)
-        details = get_details(graph, selected)
-
-        logical = recommend_logical(selected, DATA_PATH)
-        # fmt: off
-        recs_log = [
-            (u, fetch_image(u), fetch_label_year(u)[0])
-            for u in logical
-        ]
-        # fmt: on
-
-        serendip = generate_recommendations(
-            "user",
-            {("user", URIRef(selected)): 5.0},
-            DATA_PATH,
-            top_n=5,
-            alpha=1.0,
-            beta=0.0,
-        )
-        # fmt: off
-        ser_uris = [
-            f"http://www.wikidata.org/entity/{qid}"
-            for qid in serendip
-        ]
-        # fmt: on
-        # fmt: off
-        recs_ser = [
-            (u, fetch_image(u), fetch_label_year(u)[0])
-            for u in ser_uris
-        ]
-        # fmt: on
+        # started now, fetched by the page from the JSON endpoints
+        for kind in TASKS:
+            _submit(kind, selected)
+
+    meta = metadata.fetch(uris)
+    _learn_labels(docs, uris, meta)
 
     return render_template(
         "index.html",
-        posters=posters,
+        posters=_cards(uris, meta),
         q=q,
+        page=page,
+        pages=pages,
+        per_page=per_page,
         selected=selected,
-        title=title,
-        year=year,
-        genres=details["genres"],
-        directors=details["directors"],
-        cast=details["cast"],
-        recs_log=recs_log,
-        recs_ser=recs_ser,
     )
 
 
 @app.before_request
 def init_graph() -> None:
     """Load graph and catalog only on the first request."""
-    global graph, catalog_df
+    global graph, catalog_df, search_index
     if graph is None:
         graph = load_graph()
         catalog_df = load_catalog()
+        search_index = build_search_index(catalog_df["uri"].tolist())
 
 
 def create_flask_app() -> Flask:
@@ -3,25 +3,26 @@ from typing import List, Tuple, Dict
 import json
 
 import pandas as pd
-import requests
 import streamlit as st
 from rdflib import Graph, URIRef
 
-from ontology.build_ontology import build_ontology_graph
+from metadata.cache import MetadataCache
+from metadata.service import WIKIDATA_URL, Metadata, MetadataService
+from ontology.graph_cache import GRAPH_CACHE
 from pipeline.generate_logical_recommendations import recommend_logical
 
 DATA_PATH = "data/raw/serendipity_films_full.ttl.gz"
-WIKIDATA_URL = "https://query.wikidata.org/sparql"
-PLACEHOLDER_IMG = "https://placehold.co/200x300?text=Poster"
 METADATA_PATH = "data/metadata.json"
 USERS_PATH = "data/demo_users.json"
 
 
-@st.cache_resource
 def load_graph(path: str = DATA_PATH) -> Graph:
-    """Load the inferred ontology graph."""
+    """Inferred ontology graph, shared with the pipelines.
+
+    :data:`GRAPH_CACHE` holds one copy per file, reloaded when it changes.
+    """
 
-    return build_ontology_graph(path)
+    return GRAPH_CACHE.get(path, "inferred")
 
 
 @st.cache_data
@@ -61,7 +62,19 @@ def load_demo_users(path: str = USERS_PATH) -> Dict[str, List[str]]:
         return {}
 
 
-@st.cache_data(show_spinner=False)
+@st.cache_resource
+def metadata_service() -> MetadataService:
+    """Shared Wikidata client, backed by the persistent metadata cache."""
+
+    return MetadataService(WIKIDATA_URL, cache=MetadataCache())
+
+
+def fetch_metadata(uris: Tuple[str, ...]) -> Dict[str, Metadata]:
+    """Metadata of ``uris``, from the cache or in batched requests."""
+
+    return metadata_service().fetch(uris)
+
+
 def fetch_label_year(uri: str) -> Tuple[str, str | None]:
     """Get label and year from local cache or Wikidata."""
 
@@ -69,78 +82,23 @@ def fetch_label_year(uri: str) -> Tuple[str, str | None]:
     if qid in _metadata:
         meta = _metadata[qid]
         return meta.get("label", qid), meta.get("year")
-
-    query = f"""
-    SELECT ?l ?date WHERE {{
-      OPTIONAL {{ wd:{qid} rdfs:label ?l FILTER(lang(?l)='en') }}
-      OPTIONAL {{ wd:{qid} wdt:P577 ?date }}
-    }} LIMIT 1
-    """
-    try:
-        resp = requests.get(
-            WIKIDATA_URL,
-            params={"query": query},
-            headers={"Accept": "application/sparql-results+json"},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        bindings = resp.json().get("results", {}).get("bindings", [])
-        if bindings:
-            b = bindings[0]
-            label = b.get("l", {}).get("value", qid)
-            date = b.get("date", {}).get("value")
-            year = date[:4] if date else None
-            return label, year
-    except Exception:
-        pass
-    return qid, None
-
-
-@st.cache_data(show_spinner=False)
-def fetch_image(uri: str) -> str:
-    """Return the image URL (P18) from Wikidata."""
-
-    qid = uri.split("/")[-1]
-    query = f"SELECT ?img WHERE {{ wd:{qid} wdt:P18 ?img }} LIMIT 1"
-    try:
-        resp = requests.get(
-            WIKIDATA_URL,
-            params={"query": query},
-            headers={"Accept": "application/sparql-results+json"},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        results = resp.json().get("results", {}).get("bindings", [])
-        if results:
-            return results[0]["img"]["value"]
-    except Exception:
-        pass
-    return PLACEHOLDER_IMG
+    meta = fetch_metadata((uri,))[uri]
+    return meta.label, meta.year
 
 
 def get_details(graph: Graph, uri: str) -> dict[str, List[str]]:
     """Collect genres, directors and cast from the local graph."""
 
     base = "http://www.wikidata.org/prop/direct/"
-    p_genre = URIRef(base + "P136")
-    p_director = URIRef(base + "P57")
-    p_cast = URIRef(base + "P161")
-
-    # fmt: off
-    genres = [
-        fetch_label_year(str(o))[0]
-        for o in graph.objects(URIRef(uri), p_genre)
-    ]
-    directors = [
-        fetch_label_year(str(o))[0]
-        for o in graph.objects(URIRef(uri), p_director)
-    ]
-    cast = [
-        fetch_label_year(str(o))[0]
-        for o in graph.objects(URIRef(uri), p_cast)
-    ]
-    # fmt: on
-    return {"genres": genres, "directors": directors, "cast": cast}
+    props = {"genres": "P136", "directors": "P57", "cast": "P161"}
+    subject = URIRef(uri)
+    found = {
+        key: [str(o) for o in graph.objects(subject, URIRef(base + p))]
+        for key, p in props.items()
+    }
+    labels = fetch_metadata(tuple(u for us in found.values() for u in us))
+    items = found.items()
+    return {key: [labels[u].label for u in uris] for key, uris in items}
 
 
 # --- Configuração inicial ---
@@ -174,6 +132,7 @@ if selected:
     st.subheader("You might also like…")
     recs_log = recommend_logical(selected, DATA_PATH, rdf_graph=_graph)
     cols = st.columns(len(recs_log))
+    meta = fetch_metadata(tuple(recs_log))
     for col, uri in zip(cols, recs_log):
-        img = fetch_image(uri)
-        col.image(img, caption=fetch_label_year(uri)[0], use_column_width=True)
+        caption = meta[uri].label
+        col.image(meta[uri].image, caption=caption, use_column_width=True)
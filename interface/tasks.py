@@ -0,0 +1,73 @@
+"""Background computation of per-film results for the web interface.
+
+The details and recommendations of a film take from milliseconds (a table
+lookup) to seconds (the serendipity pipeline). :class:`ResultCache` runs
+them on a worker pool and keeps the futures by key, so the page is served
+at once, every request for the same film shares one computation, and later
+requests get the finished result.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Hashable
+
+
+class ResultCache:
+    """Futures of recent computations, least recently used evicted first.
+
+    Parameters
+    ----------
+    executor : Executor
+        Pool running the computations.
+    max_items : int
+        Results kept, finished or not.
+    """
+
+    def __init__(self, executor: Executor, max_items: int = 1024) -> None:
+        self.executor = executor
+        self.max_items = max_items
+        self._futures: "OrderedDict[Hashable, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._futures
+
+    def submit(
+        self,
+        key: Hashable,
+        fn: Callable[..., Any],
+        *args: Any,
+    ) -> Future:
+        """Future of ``fn(*args)``, started unless ``key`` is known.
+
+        A computation that raised is forgotten once done, so the next
+        request for ``key`` tries again.
+        """
+
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self._futures.move_to_end(key)
+                return future
+            future = self.executor.submit(fn, *args)
+            self._futures[key] = future
+            while len(self._futures) > self.max_items:
+                self._futures.popitem(last=False)
+        future.add_done_callback(lambda f: self._forget_failed(key, f))
+        return future
+
+    def clear(self) -> None:
+        with self._lock:
+            self._futures.clear()
+
+    def _forget_failed(self, key: Hashable, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
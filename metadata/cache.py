@@ -0,0 +1,190 @@
+"""Two-tier cache of item metadata: an in-process LRU over SQLite.
+
+Labels, years and images of Wikidata items hardly change, so
+:class:`MetadataCache` keeps them for ``ttl`` seconds in a SQLite file
+shared by the interfaces and ``scripts/fetch_metadata.py`` (and across
+restarts), with the most recently used entries also held in memory. Items
+the endpoint knows nothing about, or whose lookup failed, are cached as
+misses for the shorter ``negative_ttl``, so a broken item or an endpoint
+outage does not cost a request on every page view.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from .service import Metadata
+
+DEFAULT_PATH = "data/.cache/metadata.sqlite"
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    qid TEXT PRIMARY KEY,
+    label TEXT,
+    year TEXT,
+    image TEXT,
+    expires REAL NOT NULL
+)
+"""
+# SQLite limits the number of parameters of a statement
+_CHUNK = 500
+
+
+class MetadataCache:
+    """Metadata by QID, ``None`` marking a cached miss.
+
+    Parameters
+    ----------
+    path : str, optional
+        SQLite file; ``None`` keeps only the in-memory tier.
+    ttl : float
+        Seconds an answer is kept.
+    negative_ttl : float
+        Seconds a miss is kept.
+    max_items : int
+        Entries held in memory.
+    clock : Callable[[], float]
+        Source of the current time, in seconds.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_PATH,
+        ttl: float = 30 * DAY,
+        negative_ttl: float = HOUR,
+        max_items: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_items = max_items
+        self.clock = clock
+        self._memory: "OrderedDict[str, Tuple[float, Optional[Metadata]]]"
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = self.misses = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the file on first use, so creating a cache is free."""
+
+        if self._db is None and self.path is not None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            # several processes may read while one writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get_many(self, qids: Iterable[str]) -> Dict[str, Optional[Metadata]]:
+        """Unexpired entries of ``qids``; absent keys are not cached."""
+
+        now = self.clock()
+        found: Dict[str, Optional[Metadata]] = {}
+        qids = list(dict.fromkeys(qids))
+        with self._lock:
+            rest = []
+            for q in qids:
+                cached = self._memory.get(q)
+                if cached is not None and cached[0] > now:
+                    self._memory.move_to_end(q)
+                    found[q] = cached[1]
+                else:
+                    rest.append(q)
+            db = self._connect() if rest else None
+            if db is not None:
+                for q, expires, meta in self._select(db, rest, now):
+                    found[q] = meta
+                    self._remember(q, expires, meta)
+            self.hits += len(found)
+            self.misses += len(qids) - len(found)
+        return found
+
+    def put_many(
+        self,
+        found: Mapping[str, Metadata],
+        missing: Iterable[str] = (),
+    ) -> None:
+        """Store answers in ``found`` and misses in ``missing``."""
+
+        now = self.clock()
+        until = now + self.ttl
+        rows = [(q, m.label, m.year, m.image, until) for q, m in found.items()]
+        until = now + self.negative_ttl
+        rows += [(q, None, None, None, until) for q in missing]
+        with self._lock:
+            for q, label, year, image, until in rows:
+                meta = None if label is None else Metadata(label, year, image)
+                self._remember(q, until, meta)
+            db = self._connect() if rows else None
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                db.commit()
+
+    def purge(self) -> int:
+        """Delete expired rows from the file; returns how many."""
+
+        now = self.clock()
+        with self._lock:
+            expired = [q for q, (t, _) in self._memory.items() if t <= now]
+            for q in expired:
+                del self._memory[q]
+            db = self._connect()
+            if db is None:
+                return len(expired)
+            cursor = db.execute(
+                "DELETE FROM metadata WHERE expires <= ?",
+                (now,),
+            )
+            db.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        """Drop every entry, in memory and on disk."""
+
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM metadata")
+                db.commit()
+
+    def close(self) -> None:
+        """Close the file; it is reopened if the cache is used again."""
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _select(self, db, qids, now):
+        for start in range(0, len(qids), _CHUNK):
+            chunk = qids[start : start + _CHUNK]  # noqa: E203
+            marks = ", ".join("?" * len(chunk))
+            query = (
+                "SELECT qid, label, year, image, expires FROM metadata "
+                f"WHERE expires > ? AND qid IN ({marks})"
+            )
+            rows = db.execute(query, (now, *chunk))
+            for q, label, year, image, expires in rows:
+                meta = None if label is None else Metadata(label, year, image)
+                yield q, expires, meta
+
+    def _remember(self, qid, expires, meta) -> None:
+        self._memory[qid] = (expires, meta)
+        self._memory.move_to_end(qid)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
@@ -0,0 +1,146 @@
+"""Local stand-in for the Wikidata SPARQL endpoint.
+
+:class:`FakeSparqlServer` answers the queries of
+:class:`~metadata.service.MetadataService` from a dictionary, with an
+optional delay per request to mimic the round trip to Wikidata, so tests
+and benchmarks run offline. It only understands the ``VALUES ?item`` shape
+of :data:`~metadata.service.QUERY`, and counts the requests it receives.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Mapping, Optional
+from urllib.parse import parse_qs, urlparse
+
+_VALUES = re.compile(r"VALUES\s+\?item\s*\{([^}]*)\}")
+_ITEM = re.compile(r"wd:(Q[0-9]+)")
+ENTITY = "http://www.wikidata.org/entity/"
+
+
+class FakeSparqlServer:
+    """Serve ``items`` as SPARQL JSON results on ``127.0.0.1``.
+
+    Parameters
+    ----------
+    items : Mapping[str, Mapping[str, str]]
+        QID -> ``{"label": ..., "date": ..., "image": ...}``; any key may be
+        missing. Unknown QIDs are answered without values, like Wikidata.
+    latency : float
+        Seconds each request waits before answering.
+    fail : bool
+        Answer every request with HTTP 500.
+    failures : int
+        Answer this many requests with HTTP 503 before serving, as a
+        throttled or overloaded endpoint would.
+
+    Examples
+    --------
+    >>> with FakeSparqlServer({"Q1": {"label": "Um"}}) as server:
+    ...     MetadataService(server.url).label_year(ENTITY + "Q1")
+    ('Um', None)
+    """
+
+    def __init__(
+        self,
+        items: Mapping[str, Mapping[str, str]],
+        latency: float = 0.0,
+        fail: bool = False,
+        failures: int = 0,
+    ) -> None:
+        self.items = items
+        self.latency = latency
+        self.fail = fail
+        self.failures = failures
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/sparql"
+
+    def start(self) -> "FakeSparqlServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                self._answer(params.get("query", [""])[0])
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                self._answer(parse_qs(body).get("query", [""])[0])
+
+            def _answer(self, query: str) -> None:
+                with server._lock:
+                    server.requests += 1
+                    throttled = server.requests <= server.failures
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.fail:
+                    self.send_error(500)
+                    return
+                if throttled:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(server.results(query)).encode("utf-8")
+                self.send_response(200)
+                content_type = "application/sparql-results+json"
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = self._thread = None
+
+    def __enter__(self) -> "FakeSparqlServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def results(self, query: str) -> Dict:
+        """SPARQL JSON results of ``query`` over :attr:`items`."""
+
+        match = _VALUES.search(query)
+        qids = _ITEM.findall(match.group(1)) if match else []
+        bindings = []
+        for qid in qids:
+            item = self.items.get(qid, {})
+            row = {"item": {"type": "uri", "value": ENTITY + qid}}
+            for var, key in (("l", "label"), ("date", "date")):
+                if key in item:
+                    row[var] = {"type": "literal", "value": item[key]}
+            if "image" in item:
+                row["img"] = {"type": "uri", "value": item["image"]}
+            bindings.append(row)
+        head = {"vars": ["item", "l", "date", "img"]}
+        return {"head": head, "results": {"bindings": bindings}}
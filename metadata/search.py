@@ -0,0 +1,126 @@
+"""In-memory search over the labels of the catalog.
+
+:class:`SearchIndex` finds the documents whose text contains a query, case
+and accents ignored, without scanning the catalog: queries of three or more
+characters intersect the posting sets of their trigrams and only the
+candidates left are checked; shorter queries match word prefixes through a
+sorted vocabulary. Results come in document order, so a page of them is a
+slice.
+"""
+
+from __future__ import annotations
+
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import DefaultDict, Iterable, List, Mapping, Set
+
+N = 3
+
+
+def normalize(text: str) -> str:
+    """Lower-case ``text`` and strip its accents."""
+
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i : i + N] for i in range(len(text) - N + 1)}  # noqa: E203
+
+
+class SearchIndex:
+    """Trigram and word index over one text per document.
+
+    Searches and updates may run concurrently from several threads.
+
+    Parameters
+    ----------
+    texts : Iterable[str]
+        Text of each document; document ``i`` is the ``i``-th one.
+    """
+
+    def __init__(self, texts: Iterable[str]) -> None:
+        self.texts: List[str] = []
+        self._grams: DefaultDict[str, Set[int]] = defaultdict(set)
+        self._words: DefaultDict[str, Set[int]] = defaultdict(set)
+        for text in texts:
+            self.texts.append("")
+            self._add(len(self.texts) - 1, normalize(text))
+        self._vocabulary: List[str] = sorted(self._words)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def update(self, texts: Mapping[int, str]) -> None:
+        """Replace the text of some documents, e.g. once labels are known.
+
+        Parameters
+        ----------
+        texts : Mapping[int, str]
+            New text by document.
+        """
+
+        with self._lock:
+            self._update(texts)
+
+    def _update(self, texts: Mapping[int, str]) -> None:
+        changed = False
+        for doc, text in texts.items():
+            text = normalize(text)
+            old = self.texts[doc]
+            if text == old:
+                continue
+            for gram in _grams(old):
+                self._grams[gram].discard(doc)
+            for word in old.split():
+                self._words[word].discard(doc)
+            self._add(doc, text)
+            changed = True
+        if changed:
+            words = self._words.items()
+            self._vocabulary = sorted(w for w, docs in words if docs)
+
+    def search(self, query: str) -> List[int]:
+        """Documents whose text contains ``query``, in document order.
+
+        An empty query matches every document.
+        """
+
+        query = normalize(query).strip()
+        if not query:
+            return list(range(len(self.texts)))
+        with self._lock:
+            if len(query) < N:
+                return self._prefix(query)
+            return self._contains(query)
+
+    def _contains(self, query: str) -> List[int]:
+        postings = sorted(
+            (self._grams.get(g, set()) for g in _grams(query)),
+            key=len,
+        )
+        candidates = postings[0]
+        for docs in postings[1:]:
+            candidates = candidates & docs
+            if not candidates:
+                return []
+        return sorted(d for d in candidates if query in self.texts[d])
+
+    def _prefix(self, query: str) -> List[int]:
+        found: Set[int] = set()
+        start = bisect_left(self._vocabulary, query)
+        for word in self._vocabulary[start:]:
+            if not word.startswith(query):
+                break
+            found |= self._words[word]
+        return sorted(found)
+
+    def _add(self, doc: int, text: str) -> None:
+        self.texts[doc] = text
+        for gram in _grams(text):
+            self._grams[gram].add(doc)
+        for word in text.split():
+            self._words[word].add(doc)
@@ -0,0 +1,284 @@
+"""Batched lookup of labels, release years and images on Wikidata.
+
+The interfaces show a title, a year and a poster for every film on a page,
+and labels for the genres, directors and cast of the selected one. Asking
+Wikidata for them one item at a time costs a round trip each.
+:class:`MetadataService` collects the QIDs a page needs and resolves them
+with a few ``VALUES ?item { ... }`` queries, sent over one pooled
+``requests.Session`` with a bounded number of concurrent requests,
+optionally rate limited and retried with exponential backoff. Given a
+:class:`~metadata.cache.MetadataCache`, it only asks for the items the cache
+does not hold.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import MetadataCache
+
+WIKIDATA_URL = "https://query.wikidata.org/sparql"
+PLACEHOLDER_IMG = "https://placehold.co/200x300?text=Poster"
+
+# only plain item ids are sent to the endpoint
+_QID = re.compile(r"Q[1-9][0-9]*")
+# answers worth retrying: throttled or the server is struggling
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+QUERY = """\
+PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+SELECT ?item ?l ?date ?img WHERE {{
+  VALUES ?item {{ {values} }}
+  OPTIONAL {{ ?item rdfs:label ?l FILTER(lang(?l) = '{language}') }}
+  OPTIONAL {{ ?item wdt:P577 ?date }}
+  OPTIONAL {{ ?item wdt:P18 ?img }}
+}}"""
+
+
+@dataclass(frozen=True)
+class Metadata:
+    """What the interfaces display for an item."""
+
+    label: str
+    year: Optional[str] = None
+    image: str = PLACEHOLDER_IMG
+
+
+def qid(uri: str) -> str:
+    """Last path segment of ``uri``, the QID for Wikidata entities."""
+
+    return uri.rstrip("/").split("/")[-1]
+
+
+def fallback(uri: str) -> Metadata:
+    """Metadata shown when ``uri`` could not be resolved."""
+
+    return Metadata(qid(uri))
+
+
+class RateLimiter:
+    """Space calls at least ``1 / rate`` seconds apart, across threads."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds asked for by a ``Retry-After`` header, if any."""
+
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _transient(exc: Exception) -> bool:
+    if isinstance(exc, requests.HTTPError):
+        response = exc.response
+        return response is not None and response.status_code in RETRY_STATUS
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+class MetadataService:
+    """Resolve many items with few SPARQL requests.
+
+    Parameters
+    ----------
+    endpoint : str
+        SPARQL endpoint answering in ``application/sparql-results+json``.
+    batch_size : int
+        Items per request.
+    max_workers : int
+        Requests in flight at once; also the size of the connection pool.
+    timeout : float
+        Seconds to wait for each request.
+    language : str
+        Language of the labels.
+    cache : MetadataCache, optional
+        Answers and misses are looked up there first and stored after.
+    retries : int
+        Extra attempts for a batch after a connection error, a timeout or
+        a 429/5xx answer.
+    backoff : float
+        Seconds before the first retry, doubled for each further one; a
+        ``Retry-After`` header takes precedence.
+    max_rate : float, optional
+        Requests started per second, across all workers.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = WIKIDATA_URL,
+        batch_size: int = 200,
+        max_workers: int = 4,
+        timeout: float = 10.0,
+        language: str = "en",
+        cache: Optional["MetadataCache"] = None,
+        retries: int = 0,
+        backoff: float = 1.0,
+        max_rate: Optional[float] = None,
+    ) -> None:
+        self.endpoint = endpoint
+        self.batch_size = max(batch_size, 1)
+        self.max_workers = max(max_workers, 1)
+        self.timeout = timeout
+        self.language = language
+        self.cache = cache
+        self.retries = max(retries, 0)
+        self.backoff = backoff
+        self.limiter = RateLimiter(max_rate) if max_rate else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_workers,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/sparql-results+json"
+
+    def fetch(self, uris: Iterable[str]) -> Dict[str, Metadata]:
+        """Metadata of every URI in ``uris``.
+
+        URIs that are not Wikidata items, and items of a batch that failed,
+        get :func:`fallback` metadata, as the single-item lookups did.
+
+        Returns
+        -------
+        Dict[str, Metadata]
+            Keyed by the given URIs.
+        """
+
+        uris = list(dict.fromkeys(uris))
+        qids = [qid(u) for u in uris if _QID.fullmatch(qid(u))]
+        found = self.resolve(qids)
+        return {u: found.get(qid(u)) or fallback(u) for u in uris}
+
+    def resolve(self, qids: Iterable[str]) -> Dict[str, Metadata]:
+        """Look up ``qids``, in the cache then on the endpoint.
+
+        Returns
+        -------
+        Dict[str, Metadata]
+            Items with a label, year or image. Items the endpoint has
+            nothing on and items of failed batches are left out, and cached
+            as misses; ids that are not items are skipped.
+        """
+
+        qids = [q for q in dict.fromkeys(qids) if _QID.fullmatch(q)]
+        cached = self.cache.get_many(qids) if self.cache is not None else {}
+        rest = [q for q in qids if q not in cached]
+        found = self._request(rest)
+        if self.cache is not None and rest:
+            missing = [q for q in rest if q not in found]
+            self.cache.put_many(found, missing)
+        for q, meta in cached.items():
+            if meta is not None:
+                found[q] = meta
+        return found
+
+    def _request(self, qids: List[str]) -> Dict[str, Metadata]:
+        """Answers for ``qids`` from the endpoint."""
+
+        starts = range(0, len(qids), self.batch_size)
+        batches = [qids[i : i + self.batch_size] for i in starts]  # noqa: E203
+        if len(batches) <= 1 or self.max_workers == 1:
+            parts = [self._try_batch(b) for b in batches]
+        else:
+            workers = min(self.max_workers, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(self._try_batch, batches))
+        found: Dict[str, Metadata] = {}
+        for part in parts:
+            found.update(part or {})
+        return found
+
+    def label_year(self, uri: str) -> Tuple[str, Optional[str]]:
+        """``(label, year)`` of a single item."""
+
+        meta = self.fetch([uri])[uri]
+        return meta.label, meta.year
+
+    def image(self, uri: str) -> str:
+        """Image URL of a single item."""
+
+        return self.fetch([uri])[uri].image
+
+    def labels(self, uris: Iterable[str]) -> List[str]:
+        """Labels of ``uris``, in order."""
+
+        uris = list(uris)
+        found = self.fetch(uris)
+        return [found[u].label for u in uris]
+
+    def _try_batch(self, qids: List[str]) -> Optional[Dict[str, Metadata]]:
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                self.limiter.wait()
+            try:
+                return self._batch(qids)
+            except Exception as exc:
+                if attempt == self.retries or not _transient(exc):
+                    return None
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = self.backoff * 2**attempt
+                time.sleep(delay)
+        return None
+
+    def _batch(self, qids: List[str]) -> Dict[str, Metadata]:
+        values = " ".join(f"wd:{q}" for q in qids)
+        query = QUERY.format(values=values, language=self.language)
+        # POST keeps long VALUES lists out of the URL
+        resp = self.session.post(
+            self.endpoint,
+            data={"query": query},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        bindings = resp.json().get("results", {}).get("bindings", [])
+
+        # an item with several dates or images has one row per combination;
+        # the first value of each is kept
+        rows: Dict[str, Dict[str, str]] = {q: {} for q in qids}
+        for b in bindings:
+            row = rows.get(qid(b["item"]["value"]))
+            if row is None:
+                continue
+            for var in ("l", "date", "img"):
+                if var in b and var not in row:
+                    row[var] = b[var]["value"]
+        found: Dict[str, Metadata] = {}
+        for q, row in rows.items():
+            if not row:
+                continue
+            date = row.get("date")
+            found[q] = Metadata(
+                label=row.get("l", q),
+                year=date[:4] if date else None,
+                image=row.get("img", PLACEHOLDER_IMG),
+            )
+        return found
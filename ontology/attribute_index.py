@@ -0,0 +1,277 @@
+"""In-memory inverted index of selected properties of an RDF graph.
+
+The preference and logical lookups are two-hop joins: from a user (or a
+movie) to its values on a few properties, then from those values to the
+movies that share them. :class:`AttributeIndex` keeps both directions of
+those properties as dictionaries of sets, so a lookup is a handful of set
+operations instead of a run of the SPARQL evaluator, and movies can be
+ranked by how many attributes they share. :func:`attribute_index` builds
+the index once per graph version.
+
+:class:`AttributeMatrix` holds the same data as a sparse subject × attribute
+matrix with IDF weights, so the weighted overlap of one movie with every
+other is a single sparse matrix-vector product.
+"""
+
+from __future__ import annotations
+
+import weakref
+from collections import Counter, defaultdict
+from typing import (
+    Any,
+    DefaultDict,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF
+from rdflib.term import Node
+from scipy import sparse
+
+from .versioning import graph_key, graph_state
+
+IndexKey = Tuple[int, FrozenSet[URIRef]]
+State = Tuple[int, int]
+# (graph serial, properties) -> (graph version, index)
+_INDEXES: Dict[IndexKey, Tuple[State, "AttributeIndex"]] = {}
+# (graph serial, properties, class) -> (graph version, matrix)
+_MATRICES: Dict[Tuple[int, Tuple[URIRef, ...], Node], Tuple[State, Any]] = {}
+
+
+class AttributeIndex:
+    """Both directions of ``properties``: subject ↔ values.
+
+    Parameters
+    ----------
+    graph : Graph
+        Graph to index.
+    properties : Iterable[URIRef]
+        Properties to index; other triples are ignored.
+    """
+
+    def __init__(self, graph: Graph, properties: Iterable[URIRef]) -> None:
+        self.properties = frozenset(properties)
+        Index = DefaultDict[Node, Set[Node]]
+        self._values: Dict[URIRef, Index] = {}
+        self._subjects: Dict[URIRef, Index] = {}
+        for p in self.properties:
+            values: Index = defaultdict(set)
+            subjects: Index = defaultdict(set)
+            for s, o in graph.subject_objects(p):
+                values[s].add(o)
+                subjects[o].add(s)
+            self._values[p] = values
+            self._subjects[p] = subjects
+
+    def values(self, subject: Node, prop: URIRef) -> Set[Node]:
+        """Objects of ``subject`` on ``prop``."""
+
+        return self._values[prop].get(subject, set())
+
+    def subjects(self, prop: URIRef, value: Node) -> Set[Node]:
+        """Subjects having ``value`` on ``prop``."""
+
+        return self._subjects[prop].get(value, set())
+
+    def shared(
+        self,
+        pairs: Iterable[Tuple[Iterable[Node], URIRef]],
+        within: Optional[Set[Node]] = None,
+        exclude: Iterable[Node] = (),
+    ) -> List[Tuple[Node, int]]:
+        """Subjects sharing the given values, by number of shared values.
+
+        Parameters
+        ----------
+        pairs : Iterable[Tuple[Iterable[Node], URIRef]]
+            ``(values, prop)`` pairs: a subject scores one point for each
+            of ``values`` it has on ``prop``.
+        within : Set[Node], optional
+            Only keep these subjects.
+        exclude : Iterable[Node]
+            Subjects to leave out.
+
+        Returns
+        -------
+        List[Tuple[Node, int]]
+            ``(subject, count)`` by decreasing count, ties by URI.
+        """
+
+        counts: Counter = Counter()
+        for values, prop in pairs:
+            for value in values:
+                counts.update(self.subjects(prop, value))
+        for node in exclude:
+            counts.pop(node, None)
+        ranked = [
+            (node, count)
+            for node, count in counts.items()
+            if within is None or node in within
+        ]
+        ranked.sort(key=lambda item: (-item[1], str(item[0])))
+        return ranked
+
+
+class AttributeMatrix:
+    """Sparse ``subjects × attributes`` matrix with IDF weights.
+
+    An attribute is a ``(property, value)`` pair. Its weight is
+    ``log(1 + n / df)``, ``n`` being the number of subjects and ``df`` the
+    number of them having the attribute, so attributes shared by many
+    subjects (a common genre) count less than rare ones (a director).
+
+    Parameters
+    ----------
+    index : AttributeIndex
+        Index holding ``properties``.
+    subjects : Iterable[Node]
+        Rows of the matrix; they are sorted by URI, which also breaks ties
+        in :meth:`ranked`.
+    properties : Iterable[URIRef]
+        Properties whose values are the attributes.
+    """
+
+    def __init__(
+        self,
+        index: AttributeIndex,
+        subjects: Iterable[Node],
+        properties: Iterable[URIRef],
+    ) -> None:
+        self.index = index
+        self.properties = tuple(properties)
+        self.subjects: List[Node] = sorted(set(subjects), key=str)
+        self.rows = {s: i for i, s in enumerate(self.subjects)}
+        self.columns: Dict[Tuple[URIRef, Node], int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        columns = self.columns
+        for row, subject in enumerate(self.subjects):
+            for attribute in self._attributes(subject):
+                rows.append(row)
+                cols.append(columns.setdefault(attribute, len(columns)))
+        shape = (len(self.subjects), len(self.columns))
+        self.matrix = sparse.csr_array(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=shape,
+        )
+        df = np.bincount(cols, minlength=len(self.columns))
+        n = max(len(self.subjects), 1)
+        self.idf = np.log1p(n / np.maximum(df, 1))
+
+    def _attributes(self, subject: Node) -> List[Tuple[URIRef, Node]]:
+        return [
+            (p, value)
+            for p in self.properties
+            for value in self.index.values(subject, p)
+        ]
+
+    def scores(self, subject: Node) -> np.ndarray:
+        """Weighted overlap of ``subject`` with every row.
+
+        ``subject`` need not be a row; its attributes are read from the
+        index.
+        """
+
+        query = np.zeros(len(self.columns))
+        for attribute in self._attributes(subject):
+            col = self.columns.get(attribute)
+            if col is not None:
+                query[col] = self.idf[col]
+        return self.matrix @ query
+
+    def ranked(
+        self,
+        subject: Node,
+        top_n: int,
+        exclude: Iterable[Node] = (),
+    ) -> List[Tuple[Node, float]]:
+        """The ``top_n`` rows sharing most weight with ``subject``.
+
+        Returns
+        -------
+        List[Tuple[Node, float]]
+            ``(row subject, score)`` by decreasing score, ties by URI;
+            rows sharing nothing are left out.
+        """
+
+        scores = self.scores(subject)
+        for node in exclude:
+            row = self.rows.get(node)
+            if row is not None:
+                scores[row] = 0.0
+        rows = np.flatnonzero(scores > 0.0)
+        if top_n < len(rows):
+            if top_n <= 0:
+                return []
+            # ties at the cut are resolved by row, i.e. by URI
+            kth = -np.partition(-scores[rows], top_n - 1)[top_n - 1]
+            above = rows[scores[rows] > kth]
+            tied = rows[scores[rows] == kth][: top_n - len(above)]
+            rows = np.concatenate([above, tied])
+        rows = rows[np.lexsort((rows, -scores[rows]))]
+        return [(self.subjects[r], float(scores[r])) for r in rows.tolist()]
+
+
+def attribute_index(
+    graph: Graph,
+    properties: Iterable[URIRef],
+) -> AttributeIndex:
+    """Return the :class:`AttributeIndex` of ``graph``, built once.
+
+    The index is rebuilt after the graph version or its number of triples
+    changes (see :func:`ontology.versioning.graph_state`); an unreported
+    edit that leaves the size unchanged is not noticed.
+    """
+
+    properties = frozenset(properties)
+    serial, _ = graph_key(graph)
+    state = graph_state(graph)
+    key = (serial, properties)
+    cached = _INDEXES.get(key)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    if cached is None:
+        weakref.finalize(graph, _INDEXES.pop, key, None)
+    index = AttributeIndex(graph, properties)
+    _INDEXES[key] = (state, index)
+    return index
+
+
+def attribute_matrix(
+    graph: Graph,
+    properties: Iterable[URIRef],
+    rdf_type: Node,
+) -> AttributeMatrix:
+    """Return the :class:`AttributeMatrix` of the instances of ``rdf_type``.
+
+    Like :func:`attribute_index`, it is built once per graph state.
+    """
+
+    properties = tuple(properties)
+    serial, _ = graph_key(graph)
+    state = graph_state(graph)
+    key = (serial, properties, rdf_type)
+    cached = _MATRICES.get(key)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    if cached is None:
+        weakref.finalize(graph, _MATRICES.pop, key, None)
+    index = attribute_index(graph, properties + (RDF.type,))
+    subjects = index.subjects(RDF.type, rdf_type)
+    matrix = AttributeMatrix(index, subjects, properties)
+    _MATRICES[key] = (state, matrix)
+    return matrix
+
+
+def clear_cache() -> None:
+    """Forget every memoized index and matrix."""
+
+    _INDEXES.clear()
+    _MATRICES.clear()
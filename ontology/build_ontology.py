@@ -1,7 +1,18 @@
 from rdflib import Graph, URIRef
 from rdflib.namespace import RDF, OWL
 from owlrl import DeductiveClosure, OWLRL_Semantics
+from typing import Optional, Set, Tuple
 import gzip
+import os
+
+from .snapshot import (
+    Triple,
+    load_snapshot,
+    remove_stale_snapshots,
+    save_snapshot,
+    snapshot_path,
+    source_digest,
+)
 
 
 def load_ontology(path: str) -> Graph:
@@ -41,8 +52,8 @@ def load_ontology(path: str) -> Graph:
     return g
 
 
-def build_ontology_graph(ontology_path: str) -> Graph:
-    """Load an ontology, run OWL RL reasoning and return the inferred graph."""
+def _parse_source(ontology_path: str) -> Graph:
+    """Parse a TTL/OWL file, optionally gzip-compressed."""
     g = Graph()
 
     if ontology_path.endswith((".ttl.gz", ".owl.gz", ".rdf.gz")):
@@ -60,6 +71,69 @@ def build_ontology_graph(ontology_path: str) -> Graph:
                 g.parse(ontology_path, format="turtle")
             else:
                 raise
+    return g
+
+
+def load_inferred_graph(
+    ontology_path: str,
+    cache_dir: Optional[str] = None,
+    source: Optional[Graph] = None,
+    digest: Optional[str] = None,
+) -> Tuple[Graph, Set[Triple]]:
+    """Return the inferred graph together with its asserted triples.
+
+    Same as :func:`build_ontology_graph`, but also returns the triples that
+    were present in the source before reasoning, which incremental
+    reasoning needs in order to retract inferences. ``source`` is the file
+    already parsed (e.g. by :mod:`ontology.graph_cache`); it is copied
+    instead of parsing the file again and is left unchanged. ``digest`` is
+    the :func:`source_digest` of the file when the caller already has it.
+    """
+    snapshot = key = None
+    if cache_dir is not None:
+        key = digest or source_digest(ontology_path)
+        snapshot = snapshot_path(ontology_path, cache_dir, key)
+        if os.path.exists(snapshot):
+            try:
+                return load_snapshot(snapshot, key)
+            except Exception:
+                # corrupt or foreign file: rebuild it below
+                pass
+
+    if source is None:
+        g = _parse_source(ontology_path)
+    else:
+        g = Graph()
+        for t in source:
+            g.add(t)
+    asserted = set(g)
 
     DeductiveClosure(OWLRL_Semantics).expand(g)
-    return g
+
+    if snapshot is not None:
+        save_snapshot(snapshot, g, asserted, key)
+        remove_stale_snapshots(ontology_path, cache_dir, keep=snapshot)
+    return g, asserted
+
+
+def build_ontology_graph(
+    ontology_path: str,
+    cache_dir: Optional[str] = None,
+) -> Graph:
+    """Load an ontology, run OWL RL reasoning and return the inferred graph.
+
+    Parameters
+    ----------
+    ontology_path : str
+        Path to a ``.ttl``/``.owl`` file, optionally gzip-compressed.
+    cache_dir : str, optional
+        Directory holding binary snapshots of the inferred graph. When given,
+        a snapshot matching the current file content is loaded instead of
+        reasoning again, and a new one is written after reasoning.
+
+    Returns
+    -------
+    Graph
+        Graph expanded with the OWL RL closure.
+    """
+    return load_inferred_graph(ontology_path, cache_dir)[0]
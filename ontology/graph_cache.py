@@ -0,0 +1,216 @@
+"""Process-wide cache of loaded RDF graphs.
+
+The recommenders need the same dump in two forms: ``"raw"`` (the parsed
+file, used by the logical recommender) and ``"inferred"`` (after OWL RL
+reasoning, used by the serendipity pipeline). :class:`GraphCache` keeps both
+under one memory budget and evicts the least recently used graphs first,
+using an estimate of their footprint. An entry is dropped when its file
+changes: the modification time and size are checked on every access and,
+when they differ, the SHA-256 of the file decides whether the content
+really changed. A form is derived from the other one when it is already
+cached, so the file is not parsed twice.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from rdflib import Graph
+
+from .build_ontology import _parse_source, load_inferred_graph
+from .snapshot import Triple, default_cache_dir, snapshot_path, source_digest
+
+KINDS = ("raw", "inferred")
+# measured on the film dump with ``tracemalloc``: store indexes and terms,
+# and a tuple in the set of asserted triples kept for inferred graphs
+BYTES_PER_TRIPLE = 800
+BYTES_PER_ASSERTED = 100
+
+
+@dataclass
+class _Entry:
+    graph: Graph
+    asserted: Optional[Set[Triple]]
+    stat: Tuple[int, int]
+    digest: str
+    size: int
+
+
+def _stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class GraphCache:
+    """LRU cache of graphs keyed by ``(path, kind)``.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Budget for the estimated size of the cached graphs. The most
+        recently used graph is always kept, even if it alone exceeds it.
+    snapshots : bool
+        Load and write snapshots of inferred graphs next to the file (see
+        :mod:`ontology.snapshot`).
+    """
+
+    def __init__(self, max_bytes: int = 2 << 30, snapshots: bool = True):
+        self.max_bytes = max_bytes
+        self.snapshots = snapshots
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats: Dict[str, float] = {}
+        self.reset_stats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        path, kind = key
+        return (os.path.abspath(path), kind) in self._entries
+
+    @property
+    def size(self) -> int:
+        """Estimated bytes held by the cached graphs."""
+
+        return sum(entry.size for entry in self._entries.values())
+
+    def get(self, path: str, kind: str = "inferred") -> Graph:
+        """Return the graph of ``path``, loading it if needed.
+
+        Parameters
+        ----------
+        path : str
+            TTL/OWL file, optionally gzip-compressed.
+        kind : str
+            ``"raw"`` or ``"inferred"``.
+
+        Raises
+        ------
+        ValueError
+            If ``kind`` is unknown.
+        """
+
+        if kind not in KINDS:
+            raise ValueError(f"Unknown graph kind: {kind}")
+        path = os.path.abspath(path)
+        with self._lock:
+            key = (path, kind)
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(path, entry):
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry.graph
+
+            self._stats["misses"] += 1
+            start = time.perf_counter()
+            entry = self._load(path, kind)
+            self._stats["load_seconds"] += time.perf_counter() - start
+            self._entries[key] = entry
+            self._evict()
+            return entry.graph
+
+    def digest(self, path: str) -> Optional[str]:
+        """SHA-256 of ``path`` when one of its graphs is cached."""
+
+        path = os.path.abspath(path)
+        with self._lock:
+            for entry in self._same_file(path):
+                return entry.digest
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        """Counters since the last :meth:`reset_stats`.
+
+        ``hits``, ``misses``, ``invalidations`` (entries dropped because
+        the file changed), ``evictions``, ``derived`` (loads served from
+        the other form of the same file) and ``load_seconds``, plus the
+        current ``entries`` and estimated ``bytes``.
+        """
+
+        with self._lock:
+            return dict(self._stats, entries=len(self), bytes=self.size)
+
+    def reset_stats(self) -> None:
+        names = ("hits", "misses", "invalidations", "evictions", "derived")
+        self._stats = dict.fromkeys(names, 0)
+        self._stats["load_seconds"] = 0.0
+
+    def clear(self) -> None:
+        """Drop every cached graph."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def _fresh(self, path: str, entry: _Entry) -> bool:
+        """Whether ``entry`` still matches the file, dropping it if not."""
+
+        stat = _stat(path)
+        if stat == entry.stat:
+            return True
+        # touched or rewritten: only a different content invalidates
+        if source_digest(path) == entry.digest:
+            for other in self._same_file(path):
+                other.stat = stat
+            return True
+        for kind in KINDS:
+            if self._entries.pop((path, kind), None) is not None:
+                self._stats["invalidations"] += 1
+        return False
+
+    def _same_file(self, path: str):
+        for kind in KINDS:
+            entry = self._entries.get((path, kind))
+            if entry is not None:
+                yield entry
+
+    def _load(self, path: str, kind: str) -> _Entry:
+        stat = _stat(path)
+        digest = source_digest(path)
+        raw = self._entries.get((path, "raw"))
+        inferred = self._entries.get((path, "inferred"))
+
+        asserted = None
+        if kind == "raw":
+            if inferred is not None and inferred.asserted is not None:
+                # the asserted triples of the inferred graph are the file
+                graph = Graph()
+                for t in inferred.asserted:
+                    graph.add(t)
+                self._stats["derived"] += 1
+            else:
+                graph = _parse_source(path)
+        else:
+            source = raw.graph if raw is not None else None
+            if self.snapshots:
+                cache_dir = default_cache_dir(path)
+                snapshot = snapshot_path(path, cache_dir, digest)
+                if source is not None and os.path.exists(snapshot):
+                    source = None
+            else:
+                cache_dir = None
+            if source is not None:
+                self._stats["derived"] += 1
+            loaded = load_inferred_graph(path, cache_dir, source, digest)
+            graph, asserted = loaded
+
+        size = len(graph) * BYTES_PER_TRIPLE
+        if asserted is not None:
+            size += len(asserted) * BYTES_PER_ASSERTED
+        return _Entry(graph, asserted, stat, digest, size)
+
+    def _evict(self) -> None:
+        total = self.size
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.size
+            self._stats["evictions"] += 1
+
+
+# cache shared by the pipelines and the interfaces
+GRAPH_CACHE = GraphCache()
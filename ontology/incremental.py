@@ -0,0 +1,398 @@
+"""Incremental OWL RL maintenance of an already inferred graph.
+
+``DeductiveClosure.expand`` always recomputes the closure of the whole
+graph. :class:`IncrementalReasoner` keeps a closed graph up to date when
+instance data changes: insertions are propagated with semi-naive
+evaluation (each new triple is joined once with the current graph) and
+deletions use delete-and-rederive (DRed).
+
+The delta rules cover the OWL RL rules that fire on instance data in this
+project: ``eq-ref``, ``cax-sco``, ``cax-eqc``, ``prp-dom``, ``prp-rng``,
+``prp-spo1``, ``prp-eqp``, ``prp-inv``, ``prp-symp``, ``prp-trp`` and
+datatype typing of literals. Changes to the schema itself, non-reflexive
+``owl:sameAs`` and data touching class expressions or property axioms
+outside that set fall back to a full closure over the asserted triples.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from owlrl import DeductiveClosure, OWLRL_Semantics
+from rdflib import Graph, Literal, URIRef
+from rdflib.collection import Collection
+from rdflib.namespace import OWL, RDF, RDFS
+from rdflib.term import Node
+
+from .build_ontology import load_inferred_graph
+from .versioning import mark_changed
+
+Triple = Tuple[Node, Node, Node]
+
+_SCHEMA_PREDICATES = {
+    RDFS.subClassOf,
+    RDFS.subPropertyOf,
+    RDFS.domain,
+    RDFS.range,
+    OWL.equivalentClass,
+    OWL.equivalentProperty,
+    OWL.inverseOf,
+    OWL.propertyChainAxiom,
+    OWL.hasKey,
+    OWL.onProperty,
+    OWL.onClass,
+    OWL.someValuesFrom,
+    OWL.allValuesFrom,
+    OWL.hasValue,
+    OWL.intersectionOf,
+    OWL.unionOf,
+    OWL.complementOf,
+    OWL.oneOf,
+    OWL.disjointWith,
+    OWL.disjointUnionOf,
+    OWL.propertyDisjointWith,
+    OWL.maxCardinality,
+    OWL.maxQualifiedCardinality,
+    OWL.differentFrom,
+    OWL.members,
+    OWL.distinctMembers,
+    RDF.first,
+    RDF.rest,
+}
+
+_VOCABULARY = (str(RDF), str(RDFS), str(OWL))
+
+_PROPERTY_TYPES = (
+    OWL.FunctionalProperty,
+    OWL.InverseFunctionalProperty,
+    OWL.IrreflexiveProperty,
+    OWL.AsymmetricProperty,
+)
+
+
+class _FullClosure(Exception):
+    """Raised when a delta needs rules outside the incremental subset."""
+
+
+class IncrementalReasoner:
+    """Keep an OWL RL closed graph consistent under triple updates.
+
+    Parameters
+    ----------
+    graph : Graph
+        Graph already expanded with ``DeductiveClosure(OWLRL_Semantics)``.
+        It is updated in place.
+    asserted : Iterable[Triple], optional
+        Triples that were asserted before reasoning. When omitted every
+        triple of ``graph`` is treated as asserted, which means inferences
+        of later removals can only be retracted if they were added through
+        this reasoner.
+    """
+
+    def __init__(
+        self,
+        graph: Graph,
+        asserted: Optional[Iterable[Triple]] = None,
+    ) -> None:
+        self.graph = graph
+        base = graph if asserted is None else asserted
+        self.asserted: Set[Triple] = set(base)
+        self.last_stats: Dict[str, Any] = {}
+        self._literal_types: Dict[Tuple[Any, Any], Set[Node]] = {}
+        self._index_schema()
+
+    @classmethod
+    def from_path(
+        cls,
+        ontology_path: str,
+        cache_dir: Optional[str] = None,
+    ) -> "IncrementalReasoner":
+        """Build a reasoner for an ontology file, reusing its snapshot."""
+
+        graph, asserted = load_inferred_graph(ontology_path, cache_dir)
+        return cls(graph, asserted)
+
+    # ------------------------------------------------------------------
+    # public API
+
+    def add_triples(self, triples: Iterable[Triple]) -> Set[Triple]:
+        """Assert ``triples`` and add their consequences.
+
+        Returns
+        -------
+        Set[Triple]
+            Every triple inserted into the graph, asserted or inferred.
+        """
+
+        start = time.perf_counter()
+        triples = [t for t in triples if t not in self.asserted]
+        self.asserted.update(triples)
+        try:
+            if any(self._needs_full(t) for t in triples):
+                raise _FullClosure
+            added = self._propagate(t for t in triples if t not in self.graph)
+        except _FullClosure:
+            return self._recompute(start)[0]
+        self._finish(start, added, set(), full=False)
+        return added
+
+    def remove_triples(self, triples: Iterable[Triple]) -> Set[Triple]:
+        """Retract asserted ``triples`` and the inferences relying on them.
+
+        Triples that are not asserted are ignored, since they would be
+        derived again from the remaining data.
+
+        Returns
+        -------
+        Set[Triple]
+            Every triple deleted from the graph.
+        """
+
+        start = time.perf_counter()
+        targets = [t for t in triples if t in self.asserted]
+        self.asserted.difference_update(targets)
+        if not targets:
+            self._finish(start, set(), set(), full=False)
+            return set()
+        if any(self._needs_full(t) for t in targets):
+            return self._recompute(start)[1]
+
+        # 1. over-delete everything derivable from the removed triples
+        over: Set[Triple] = set(targets)
+        queue = deque(targets)
+        while queue:
+            for c in self._consequences(queue.popleft()):
+                if c not in over and c in self.graph:
+                    over.add(c)
+                    queue.append(c)
+        deleted = {t for t in over if t not in self.asserted}
+        for t in deleted:
+            self.graph.remove(t)
+
+        # 2. rederive: any remaining derivation of a deleted triple has a
+        # body atom touching its subject, so those triples seed the search
+        seeds: Set[Triple] = set()
+        for node in {t[0] for t in deleted if not _reflexive(t)}:
+            seeds.update(self.graph.triples((node, None, None)))
+            seeds.update(self.graph.triples((None, None, node)))
+        try:
+            restored = self._propagate(seeds, seeded=True)
+        except _FullClosure:
+            return self._recompute(start)[1]
+        for t in deleted:
+            if _reflexive(t) and t not in self.graph and self._occurs(t[0]):
+                self.graph.add(t)
+                restored.add(t)
+
+        removed = deleted - restored
+        self._finish(start, set(), removed, full=False)
+        return removed
+
+    def recompute(self) -> None:
+        """Rebuild the closure from the asserted triples."""
+
+        self._recompute(time.perf_counter())
+
+    # ------------------------------------------------------------------
+    # evaluation
+
+    def _propagate(
+        self,
+        delta: Iterable[Triple],
+        seeded: bool = False,
+    ) -> Set[Triple]:
+        """Semi-naive fixpoint: join each new triple once with the graph.
+
+        With ``seeded`` the delta triples are already in the graph and only
+        their consequences are inserted.
+        """
+
+        added: Set[Triple] = set()
+        queue = deque()
+        for t in delta:
+            if not seeded:
+                self.graph.add(t)
+                added.add(t)
+            queue.append(t)
+        while queue:
+            for c in self._consequences(queue.popleft()):
+                if c in self.graph:
+                    continue
+                if self._needs_full(c):
+                    raise _FullClosure
+                self.graph.add(c)
+                added.add(c)
+                queue.append(c)
+        return added
+
+    def _consequences(self, triple: Triple) -> Iterator[Triple]:
+        s, p, o = triple
+        g = self.graph
+
+        # eq-ref
+        for node in (s, p, o):
+            yield (node, OWL.sameAs, node)
+        if isinstance(o, Literal):
+            for dtype in self._types_of_literal(o):
+                yield (o, RDF.type, dtype)
+        if p == OWL.sameAs:
+            return
+
+        if p == RDF.type:
+            # cax-sco, cax-eqc1, cax-eqc2
+            for d in g.objects(o, RDFS.subClassOf):
+                yield (s, RDF.type, d)
+            for d in g.objects(o, OWL.equivalentClass):
+                yield (s, RDF.type, d)
+            for d in g.subjects(OWL.equivalentClass, o):
+                yield (s, RDF.type, d)
+
+        # prp-dom, prp-rng
+        for c in g.objects(p, RDFS.domain):
+            yield (s, RDF.type, c)
+        if not isinstance(o, Literal):
+            for c in g.objects(p, RDFS.range):
+                yield (o, RDF.type, c)
+
+        # prp-spo1, prp-eqp1, prp-eqp2
+        for q in g.objects(p, RDFS.subPropertyOf):
+            yield (s, q, o)
+        for q in g.objects(p, OWL.equivalentProperty):
+            yield (s, q, o)
+        for q in g.subjects(OWL.equivalentProperty, p):
+            yield (s, q, o)
+
+        if not isinstance(o, Literal):
+            # prp-inv1, prp-inv2, prp-symp
+            for q in g.objects(p, OWL.inverseOf):
+                yield (o, q, s)
+            for q in g.subjects(OWL.inverseOf, p):
+                yield (o, q, s)
+            if (p, RDF.type, OWL.SymmetricProperty) in g:
+                yield (o, p, s)
+
+        # prp-trp, joining the delta on both sides
+        if (p, RDF.type, OWL.TransitiveProperty) in g:
+            for z in g.objects(o, p):
+                yield (s, p, z)
+            for x in g.subjects(p, s):
+                yield (x, p, o)
+
+    def _types_of_literal(self, lit: Literal) -> Set[Node]:
+        """Datatypes OWL RL assigns to ``lit``, cached per datatype."""
+
+        key = (lit.datatype, lit.language is not None)
+        if key not in self._literal_types:
+            scratch = Graph()
+            subject = URIRef("urn:incremental:s")
+            scratch.add((subject, URIRef("urn:incremental:p"), lit))
+            DeductiveClosure(OWLRL_Semantics).expand(scratch)
+            self._literal_types[key] = set(scratch.objects(lit, RDF.type))
+        return self._literal_types[key]
+
+    # ------------------------------------------------------------------
+    # fallback
+
+    def _index_schema(self) -> None:
+        """Collect classes and properties the delta rules cannot handle."""
+
+        g = self.graph
+        classes: Set[Node] = {OWL.Nothing}
+        props: Set[Node] = set()
+
+        for ptype in _PROPERTY_TYPES:
+            props.update(g.subjects(RDF.type, ptype))
+        props.update(g.objects(None, OWL.onProperty))
+        for a, _, b in g.triples((None, OWL.propertyDisjointWith, None)):
+            props.update((a, b))
+        for head in g.objects(None, OWL.propertyChainAxiom):
+            props.update(Collection(g, head))
+        for cls, _, head in g.triples((None, OWL.hasKey, None)):
+            classes.add(cls)
+            props.update(Collection(g, head))
+
+        for pred in (
+            OWL.intersectionOf,
+            OWL.unionOf,
+            OWL.oneOf,
+            OWL.complementOf,
+            OWL.onProperty,
+        ):
+            for cls, _, obj in g.triples((None, pred, None)):
+                classes.add(cls)
+                if pred in (OWL.intersectionOf, OWL.unionOf):
+                    classes.update(Collection(g, obj))
+        for pred in (OWL.someValuesFrom, OWL.allValuesFrom, OWL.onClass):
+            classes.update(g.objects(None, pred))
+        for a, _, b in g.triples((None, OWL.disjointWith, None)):
+            classes.update((a, b))
+        for group in g.subjects(RDF.type, OWL.AllDisjointClasses):
+            for head in g.objects(group, OWL.members):
+                classes.update(Collection(g, head))
+
+        self._complex_classes = classes
+        self._complex_properties = props
+
+    def _needs_full(self, triple: Triple) -> bool:
+        s, p, o = triple
+        if p == OWL.sameAs:
+            return s != o
+        if p in _SCHEMA_PREDICATES or p in self._complex_properties:
+            return True
+        if p == RDF.type and not isinstance(s, Literal):
+            if o in self._complex_classes:
+                return True
+            return isinstance(o, URIRef) and str(o).startswith(_VOCABULARY)
+        return False
+
+    def _recompute(self, start: float) -> Tuple[Set[Triple], Set[Triple]]:
+        closed = Graph()
+        for t in self.asserted:
+            closed.add(t)
+        DeductiveClosure(OWLRL_Semantics).expand(closed)
+
+        removed = {t for t in self.graph if t not in closed}
+        added = {t for t in closed if t not in self.graph}
+        for t in removed:
+            self.graph.remove(t)
+        for t in added:
+            self.graph.add(t)
+        self._index_schema()
+        self._finish(start, added, removed, full=True)
+        return added, removed
+
+    # ------------------------------------------------------------------
+    # helpers
+
+    def _occurs(self, node: Node) -> bool:
+        """Whether ``node`` appears in a triple other than its ``eq-ref``."""
+
+        own = (node, OWL.sameAs, node)
+        patterns = ((node, None, None), (None, node, None), (None, None, node))
+        for pattern in patterns:
+            for t in self.graph.triples(pattern):
+                if t != own:
+                    return True
+        return False
+
+    def _finish(
+        self,
+        start: float,
+        added: Set[Triple],
+        removed: Set[Triple],
+        full: bool,
+    ) -> None:
+        self.last_stats = {
+            "added": len(added),
+            "removed": len(removed),
+            "full_closure": full,
+            "seconds": time.perf_counter() - start,
+        }
+        if added or removed:
+            mark_changed(self.graph, added, removed)
+
+
+def _reflexive(triple: Triple) -> bool:
+    return triple[1] == OWL.sameAs and triple[0] == triple[2]
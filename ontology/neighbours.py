@@ -0,0 +1,184 @@
+"""Precomputed top-K logical neighbours of every movie.
+
+:func:`compute_neighbours` scores every row of an :class:`AttributeMatrix`
+against all others with the IDF-weighted overlap of ``recommend_logical``'s
+``"weighted"`` mode, a chunk of rows at a time (one sparse product per
+chunk, optionally spread over processes) so memory stays bounded, and keeps
+the best ``k`` of each row. :class:`NeighbourTable` stores them as one
+``.npy`` structured array (neighbour id and score per slot) next to a node
+list; the array is memory-mapped on load, so a lookup reads ``k`` slots.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from rdflib import URIRef
+from scipy import sparse
+
+from .attribute_index import AttributeMatrix
+
+DTYPE = np.dtype([("id", "<i4"), ("score", "<f4")])
+
+# weighted matrix and its transpose shared with the worker processes
+_WORKER_MATRICES = None
+
+
+class NeighbourTable:
+    """Top-K neighbours of each node, ``-1`` ids marking empty slots.
+
+    Parameters
+    ----------
+    nodes : Iterable[Any]
+        Node table; row ``i`` of ``neighbours`` belongs to ``nodes[i]``.
+    neighbours : np.ndarray
+        ``len(nodes) × k`` array of :data:`DTYPE`, best neighbour first.
+    """
+
+    def __init__(self, nodes: Iterable[Any], neighbours: np.ndarray) -> None:
+        self.nodes: List[Any] = list(nodes)
+        self.index: Dict[Any, int] = {n: i for i, n in enumerate(self.nodes)}
+        self.neighbours = neighbours
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1]
+
+    def __contains__(self, node: Any) -> bool:
+        return node in self.index
+
+    def lookup(self, node: Any, top_n: int) -> List[Tuple[Any, float]]:
+        """Up to ``top_n`` ``(neighbour, score)`` pairs of ``node``.
+
+        Raises
+        ------
+        KeyError
+            If ``node`` is not in the table.
+        """
+
+        slots = self.neighbours[self.index[node], : max(top_n, 0)]
+        return [
+            (self.nodes[i], float(s))
+            for i, s in zip(slots["id"].tolist(), slots["score"].tolist())
+            if i >= 0
+        ]
+
+    def save(self, path: str) -> None:
+        """Write the table to ``path`` and ``path + ".nodes"``."""
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(str(n) for n in self.nodes))
+        os.replace(tmp, f"{path}.nodes")
+        with open(tmp, "wb") as fh:
+            np.save(fh, np.ascontiguousarray(self.neighbours, dtype=DTYPE))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NeighbourTable":
+        """Memory-map a table written by :meth:`save`."""
+
+        neighbours = np.load(path, mmap_mode="r")
+        with open(f"{path}.nodes", encoding="utf-8") as fh:
+            text = fh.read()
+        nodes = [URIRef(n) for n in text.split("\n")] if text else []
+        return cls(nodes, neighbours)
+
+
+def compute_neighbours(
+    matrix: AttributeMatrix,
+    k: int = 50,
+    chunk_size: int = 1024,
+    n_jobs: Optional[int] = None,
+) -> NeighbourTable:
+    """Top-``k`` neighbours of every row of ``matrix``.
+
+    Neighbours are ordered as by :meth:`AttributeMatrix.ranked`: by
+    decreasing weighted overlap, ties by URI; rows sharing nothing and the
+    row itself are left out.
+
+    Parameters
+    ----------
+    matrix : AttributeMatrix
+        Subjects and their attributes.
+    k : int
+        Neighbours kept per row.
+    chunk_size : int
+        Rows scored per sparse product. Memory grows with the number of
+        non-zero similarities of a chunk.
+    n_jobs : int, optional
+        Number of worker processes. Defaults to the number of CPUs; ``1``
+        runs in the current process.
+
+    Returns
+    -------
+    NeighbourTable
+        Table over ``matrix.subjects``.
+    """
+
+    weighted = (matrix.matrix * matrix.idf).tocsr()
+    transposed = matrix.matrix.T.tocsr()
+    n = len(matrix.subjects)
+    starts = list(range(0, n, chunk_size))
+    chunks = [(s, min(s + chunk_size, n), k) for s in starts]
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(len(chunks), 1))
+
+    if n_jobs == 1:
+        parts = [_chunk_top_k(weighted, transposed, *c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(weighted, transposed),
+        ) as pool:
+            parts = list(pool.map(_worker_top_k, chunks))
+
+    neighbours = np.empty((n, k), dtype=DTYPE)
+    neighbours["id"] = -1
+    neighbours["score"] = 0.0
+    for (start, end, _), (ids, scores) in zip(chunks, parts):
+        neighbours["id"][start:end] = ids
+        neighbours["score"][start:end] = scores
+    return NeighbourTable(matrix.subjects, neighbours)
+
+
+def _chunk_top_k(
+    weighted: sparse.csr_array,
+    transposed: sparse.csr_array,
+    start: int,
+    end: int,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Best ``k`` neighbours of rows ``start:end``, padded with ``-1``."""
+
+    scores = (weighted[start:end] @ transposed).tocoo()
+    rows, cols, data = scores.row, scores.col, scores.data
+    keep = (rows + start != cols) & (data > 0)
+    rows, cols, data = rows[keep], cols[keep], data[keep]
+
+    order = np.lexsort((cols, -data, rows))
+    rows, cols, data = rows[order], cols[order], data[order]
+    # position of each entry within its row
+    first = np.searchsorted(rows, np.arange(end - start))
+    rank = np.arange(len(rows)) - first[rows]
+    top = rank < k
+
+    ids = np.full((end - start, k), -1, dtype=np.int32)
+    best = np.zeros((end - start, k), dtype=np.float32)
+    ids[rows[top], rank[top]] = cols[top]
+    best[rows[top], rank[top]] = data[top]
+    return ids, best
+
+
+def _init_worker(weighted, transposed) -> None:
+    global _WORKER_MATRICES
+    _WORKER_MATRICES = (weighted, transposed)
+
+
+def _worker_top_k(chunk: Tuple[int, int, int]):
+    return _chunk_top_k(*_WORKER_MATRICES, *chunk)
@@ -0,0 +1,74 @@
+"""Registry of prepared SPARQL queries.
+
+Parsing a query and translating it to SPARQL algebra costs more than
+evaluating a simple pattern on a small graph. Queries are registered once
+under a name, compiled with ``prepareQuery`` on first use and then executed
+with ``initBindings``, so per-call values (user or movie URIs) never go into
+the query text.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict
+
+from rdflib import Graph
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.sparql import Query
+from rdflib.query import Result
+
+_TEXTS: Dict[str, str] = {}
+_PREPARED: Dict[str, Query] = {}
+_LOCK = threading.Lock()
+
+
+def register(name: str, text: str) -> None:
+    """Register the SPARQL ``text`` under ``name``.
+
+    Registering a different text under an existing name replaces it.
+    """
+
+    with _LOCK:
+        if _TEXTS.get(name) != text:
+            _TEXTS[name] = text
+            _PREPARED.pop(name, None)
+
+
+def prepared(name: str) -> Query:
+    """Return the compiled query registered as ``name``.
+
+    Raises
+    ------
+    KeyError
+        If no query was registered under ``name``.
+    """
+
+    query = _PREPARED.get(name)
+    if query is None:
+        with _LOCK:
+            if name not in _PREPARED:
+                _PREPARED[name] = prepareQuery(_TEXTS[name])
+            query = _PREPARED[name]
+    return query
+
+
+def run(graph: Graph, name: str, **bindings: Any) -> Result:
+    """Execute the query ``name`` on ``graph`` with variables bound.
+
+    Parameters
+    ----------
+    graph : Graph
+        Graph to query.
+    name : str
+        Registered query name.
+    **bindings : Any
+        Values of query variables, e.g. ``user=URIRef(...)`` binds
+        ``?user``.
+
+    Returns
+    -------
+    Result
+        The ``rdflib`` query result.
+    """
+
+    return graph.query(prepared(name), initBindings=bindings)
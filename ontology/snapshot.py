@@ -0,0 +1,263 @@
+"""Binary snapshots of inferred ontology graphs.
+
+A snapshot stores the triples of an already expanded graph as an integer
+array over an interned term table, so a restart only has to rebuild the
+``rdflib`` terms instead of parsing the dump and running OWL RL again.
+Snapshots are keyed by the SHA-256 of the source file and the ``owlrl``
+version, so editing the dump or upgrading the reasoner invalidates them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import owlrl
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.term import Node
+
+FORMAT_VERSION = 1
+
+Triple = Tuple[Node, Node, Node]
+
+_URI, _BNODE, _LITERAL = 0, 1, 2
+
+
+def source_digest(path: str) -> str:
+    """Return the SHA-256 of ``path`` combined with the ``owlrl`` version."""
+
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(f"owlrl={owlrl.__version__};fmt={FORMAT_VERSION}".encode())
+    return h.hexdigest()
+
+
+def default_cache_dir(source: str) -> str:
+    """Return the directory where snapshots of ``source`` are kept."""
+
+    return os.path.join(os.path.dirname(os.path.abspath(source)), ".cache")
+
+
+def snapshot_path(
+    source: str,
+    cache_dir: str,
+    digest: str = "",
+    suffix: str = ".npz",
+) -> str:
+    """Return the snapshot file name for the current content of ``source``.
+
+    Files derived from the snapshot (e.g. novelty tables) use the same name
+    with a different ``suffix`` so they are invalidated together.
+    """
+
+    digest = digest or source_digest(source)
+    name = os.path.basename(source)
+    return os.path.join(cache_dir, f"{name}.{digest[:16]}{suffix}")
+
+
+def encode_strings(values: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack strings as UTF-8 bytes plus their ``int64`` offsets.
+
+    String ``i`` is ``blob[offsets[i]:offsets[i + 1]]``; unlike a fixed
+    width array, the size grows with the text, not with the longest value.
+    """
+
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, blob
+
+
+def decode_strings(offsets: np.ndarray, blob: np.ndarray) -> List[str]:
+    """Inverse of :func:`encode_strings`."""
+
+    bounds = offsets.tolist()
+    data = blob.tobytes()
+    pairs = zip(bounds, bounds[1:])
+    return [data[start:end].decode("utf-8") for start, end in pairs]
+
+
+def _encode_terms(
+    rows: List[Triple],
+) -> Tuple[np.ndarray, List[str], List[int], List[Tuple[int, int]], list]:
+    """Intern every term of ``rows`` and return the term tables."""
+
+    ids: Dict[Node, int] = {}
+    values: List[str] = []
+    kinds: List[int] = []
+    extra: List[Tuple[int, int]] = []
+    langs: Dict[Optional[str], int] = {}
+
+    def intern(term: Node) -> int:
+        idx = ids.get(term)
+        if idx is not None:
+            return idx
+        if isinstance(term, Literal):
+            # the datatype is interned first so loading is a single pass
+            dtype = intern(term.datatype) if term.datatype else -1
+            lang = langs.setdefault(term.language, len(langs))
+            kinds.append(_LITERAL)
+            extra.append((dtype, lang))
+        else:
+            kinds.append(_BNODE if isinstance(term, BNode) else _URI)
+            extra.append((-1, -1))
+        values.append(str(term))
+        ids[term] = len(values) - 1
+        return ids[term]
+
+    triples = np.fromiter(
+        (intern(t) for triple in rows for t in triple),
+        dtype=np.int32,
+        count=3 * len(rows),
+    ).reshape(-1, 3)
+    lang_table: list = [None] * len(langs)
+    for lang, idx in langs.items():
+        lang_table[idx] = lang
+    return triples, values, kinds, extra, lang_table
+
+
+def save_snapshot(
+    path: str,
+    graph: Graph,
+    asserted: Optional[Iterable[Triple]] = None,
+    key: str = "",
+) -> None:
+    """Write ``graph`` to ``path`` in the binary snapshot format.
+
+    Parameters
+    ----------
+    path : str
+        Destination ``.npz`` file. It is written atomically.
+    graph : Graph
+        Graph to store, usually already expanded by OWL RL.
+    asserted : Iterable[Triple], optional
+        Triples that were present before reasoning. They are flagged in the
+        snapshot so incremental reasoning can tell them from inferences.
+    key : str
+        Source digest recorded in the header for validation.
+    """
+
+    rows = list(graph)
+    triples, values, kinds, extra, langs = _encode_terms(rows)
+
+    offsets, blob = encode_strings(values)
+
+    if asserted is not None:
+        asserted_set = set(asserted)
+        mask = np.fromiter(
+            (t in asserted_set for t in rows), dtype=bool, count=len(rows)
+        )
+    else:
+        mask = np.zeros(len(rows), dtype=bool)
+
+    header = {
+        "format": FORMAT_VERSION,
+        "key": key,
+        "owlrl": owlrl.__version__,
+        "langs": langs,
+    }
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        np.savez(
+            fh,
+            header=np.frombuffer(json.dumps(header).encode(), np.uint8),
+            triples=triples,
+            asserted=mask,
+            kinds=np.asarray(kinds, dtype=np.uint8),
+            extra=np.asarray(extra, dtype=np.int32).reshape(-1, 2),
+            offsets=offsets,
+            blob=blob,
+        )
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: str, key: str = "") -> Tuple[Graph, Set[Triple]]:
+    """Read a snapshot written by :func:`save_snapshot`.
+
+    Parameters
+    ----------
+    path : str
+        Snapshot file.
+    key : str
+        Expected source digest. An empty string skips the check.
+
+    Returns
+    -------
+    Tuple[Graph, Set[Triple]]
+        The stored graph and the set of triples flagged as asserted.
+
+    Raises
+    ------
+    ValueError
+        If the snapshot format or key does not match.
+    """
+
+    with np.load(path) as data:
+        header = json.loads(data["header"].tobytes().decode())
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format in {path}")
+        if key and header.get("key") != key:
+            raise ValueError(f"Snapshot {path} does not match its source")
+        triples = data["triples"]
+        mask = data["asserted"]
+        kinds = data["kinds"].tolist()
+        extra = data["extra"].tolist()
+        values = decode_strings(data["offsets"], data["blob"])
+
+    langs = header["langs"]
+    terms: list = [None] * len(kinds)
+    for idx, (kind, value) in enumerate(zip(kinds, values)):
+        if kind == _URI:
+            terms[idx] = URIRef(value)
+        elif kind == _BNODE:
+            terms[idx] = BNode(value)
+        else:
+            dtype, lang = extra[idx]
+            terms[idx] = Literal(
+                value,
+                lang=langs[lang] if lang >= 0 else None,
+                datatype=terms[dtype] if dtype >= 0 else None,
+            )
+
+    graph = Graph()
+    asserted: Set[Triple] = set()
+    for (s, p, o), flag in zip(triples.tolist(), mask.tolist()):
+        triple = (terms[s], terms[p], terms[o])
+        graph.add(triple)
+        if flag:
+            asserted.add(triple)
+    return graph, asserted
+
+
+def remove_stale_snapshots(source: str, cache_dir: str, keep: str) -> None:
+    """Delete snapshots of ``source``, and the files derived from them,
+    whose digest differs from the one of ``keep``."""
+
+    prefix = os.path.basename(source) + "."
+    start, end = len(prefix), len(prefix) + 16
+    current = os.path.basename(keep)[start:end]
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if not name.startswith(prefix) or not name.endswith(".npz"):
+            continue
+        # ``<source>.<16 hex digits>[.<kind>].npz`` only
+        digest, rest = name[start:end], name[end:]
+        if not rest.startswith(".") or len(digest) != 16:
+            continue
+        if any(c not in "0123456789abcdef" for c in digest):
+            continue
+        if digest != current:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,109 @@
+"""Mutation counters for in-memory RDF graphs.
+
+``rdflib`` graphs have no notion of version. Code that mutates a shared graph
+in place (see :mod:`ontology.incremental`) reports its changes here, and
+caches derived from a graph key their entries with :func:`graph_key` so a
+stale entry is never served after an update.
+"""
+
+from __future__ import annotations
+
+import itertools
+import weakref
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from rdflib import Graph
+from rdflib.term import Node
+
+Triple = Tuple[Node, Node, Node]
+Listener = Callable[[Graph, Iterable[Triple], Iterable[Triple]], None]
+
+_SERIALS: Dict[int, int] = {}
+_VERSIONS: Dict[int, int] = {}
+_LISTENERS: List[Listener] = []
+_counter = itertools.count(1)
+
+
+def _forget(gid: int) -> None:
+    _SERIALS.pop(gid, None)
+    _VERSIONS.pop(gid, None)
+
+
+def _serial(graph: Graph) -> int:
+    gid = id(graph)
+    if gid not in _SERIALS:
+        _SERIALS[gid] = next(_counter)
+        weakref.finalize(graph, _forget, gid)
+    return _SERIALS[gid]
+
+
+def graph_version(graph: Graph) -> int:
+    """Return how many times ``graph`` was reported as changed."""
+
+    return _VERSIONS.get(id(graph), 0)
+
+
+def graph_key(graph: Graph) -> Tuple[int, int]:
+    """Return a hashable key identifying ``graph`` and its current version.
+
+    The first element is unique for the lifetime of the process, so keys of
+    a garbage-collected graph are never reused by a new one.
+    """
+
+    return _serial(graph), graph_version(graph)
+
+
+def graph_state(graph: Graph) -> Tuple[int, int]:
+    """Return the reported version of ``graph`` together with its size.
+
+    Caches compare this instead of the version alone, so that triples
+    added or removed without :func:`mark_changed` still invalidate them as
+    long as the number of triples changed. ``len`` is constant time on the
+    in-memory store.
+    """
+
+    return graph_version(graph), len(graph)
+
+
+def mark_changed(
+    graph: Graph,
+    added: Iterable[Triple] = (),
+    removed: Iterable[Triple] = (),
+) -> int:
+    """Bump the version of ``graph`` and notify listeners of the delta.
+
+    Parameters
+    ----------
+    graph : Graph
+        Graph that was mutated in place.
+    added : Iterable[Triple]
+        Triples inserted since the previous version.
+    removed : Iterable[Triple]
+        Triples deleted since the previous version.
+
+    Returns
+    -------
+    int
+        The new version number.
+    """
+
+    _serial(graph)
+    version = _VERSIONS.get(id(graph), 0) + 1
+    _VERSIONS[id(graph)] = version
+    for listener in list(_LISTENERS):
+        listener(graph, added, removed)
+    return version
+
+
+def add_listener(listener: Listener) -> None:
+    """Call ``listener(graph, added, removed)`` after every change."""
+
+    if listener not in _LISTENERS:
+        _LISTENERS.append(listener)
+
+
+def remove_listener(listener: Listener) -> None:
+    """Stop notifying ``listener``."""
+
+    if listener in _LISTENERS:
+        _LISTENERS.remove(listener)
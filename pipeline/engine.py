@@ -1,12 +1,28 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Union
+
+import numpy as np
+
+Scores = Union[Dict[Any, float], np.ndarray]
+
+
+def _aligned(candidates: Sequence[Any], scores: Scores) -> np.ndarray:
+    """Scores as an array aligned to ``candidates`` (missing items: 0)."""
+    if isinstance(scores, np.ndarray):
+        return scores.astype(float, copy=False)
+    return np.fromiter(
+        (scores.get(item, 0.0) for item in candidates),
+        dtype=float,
+        count=len(candidates),
+    )
 
 
 def rerank(
     candidates: List[Any],
-    relevance: Dict[Any, float],
-    novelty: Dict[Any, float],
+    relevance: Scores,
+    novelty: Scores,
     alpha: float = 0.5,
     beta: float = 0.5,
+    top_n: Optional[int] = None,
 ) -> List[Any]:
     """Reorder items by serendipity.
 
@@ -17,23 +33,39 @@ def rerank(
     ----------
     candidates : List[Any]
         Items to sort.
-    relevance : Dict[Any, float]
-        Relevance score for each item.
-    novelty : Dict[Any, float]
-        Novelty score for each item.
+    relevance : Dict[Any, float] or np.ndarray
+        Relevance score for each item, or an array aligned to
+        ``candidates``.
+    novelty : Dict[Any, float] or np.ndarray
+        Novelty score for each item, or an array aligned to
+        ``candidates``.
     alpha : float
         Weight of novelty in the combined score.
     beta : float
         Weight of relevance in the combined score.
+    top_n : int, optional
+        Only return the ``top_n`` best items. They are selected with a
+        partial sort and come in the same order as in the full ranking.
 
     Returns
     -------
     List[Any]
-        Candidates ordered from highest to lowest combined score.
+        Candidates ordered from highest to lowest combined score; ties
+        keep the order of ``candidates``.
     """
-    scores = {}
-    for item in candidates:
-        score = alpha * novelty.get(item, 0.0)
-        score += beta * relevance.get(item, 0.0)
-        scores[item] = score
-    return sorted(candidates, key=lambda x: scores[x], reverse=True)
+    n = len(candidates)
+    scores = alpha * _aligned(candidates, novelty)
+    scores += beta * _aligned(candidates, relevance)
+
+    if top_n is not None and top_n < n:
+        if top_n <= 0:
+            return []
+        # the ``top_n``-th best score; ties at it are taken in input order
+        kth = -np.partition(-scores, top_n - 1)[top_n - 1]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[: top_n - len(above)]
+        rows = np.concatenate([above, tied])
+        rows = rows[np.lexsort((rows, -scores[rows]))]
+    else:
+        rows = np.argsort(-scores, kind="stable")
+    return [candidates[i] for i in rows.tolist()]
@@ -1,22 +1,63 @@
 from __future__ import annotations
 
 from typing import List
-from rdflib import Graph
-import gzip
-from typing import Dict
+from rdflib import Graph, Namespace, URIRef
+from rdflib.namespace import RDF
+import os
+from itertools import islice
+from typing import Dict, Optional, Tuple
 
-_GRAPH_CACHE: Dict[str, Graph] = {}
+from ontology.attribute_index import attribute_index, attribute_matrix
+from ontology.graph_cache import GRAPH_CACHE
+from ontology.neighbours import NeighbourTable
+from ontology.queries import register, run
+from ontology.snapshot import default_cache_dir, snapshot_path, source_digest
+
+_GRAPH_CACHE = GRAPH_CACHE
+# ontology path -> ((mtime, size) of the file, SHA-256 of its content)
+_DIGESTS: Dict[str, Tuple[Tuple[int, int], str]] = {}
+# table file -> ((mtime, size) of the file, neighbour table)
+_TABLES: Dict[str, Tuple[Tuple[int, int], NeighbourTable]] = {}
+
+EX = Namespace("http://ex.org/stream#")
+PROP = Namespace("http://www.wikidata.org/prop/direct/")
+# genre, director and cast
+PROPERTIES = (PROP.P136, PROP.P57, PROP.P161)
+
+QUERY = "recommend_logical"
+
+# ``LIMIT`` cannot be bound, so ``top_n`` is applied to the lazy results
+register(
+    QUERY,
+    """
+    PREFIX ex: <http://ex.org/stream#>
+    PREFIX prop: <http://www.wikidata.org/prop/direct/>
+    SELECT DISTINCT ?rec WHERE {
+      VALUES ?p { prop:P136 prop:P57 prop:P161 }
+      ?movie ?p ?v .
+      ?rec ?p ?v .
+      ?rec a ex:Filme .
+      FILTER(?rec != ?movie)
+    }
+    """,
+)
 
 
 def clear_cache() -> None:
-    """Remove all graphs stored in the cache."""
+    """Remove all graphs and neighbour tables stored in the cache."""
 
     _GRAPH_CACHE.clear()
+    _DIGESTS.clear()
+    _TABLES.clear()
 
 
 def _load_graph(path: str) -> Graph:
     """Return an RDF graph, reusing the cache when possible.
 
+    The graph is the ``"raw"`` form held by the shared
+    :data:`GRAPH_CACHE`, derived from the inferred graph of the same file
+    when the serendipity pipeline already loaded it.
+
     Parameters
     ----------
     path : str
@@ -28,16 +69,56 @@ def _load_graph(path: str) -> Graph:
         Loaded RDF graph.
     """
 
-    if path not in _GRAPH_CACHE:
-        g = Graph()
-        if path.endswith(".gz"):
-            with gzip.open(path, "rt", encoding="utf-8") as f:
-                data = f.read()
-            g.parse(data=data, format="turtle")
-        else:
-            g.parse(path, format="turtle")
-        _GRAPH_CACHE[path] = g
-    return _GRAPH_CACHE[path]
+    return _GRAPH_CACHE.get(path, "raw")
+
+
+def _stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _digest(path: str) -> str:
+    """SHA-256 of ``path``, hashed again only when the file changed."""
+
+    stat = _stat(path)
+    cached = _DIGESTS.get(path)
+    if cached is None or cached[0] != stat:
+        cached = _DIGESTS[path] = (stat, source_digest(path))
+    return cached[1]
+
+
+def neighbours_path(ontology_path: str, digest: str = "") -> str:
+    """File of the neighbour table of ``ontology_path``.
+
+    It sits next to the graph snapshot and changes with the dump content,
+    see ``scripts/build_neighbours.py``. ``digest`` is the SHA-256 of the
+    dump when the caller already has it.
+    """
+
+    cache_dir = default_cache_dir(ontology_path)
+    digest = digest or _digest(ontology_path)
+    return snapshot_path(ontology_path, cache_dir, digest, ".neighbours.npy")
+
+
+def _load_table(ontology_path: str) -> Optional[NeighbourTable]:
+    """Neighbour table of the current dump content, if it was built.
+
+    Tables are kept by file and reloaded when the file is rewritten; a
+    missing table is looked for again on the next call.
+    """
+
+    if not os.path.exists(ontology_path):
+        return None
+    path = neighbours_path(ontology_path)
+    try:
+        stat = _stat(path)
+    except FileNotFoundError:
+        _TABLES.pop(path, None)
+        return None
+    cached = _TABLES.get(path)
+    if cached is None or cached[0] != stat:
+        cached = _TABLES[path] = (stat, NeighbourTable.load(path))
+    return cached[1]
 
 
 def recommend_logical(
@@ -45,9 +126,22 @@ def recommend_logical(
     ontology_path: str,
     top_n: int = 5,
     rdf_graph: Graph | None = None,
+    method: str = "index",
 ) -> List[str]:
     """Return logically related movies using the local ontology.
 
+    Movies sharing a genre, director or cast member with ``uri`` are
+    related. By default they are found in an :class:`AttributeIndex` of
+    the graph and ranked by the number of shared attributes.
+    ``"weighted"`` ranks the whole catalog by shared attributes weighted
+    by IDF, so a common genre counts less than a shared director, with one
+    sparse matrix-vector product (see :class:`AttributeMatrix`).
+    ``"table"`` serves the same ranking from the neighbour table built
+    offline for ``ontology_path`` in O(``top_n``), falling back to
+    ``"weighted"`` when there is no table, the movie is not in it or
+    ``top_n`` exceeds its ``k``. ``"sparql"`` runs the equivalent prepared
+    query with ``uri`` bound as ``?movie``, in no particular order.
+
     Parameters
     ----------
     uri : str
@@ -58,23 +152,39 @@ def recommend_logical(
         Already loaded graph to reuse.
     top_n : int
         Maximum number of recommendations.
+    method : str
+        ``"index"``, ``"weighted"``, ``"table"`` or ``"sparql"``.
 
     Returns
     -------
     List[str]
         URIs of recommended movies.
+
+    Raises
+    ------
+    ValueError
+        If ``method`` is unknown.
     """
+    movie = URIRef(uri)
+    if method == "table":
+        table = _load_table(ontology_path)
+        if table is not None and movie in table and top_n <= table.k:
+            return [str(rec) for rec, _ in table.lookup(movie, top_n)]
+        method = "weighted"
     graph = rdf_graph if rdf_graph is not None else _load_graph(ontology_path)
-    query = f"""
-    PREFIX ex: <http://ex.org/stream#>
-    PREFIX prop: <http://www.wikidata.org/prop/direct/>
-    SELECT DISTINCT ?rec WHERE {{
-      VALUES ?p {{ prop:P136 prop:P57 prop:P161 }}
-      <{uri}> ?p ?v .
-      ?rec ?p ?v .
-      ?rec a ex:Filme .
-      FILTER(?rec != <{uri}>)
-    }} LIMIT {top_n}
-    """
-    results = graph.query(query)
-    return [str(r[0]) for r in results]
+    if method == "index":
+        index = attribute_index(graph, PROPERTIES + (RDF.type,))
+        ranked = index.shared(
+            ((index.values(movie, p), p) for p in PROPERTIES),
+            within=index.subjects(RDF.type, EX.Filme),
+            exclude=[movie],
+        )
+        return [str(rec) for rec, _ in ranked[: max(top_n, 0)]]
+    if method == "weighted":
+        matrix = attribute_matrix(graph, PROPERTIES, EX.Filme)
+        ranked = matrix.ranked(movie, top_n, exclude=[movie])
+        return [str(rec) for rec, _ in ranked]
+    if method == "sparql":
+        results = run(graph, QUERY, movie=movie)
+        return [str(r[0]) for r in islice(results, max(top_n, 0))]
+    raise ValueError(f"Unknown method: {method}")
@@ -1,13 +1,26 @@
 """Pipeline to generate serendipitous recommendations."""
 
-from typing import Any, Dict, List, Tuple, Optional
+import logging
+import os
+import threading
+import weakref
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 
 from rdflib import URIRef, Graph
 from rdflib.namespace import RDF
 
-from ontology.build_ontology import build_ontology_graph
+from ontology.graph_cache import GRAPH_CACHE
+from ontology.snapshot import default_cache_dir, snapshot_path
+from ontology.versioning import graph_key, graph_state
 
-from content_recommender.query_by_preference import query_by_preference
+from content_recommender.query_by_preference import (
+    preference_index,
+    query_by_preference,
+)
 
 try:  # pragma: no cover - fallback for PYTHONPATH issues
     from collaborative_recommender.surprise_rs import SurpriseRS
@@ -18,24 +31,49 @@ except ModuleNotFoundError:  # fallback when package not on sys.path
     sys.path.append(str(Path(__file__).resolve().parents[1]))
     from collaborative_recommender.surprise_rs import SurpriseRS
 
-# from serendipity.distance import compute_avg_shortest_path_length
-from serendipity.centrality import compute_betweenness
+from serendipity.metrics import PageRank, compute_personalized_pagerank_novelty
+from serendipity.novelty_index import (
+    USER_METRICS,
+    NoveltyIndex,
+    column_name,
+    detect_communities,
+)
+from serendipity.projection import clear_cache as _clear_projections
+from serendipity.projection import projection
 from .engine import rerank
 
 import networkx as nx
 
-_GRAPH_CACHE: Dict[str, Graph] = {}
+logger = logging.getLogger(__name__)
+
+_GRAPH_CACHE = GRAPH_CACHE
+# ontology path -> novelty table file next to its graph snapshot
+_NOVELTY_PATHS: Dict[str, str] = {}
+# graph serial -> (graph state, novelty table)
+_NOVELTY_CACHE: Dict[int, Tuple[Tuple[int, int], NoveltyIndex]] = {}
+# graph serial -> (graph state, PageRank solver)
+_PAGERANK_CACHE: Dict[int, Tuple[Tuple[int, int], PageRank]] = {}
+# novelty tables, PageRank solvers and projection views are filled lazily;
+# concurrent callers take turns on them
+_NOVELTY_LOCK = threading.RLock()
 
 
 def clear_cache() -> None:
-    """Clear all cached graphs."""
+    """Clear all cached graphs, projections and novelty tables."""
 
     _GRAPH_CACHE.clear()
+    _clear_projections()
+    _NOVELTY_PATHS.clear()
+    _NOVELTY_CACHE.clear()
+    _PAGERANK_CACHE.clear()
 
 
 def _load_graph(path: str) -> Graph:
     """Return an inferred graph, reusing the cache when available.
 
+    Graphs live in the shared :data:`GRAPH_CACHE`, which also serves the
+    logical recommender and drops the graph when the file changes.
+
     Parameters
     ----------
     path : str
@@ -47,9 +85,14 @@ def _load_graph(path: str) -> Graph:
         RDF graph with inferences.
     """
 
-    if path not in _GRAPH_CACHE:
-        _GRAPH_CACHE[path] = build_ontology_graph(path)
-    return _GRAPH_CACHE[path]
+    graph = _GRAPH_CACHE.get(path, "inferred")
+    # named after the content the graph was loaded from, so a rewritten
+    # file does not reuse the table of its previous version
+    digest = _GRAPH_CACHE.digest(path) or ""
+    cache_dir = default_cache_dir(path)
+    suffix = ".novelty.npz"
+    _NOVELTY_PATHS[path] = snapshot_path(path, cache_dir, digest, suffix)
+    return graph
 
 
 BASE = "http://ex.org/stream#"
@@ -59,23 +102,187 @@ def _build_graph(rdf_graph: Graph) -> nx.Graph:
     """Convert an ``rdflib.Graph`` to a simple ``networkx`` graph.
 
     All triples except ``rdf:type`` are considered edges so the novelty metrics
-    operate consistently across different test graphs.
+    operate consistently across different test graphs. The graph comes from
+    the memoized :func:`projection` and is frozen because it is shared.
     """
 
-    graph = nx.Graph()
+    return projection(rdf_graph).networkx()
 
-    for s, p, o in rdf_graph.triples((None, None, None)):
-        if p == RDF.type:
-            # ``rdf:type`` only declares classes and does not add connectivity
-            continue
-        if not isinstance(o, URIRef):
-            # ignore literals to keep only edges between resources
-            continue
-        graph.add_node(s)
-        graph.add_node(o)
-        graph.add_edge(s, o)
 
-    return graph
+def _novelty_scores(
+    rdf_graph: Graph,
+    candidates: List[Any],
+    novelty_metric: str,
+    novelty_params: Optional[Dict[str, Any]] = None,
+    index_path: Optional[str] = None,
+) -> Dict[Any, float]:
+    """Return novelty for ``candidates`` from the per-graph novelty table.
+
+    The table is built once per graph state; the memoized projection is
+    only read, as a :class:`CompactGraph`, when scores are missing. Local
+    metrics are computed for the missing candidates only. With
+    ``index_path`` the table is also read from disk, and written back
+    whenever a column becomes complete, not on every new candidate.
+    Concurrent calls run one at a time.
+    """
+
+    with _NOVELTY_LOCK:
+        return _lookup_novelty(
+            rdf_graph,
+            candidates,
+            novelty_metric,
+            novelty_params,
+            index_path,
+        )
+
+
+def _lookup_novelty(
+    rdf_graph: Graph,
+    candidates: List[Any],
+    novelty_metric: str,
+    novelty_params: Optional[Dict[str, Any]],
+    index_path: Optional[str],
+) -> Dict[Any, float]:
+
+    serial, version = graph_key(rdf_graph)
+    state = graph_state(rdf_graph)
+    cached = _NOVELTY_CACHE.get(serial)
+    if version != 0 or (cached is not None and cached[0] != state):
+        # the file describes the graph as loaded, not after in-place updates
+        index_path = None
+
+    index = previous = None
+    if cached is not None and cached[0] == state:
+        index = cached[1]
+    elif cached is not None:
+        # the graph changed in place: global scores restart from the old ones
+        previous = cached[1]
+    elif index_path is not None and os.path.exists(index_path):
+        try:
+            index = NoveltyIndex.load(index_path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # corrupt or from another version: rebuilt and overwritten
+            message = "Ignoring unreadable novelty table %s"
+            logger.warning(message, index_path, exc_info=True)
+
+    covered = index is not None and index.covers(
+        novelty_metric, novelty_params, candidates
+    )
+    if not covered:
+        graph = projection(rdf_graph).compact()
+        if index is None:
+            index = NoveltyIndex(graph.nodes)
+        communities = None
+        if novelty_metric == "hhi" and index.communities is None:
+            # Louvain depends on node and edge order: run it on the
+            # labelled projection, in the order of the triples
+            communities = detect_communities(projection(rdf_graph).networkx())
+        computed = index.ensure(
+            graph,
+            novelty_metric,
+            novelty_params,
+            candidates,
+            warm_start=previous,
+            communities=communities,
+        )
+        name = column_name(novelty_metric, novelty_params)
+        if index_path is not None and computed and name in index:
+            index.save(index_path)
+    if serial not in _NOVELTY_CACHE:
+        weakref.finalize(rdf_graph, _NOVELTY_CACHE.pop, serial, None)
+    _NOVELTY_CACHE[serial] = (state, index)
+
+    return index.lookup(candidates, novelty_metric, novelty_params)
+
+
+def _pagerank_solver(rdf_graph: Graph) -> PageRank:
+    """Return the PageRank solver of ``rdf_graph``, kept per graph state.
+
+    After an in-place update the solver moves to the new projection and
+    keeps its last solution as the starting point. Callers hold
+    ``_NOVELTY_LOCK``.
+    """
+
+    serial, _ = graph_key(rdf_graph)
+    state = graph_state(rdf_graph)
+    cached = _PAGERANK_CACHE.get(serial)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    graph = projection(rdf_graph).compact()
+    if cached is None:
+        solver = PageRank(graph)
+        weakref.finalize(rdf_graph, _PAGERANK_CACHE.pop, serial, None)
+    else:
+        solver = cached[1]
+        solver.update_graph(graph)
+    _PAGERANK_CACHE[serial] = (state, solver)
+    return solver
+
+
+def _personalized_novelty(
+    rdf_graph: Graph,
+    seeds: Dict[Any, List[Any]],
+    candidates: List[Any],
+    novelty_params: Optional[Dict[str, Any]] = None,
+) -> Dict[Any, Dict[Any, float]]:
+    """Personalized PageRank novelty of ``candidates`` for several users.
+
+    ``seeds`` maps each user to the items they rated; all users are solved
+    in one batch, see :func:`compute_personalized_pagerank_novelty`. The
+    solver is shared, so concurrent calls run one at a time.
+    """
+
+    with _NOVELTY_LOCK:
+        solver = _pagerank_solver(rdf_graph)
+        return compute_personalized_pagerank_novelty(
+            solver.graph,
+            seeds,
+            candidates,
+            solver=solver,
+            **(novelty_params or {}),
+        )
+
+
+def _ratings_uri(
+    ratings: Dict[Tuple[Any, Any], float],
+) -> Dict[Tuple[Any, URIRef], float]:
+    """Convert rating items to URIRefs for compatibility."""
+
+    return {
+        (u, URIRef(BASE + i) if not isinstance(i, URIRef) else i): r
+        for (u, i), r in ratings.items()
+    }
+
+
+def _select_candidates(
+    rdf_graph: Graph,
+    user_id: Any,
+    rs: SurpriseRS,
+    candidate_k: Optional[int] = None,
+) -> List[Any]:
+    """Candidates of ``user_id``: content matches, else a fallback.
+
+    Without content matches the ``candidate_k`` items ``rs`` ranks highest
+    are used, or every movie when ``candidate_k`` is not given.
+    """
+
+    user_uri = BASE + str(user_id)
+    # returns a list of local names, e.g. ["videoA", "videoB"]
+    candidate_names = query_by_preference(rdf_graph, user_uri)
+    # convert back to URIRefs
+    candidates = [URIRef(BASE + name) for name in candidate_names]
+
+    if not candidates and candidate_k is not None:
+        candidates = rs.top_k(user_id, candidate_k)
+    if not candidates:
+        video_class = URIRef(BASE + "Filme")
+        triples = rdf_graph.triples((None, RDF.type, video_class))
+        candidates = [subj for subj, _, _ in triples]
+    return candidates
+
+
+def _local_names(ordered: List[Any]) -> List[str]:
+    return [str(uri).split("#")[-1] for uri in ordered]
 
 
 def generate_recommendations(
@@ -87,6 +294,9 @@ def generate_recommendations(
     beta: float = 0.5,
     novelty_metric: str = "betweenness",
     rdf_graph: Optional[Graph] = None,
+    novelty_params: Optional[Dict[str, Any]] = None,
+    model: Optional[SurpriseRS] = None,
+    candidate_k: Optional[int] = None,
 ) -> List[str]:
     """Generate hybrid recommendations based on content and collaboration.
 
@@ -107,7 +317,20 @@ def generate_recommendations(
     beta : float
         Weight of relevance.
     novelty_metric : str
-        Novelty metric to compute.
+        Novelty metric to compute. ``"personalized_pagerank"`` measures
+        novelty from the items ``user_id`` rated in ``ratings``; the other
+        metrics are the same for every user.
+    novelty_params : Dict[str, Any], optional
+        Extra arguments for the metric, e.g. ``{"k": 256}`` or
+        ``{"epsilon": 0.01}`` to approximate betweenness by sampling.
+    model : SurpriseRS, optional
+        Already fitted collaborative model to reuse, e.g. one kept up to
+        date with :meth:`SurpriseRS.add_rating`. A new model is fitted on
+        ``ratings`` when omitted.
+    candidate_k : int, optional
+        When content filtering finds nothing, take the ``candidate_k``
+        items the collaborative model ranks highest, from its item
+        embedding index, instead of every movie.
 
     Returns
     -------
@@ -116,70 +339,159 @@ def generate_recommendations(
     """
 
     # 1. Load the inferred graph, optionally reusing an existing instance
-    # fmt: off
-    rdf_graph = (
-        rdf_graph if rdf_graph is not None else _load_graph(ontology_path)
-    )
-    # fmt: on
-
-    # 2. Select candidates using content-based SPARQL filters
-
-    user_uri = BASE + str(user_id)
-    # returns a list of local names, e.g. ["videoA", "videoB"]
-    candidate_names = query_by_preference(rdf_graph, user_uri)
-    # convert back to URIRefs
-    candidates = [URIRef(BASE + name) for name in candidate_names]
+    index_path = None
+    if rdf_graph is None:
+        rdf_graph = _load_graph(ontology_path)
+        index_path = _NOVELTY_PATHS.get(ontology_path)
+
+    # 2. Train (unless a fitted model is given) the collaborative model
+    ratings_uri = _ratings_uri(ratings)
+    rs = model
+    if rs is None:
+        rs = SurpriseRS()
+        rs.fit(ratings_uri)
+
+    # 3. Select candidates using content-based SPARQL filters, falling back
+    # to the collaborative top-K or to all movies, and predict relevance
+    candidates = _select_candidates(rdf_graph, user_id, rs, candidate_k)
+    relevance = rs.predict(user_id, candidates)
 
-    # If no candidate is found by content filtering fall back to all movies
-    if not candidates:
-        video_class = URIRef(BASE + "Filme")
-        triples = rdf_graph.triples((None, RDF.type, video_class))
-        candidates = [subj for subj, _, _ in triples]
+    # 4. Look up novelty in the precomputed per-graph table, or personalize
+    # it on the items the user rated
+    if novelty_metric in USER_METRICS:
+        seeds = {user_id: [i for u, i in ratings_uri if u == user_id]}
+        novelty = _personalized_novelty(
+            rdf_graph,
+            seeds,
+            candidates,
+            novelty_params,
+        )[user_id]
+    else:
+        novelty = _novelty_scores(
+            rdf_graph,
+            candidates,
+            novelty_metric,
+            novelty_params,
+            index_path=index_path,
+        )
 
-    # 3. Train and predict collaborative relevance
-    rs = SurpriseRS()
-    # convert rating items to URIRefs for compatibility
-    ratings_uri = {
-        (u, URIRef(BASE + i) if not isinstance(i, URIRef) else i): r
-        for (u, i), r in ratings.items()
-    }
-    rs.fit(ratings_uri)
-    relevance = rs.predict(user_id, candidates)
+    # 5. Re-rank candidates
+    ordered = rerank(candidates, relevance, novelty, alpha, beta, top_n)
 
-    # 4. Compute novelty from the graph
-    graph_nx = _build_graph(rdf_graph)
+    # 6. Extract local names, ``rerank`` already kept the ``top_n`` best
+    return _local_names(ordered)
 
-    from serendipity.metrics import (
-        compute_clustering_coefficient,
-        compute_pagerank,
-        compute_hhi,
-    )
 
-    if novelty_metric == "betweenness":
-        novelty_full = compute_betweenness(graph_nx)
-    elif novelty_metric == "avg_shortest_path":
-        from serendipity.distance import compute_avg_shortest_path_length
-
-        novelty_full = compute_avg_shortest_path_length(graph_nx)
-    elif novelty_metric == "clustering":
-        novelty_full = compute_clustering_coefficient(graph_nx)
-    elif novelty_metric == "pagerank":
-        novelty_full = compute_pagerank(graph_nx)
-    elif novelty_metric == "hhi":
-        from networkx.algorithms import community
-
-        communities = {}
-        louvain = community.louvain_communities(graph_nx, seed=42)
-        for cid, comm in enumerate(louvain):
-            for node in comm:
-                communities[node] = cid
-        novelty_full = compute_hhi(graph_nx, communities)
-    else:
-        raise ValueError(f"Unknown novelty_metric: {novelty_metric}")
-    novelty = {c: novelty_full.get(c, 0.0) for c in candidates}
+def generate_recommendations_batch(
+    user_ids: Iterable[Any],
+    ratings: Dict[Tuple[Any, Any], float],
+    ontology_path: str,
+    top_n: int = 10,
+    alpha: float = 0.5,
+    beta: float = 0.5,
+    novelty_metric: str = "betweenness",
+    rdf_graph: Optional[Graph] = None,
+    novelty_params: Optional[Dict[str, Any]] = None,
+    model: Optional[SurpriseRS] = None,
+    candidate_k: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    chunk_size: int = 64,
+) -> Iterator[Tuple[Any, List[str]]]:
+    """Generate recommendations for many users in one pass.
+
+    The graph, the novelty table and the collaborative model are loaded or
+    fitted once and shared by every user, and the indexes they are read
+    through are built before any worker starts. Users are processed in
+    chunks: novelty is looked up (or, for ``"personalized_pagerank"``,
+    solved) once per chunk for the union of its candidates, which is where
+    the batch saves most of its time.
+
+    Candidate selection and reranking are handed to a thread pool, but
+    they are mostly Python code holding the GIL; only the numpy parts
+    (relevance prediction, the embedding index fallback) run in parallel.
 
-    # 5. Re-rank candidates
-    ordered = rerank(candidates, relevance, novelty, alpha, beta)
+    Parameters
+    ----------
+    user_ids : Iterable[Any]
+        Users to recommend for.
+    n_jobs : int, optional
+        Worker threads for selection and reranking, by default the number
+        of CPUs.
+    chunk_size : int
+        Users per chunk.
+
+    The other parameters are those of :func:`generate_recommendations`.
+
+    Yields
+    ------
+    Tuple[Any, List[str]]
+        ``(user_id, recommendations)`` as each user completes, so the
+        order may differ from ``user_ids``. Each list equals what
+        :func:`generate_recommendations` returns for that user.
+    """
 
-    # 6. Extract local names and limit to ``top_n``
-    return [str(uri).split("#")[-1] for uri in ordered[:top_n]]
+    index_path = None
+    if rdf_graph is None:
+        rdf_graph = _load_graph(ontology_path)
+        index_path = _NOVELTY_PATHS.get(ontology_path)
+
+    ratings_uri = _ratings_uri(ratings)
+    rs = model
+    if rs is None:
+        rs = SurpriseRS()
+        rs.fit(ratings_uri)
+    rated: Dict[Any, List[Any]] = defaultdict(list)
+    for u, i in ratings_uri:
+        rated[u].append(i)
+    # built lazily otherwise, by whichever workers get there first
+    preference_index(rdf_graph)
+    if candidate_k is not None:
+        rs.current_index()
+
+    def select(user_id: Any) -> List[Any]:
+        return _select_candidates(rdf_graph, user_id, rs, candidate_k)
+
+    def rank(
+        user_id: Any,
+        candidates: List[Any],
+        novelty: Dict[Any, float],
+    ) -> List[str]:
+        relevance = rs.predict(user_id, candidates)
+        ordered = rerank(candidates, relevance, novelty, alpha, beta, top_n)
+        return _local_names(ordered)
+
+    users = iter(user_ids)
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        while True:
+            chunk = list(islice(users, chunk_size))
+            if not chunk:
+                break
+            candidates = dict(zip(chunk, pool.map(select, chunk)))
+            union = list(dict.fromkeys(chain(*candidates.values())))
+
+            # novelty is computed in this thread: the tables and the
+            # PageRank solver are shared and not safe to fill concurrently
+            if novelty_metric in USER_METRICS:
+                seeds = {user_id: rated[user_id] for user_id in chunk}
+                novelty = _personalized_novelty(
+                    rdf_graph,
+                    seeds,
+                    union,
+                    novelty_params,
+                )
+            else:
+                shared = _novelty_scores(
+                    rdf_graph,
+                    union,
+                    novelty_metric,
+                    novelty_params,
+                    index_path=index_path,
+                )
+                novelty = dict.fromkeys(chunk, shared)
+
+            futures = {}
+            for user_id in chunk:
+                args = (user_id, candidates[user_id], novelty[user_id])
+                futures[pool.submit(rank, *args)] = user_id
+            for future in as_completed(futures):
+                yield futures[future], future.result()
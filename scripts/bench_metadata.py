@@ -0,0 +1,84 @@
+"""Mede o tempo para resolver os metadados de uma página de filmes.
+
+Sobe um endpoint SPARQL local (:mod:`metadata.fake_sparql`) com uma latência
+fixa por requisição, no papel do Wikidata, e compara a busca anterior (duas
+requisições sequenciais por filme, uma para label e ano e outra para a
+imagem) com :class:`metadata.service.MetadataService`, que agrupa os QIDs
+em consultas ``VALUES`` enviadas em paralelo.
+
+Uso::
+
+    python scripts/bench_metadata.py
+    python scripts/bench_metadata.py --films 1000 --latency 0.05 --workers 8
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from metadata.fake_sparql import ENTITY, FakeSparqlServer  # noqa: E402
+from metadata.service import MetadataService  # noqa: E402
+
+
+def fetch_one_by_one(url: str, uris):
+    """Versão anterior: uma requisição para label e ano, outra para imagem."""
+
+    found = {}
+    for uri in uris:
+        qid = uri.split("/")[-1]
+        values = f"VALUES ?item {{ wd:{qid} }}"
+        for query in (f"SELECT ?l ?date {values}", f"SELECT ?img {values}"):
+            resp = requests.get(url, params={"query": query}, timeout=10)
+            resp.raise_for_status()
+            found.setdefault(uri, []).append(resp.json())
+    return found
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench(args) -> None:
+    items = {
+        f"Q{i}": {"label": f"Filme {i}", "date": "2000-01-01"}
+        for i in range(1, args.films + 1)
+    }
+    uris = [ENTITY + q for q in items]
+    print(f"filmes={args.films} latência={args.latency * 1e3:.0f}ms")
+
+    with FakeSparqlServer(items, latency=args.latency) as server:
+        _, t_old = _timed(fetch_one_by_one, server.url, uris)
+        old_requests, server.requests = server.requests, 0
+        service = MetadataService(
+            server.url,
+            batch_size=args.batch_size,
+            max_workers=args.workers,
+        )
+        found, t_new = _timed(service.fetch, uris)
+        assert all(found[u].label.startswith("Filme") for u in uris)
+
+        print(f"  sequencial  {t_old:7.2f}s  requisições={old_requests}")
+        print(
+            f"  em lotes    {t_new:7.2f}s  requisições={server.requests}"
+            f"  ganho={t_old / t_new:6.1f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--films", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    bench(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
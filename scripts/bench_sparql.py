@@ -0,0 +1,195 @@
+"""Mede a latência das consultas de preferência e de filmes relacionados.
+
+Monta um grafo sintético com usuários, preferências e filmes e compara,
+para ``query_by_preference`` e ``recommend_logical``, o tempo médio por
+chamada do texto SPARQL montado com f-string (analisado e compilado a cada
+vez), da consulta preparada executada com ``initBindings`` e do índice
+invertido de atributos (:mod:`ontology.attribute_index`), além do ranking
+ponderado por IDF de ``recommend_logical``.
+
+Uso::
+
+    python scripts/bench_sparql.py
+    python scripts/bench_sparql.py --movies 20000 --calls 200
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from rdflib import Graph, Namespace
+from rdflib.namespace import RDF
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from content_recommender.query_by_preference import (  # noqa: E402
+    query_by_preference,
+)
+from pipeline.generate_logical_recommendations import (  # noqa: E402
+    recommend_logical,
+)
+
+AV = Namespace("http://amazingvideo.org#")
+EX = Namespace("http://ex.org/stream#")
+PROP = Namespace("http://www.wikidata.org/prop/direct/")
+
+
+def synthetic_graph(n_users: int, n_movies: int, seed: int) -> Graph:
+    """Usuários com preferências e filmes com temática, ator e diretor."""
+
+    rng = random.Random(seed)
+    g = Graph()
+    pools = {"tematica": 30, "temAtor": 2000, "temDiretor": 500}
+    prefs = {
+        "tematica": "prefereTematica",
+        "temAtor": "prefereAtor",
+        "temDiretor": "prefereDiretor",
+    }
+    wikidata = {"tematica": "P136", "temAtor": "P161", "temDiretor": "P57"}
+    for m in range(n_movies):
+        movie = EX[f"m{m}"]
+        g.add((AV[f"m{m}"], RDF.type, AV.Filme))
+        g.add((movie, RDF.type, EX.Filme))
+        for prop, size in pools.items():
+            value = AV[f"{prop}{rng.randrange(size)}"]
+            g.add((AV[f"m{m}"], AV[prop], value))
+            g.add((movie, PROP[wikidata[prop]], value))
+    for u in range(n_users):
+        for prop, size in pools.items():
+            value = AV[f"{prop}{rng.randrange(size)}"]
+            g.add((AV[f"u{u}"], AV[prefs[prop]], value))
+    return g
+
+
+def by_preference_fstring(rdf_graph: Graph, user_uri: str):
+    """Versão anterior: o URI do usuário entra no texto da consulta."""
+
+    sparql = f"""
+    PREFIX : <http://amazingvideo.org#>
+
+    SELECT DISTINCT ?filme WHERE {{
+      {{ <{user_uri}> :prefereTematica ?t .
+         ?filme        :tematica       ?t . }}
+      UNION
+      {{ <{user_uri}> :prefereAtor    ?a .
+         ?filme        :temAtor        ?a . }}
+      UNION
+      {{ <{user_uri}> :prefereDiretor ?d .
+         ?filme        :temDiretor     ?d . }}
+    }}
+    """
+    return [str(row[0]).split("#")[-1] for row in rdf_graph.query(sparql)]
+
+
+def logical_fstring(rdf_graph: Graph, uri: str, top_n: int):
+    """Versão anterior de ``recommend_logical``."""
+
+    query = f"""
+    PREFIX ex: <http://ex.org/stream#>
+    PREFIX prop: <http://www.wikidata.org/prop/direct/>
+    SELECT DISTINCT ?rec WHERE {{
+      VALUES ?p {{ prop:P136 prop:P57 prop:P161 }}
+      <{uri}> ?p ?v .
+      ?rec ?p ?v .
+      ?rec a ex:Filme .
+      FILTER(?rec != <{uri}>)
+    }} LIMIT {top_n}
+    """
+    return [str(r[0]) for r in rdf_graph.query(query)]
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _per_call(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list)
+
+
+def bench(args) -> None:
+    g = synthetic_graph(args.users, args.movies, args.seed)
+    rng = random.Random(args.seed)
+    draws = range(args.calls)
+    users = [str(AV[f"u{rng.randrange(args.users)}"]) for _ in draws]
+    movies = [str(EX[f"m{rng.randrange(args.movies)}"]) for _ in draws]
+    print(f"triplas={len(g)} chamadas={args.calls}")
+
+    # o índice é montado uma vez por grafo; a primeira chamada paga isso
+    _, t_build = _timed(query_by_preference, g, users[0])
+    print(f"  índice de preferências montado em {t_build * 1e3:.1f}ms")
+    _, t_build = _timed(recommend_logical, movies[0], "", 1, g)
+    print(f"  índice de atributos montado em {t_build * 1e3:.1f}ms")
+
+    # confere que as versões encontram os mesmos filmes
+    everything = args.movies
+    for user, movie in zip(users[:5], movies[:5]):
+        before = set(by_preference_fstring(g, user))
+        for method in ("sparql", "index"):
+            assert before == set(query_by_preference(g, user, method))
+        before = set(logical_fstring(g, movie, everything))
+        for method in ("sparql", "index"):
+            found = recommend_logical(movie, "", everything, g, method)
+            assert before == set(found)
+
+    def logical(method):
+        def run(graph, uri, n):
+            return recommend_logical(uri, "", n, graph, method)
+
+        return run
+
+    def by_preference(method):
+        return lambda graph, uri: query_by_preference(graph, uri, method)
+
+    user_args = [(g, u) for u in users]
+    movie_args = [(g, m, args.top_n) for m in movies]
+    cases = {
+        "query_by_preference": (
+            [by_preference_fstring, by_preference("sparql")],
+            by_preference("index"),
+            user_args,
+        ),
+        "recommend_logical": (
+            [logical_fstring, logical("sparql")],
+            logical("index"),
+            movie_args,
+        ),
+    }
+    for name, ((fstring, sparql), index, fn_args) in cases.items():
+        t_old = _per_call(fstring, fn_args)
+        t_sparql = _per_call(sparql, fn_args)
+        t_index = _per_call(index, fn_args)
+        print(
+            f"  {name:<20} f-string={t_old * 1e3:7.2f}ms"
+            f"  preparada={t_sparql * 1e3:7.2f}ms"
+            f"  índice={t_index * 1e3:7.3f}ms"
+            f"  ganho={t_old / t_index:6.1f}x"
+        )
+
+    # ranking ponderado por IDF: um produto matriz esparsa × vetor
+    _, t_build = _timed(logical("weighted"), g, movies[0], 1)
+    t_weighted = _per_call(logical("weighted"), movie_args)
+    print(
+        f"  {'recommend_logical':<20} ponderado={t_weighted * 1e3:7.3f}ms"
+        f"  (matriz montada em {t_build * 1e3:.1f}ms)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    bench(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
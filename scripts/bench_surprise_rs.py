@@ -0,0 +1,115 @@
+"""Compara o modelo de médias com o modelo de fatores latentes do SurpriseRS.
+
+Gera avaliações sintéticas a partir de fatores latentes conhecidos, separa
+uma parte para teste e mede, para cada algoritmo, a vazão do treino
+(avaliações por segundo), a latência de ``predict`` para um usuário e de
+``predict_batch`` para uma matriz usuários × candidatos, e o RMSE.
+
+Uso::
+
+    python scripts/bench_surprise_rs.py
+    python scripts/bench_surprise_rs.py --users 20000 --items 5000 \
+        --ratings 1000000 --candidates 200 --lr 0.01 --epochs 40
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from collaborative_recommender.surprise_rs import SurpriseRS  # noqa: E402
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def synthetic_ratings(n_users: int, n_items: int, n_ratings: int, seed: int):
+    """Avaliações de 1 a 5 geradas por fatores latentes mais ruído."""
+
+    rng = np.random.default_rng(seed)
+    users = rng.normal(0.0, 1.0, (n_users, 8))
+    items = rng.normal(0.0, 1.0, (n_items, 8))
+    u = rng.integers(n_users, size=n_ratings)
+    i = rng.integers(n_items, size=n_ratings)
+    values = 3.0 + 0.5 * (users[u] * items[i]).sum(axis=1)
+    values = np.clip(values + rng.normal(0.0, 0.3, n_ratings), 1.0, 5.0)
+    return {
+        (f"u{a}", f"i{b}"): float(v)
+        for a, b, v in zip(u.tolist(), i.tolist(), values.tolist())
+    }
+
+
+def _scores_by_user(model: SurpriseRS, ratings: dict):
+    """Previsões dos pares de ``ratings``, uma chamada por usuário."""
+
+    by_user = defaultdict(list)
+    for (user, item), value in ratings.items():
+        by_user[user].append((item, value))
+    for user, pairs in by_user.items():
+        items, truth = zip(*pairs)
+        yield model.predict_batch([user], items)[0], truth
+
+
+def bench(args) -> None:
+    sizes = (args.users, args.items, args.ratings)
+    ratings = synthetic_ratings(*sizes, seed=args.seed)
+    keys = list(ratings)
+    np.random.default_rng(args.seed).shuffle(keys)
+    split = int(0.9 * len(keys))
+    train = {k: ratings[k] for k in keys[:split]}
+    test = {k: ratings[k] for k in keys[split:]}
+
+    rng = np.random.default_rng(args.seed)
+    users = [f"u{u}" for u in rng.integers(args.users, size=args.batch)]
+    items = rng.integers(args.items, size=args.candidates)
+    candidates = [f"i{i}" for i in items]
+    print(f"ratings={len(train)} users={args.users} items={args.items}")
+
+    for algorithm in ("mean", "svd"):
+        model = SurpriseRS(
+            algorithm,
+            n_factors=args.factors,
+            n_epochs=args.epochs,
+            lr=args.lr,
+            seed=args.seed,
+        )
+        _, t_fit = _timed(model.fit, train)
+        _, t_one = _timed(model.predict, users[0], candidates)
+        _, t_batch = _timed(model.predict_batch, users, candidates)
+
+        pairs = _scores_by_user(model, test)
+        errors = np.concatenate([s - np.array(t) for s, t in pairs])
+        rmse = np.sqrt(np.mean(errors**2))
+        throughput = len(train) / t_fit
+        print(
+            f"  {algorithm:<5} fit={t_fit:7.2f}s ({throughput:9.0f} aval/s)"
+            f"  predict={t_one * 1e3:7.2f}ms"
+            f"  predict_batch[{len(users)}x{len(candidates)}]"
+            f"={t_batch * 1e3:7.2f}ms  rmse={rmse:.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--ratings", type=int, default=100000)
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--factors", type=int, default=50)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--lr", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=42)
+    bench(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
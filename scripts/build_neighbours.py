@@ -0,0 +1,66 @@
+"""Pré-calcula os vizinhos lógicos de todos os filmes do dump.
+
+Para cada ``ex:Filme`` guarda os ``k`` filmes que mais compartilham gênero,
+diretor e elenco, com pesos IDF (o ranking ``"weighted"`` de
+``recommend_logical``), numa tabela mapeada em memória ao lado do snapshot
+do grafo. Depois disso ``recommend_logical(..., method="table")`` responde
+em O(k) sem tocar no grafo.
+
+Uso::
+
+    python scripts/build_neighbours.py
+    python scripts/build_neighbours.py data/raw/serendipity_films_full.ttl.gz \
+        --k 100 --chunk-size 2048 --jobs 4
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from ontology.attribute_index import attribute_matrix  # noqa: E402
+from ontology.graph_cache import GRAPH_CACHE  # noqa: E402
+from ontology.neighbours import compute_neighbours  # noqa: E402
+from pipeline.generate_logical_recommendations import (  # noqa: E402
+    EX,
+    PROPERTIES,
+    _load_graph,
+    neighbours_path,
+)
+
+DEFAULT_DUMP = "data/raw/serendipity_films_full.ttl.gz"
+
+
+def build(path: str, k: int, chunk_size: int, n_jobs=None) -> str:
+    """Calcula e grava a tabela de ``path``; devolve o arquivo gerado."""
+
+    start = time.perf_counter()
+    graph = _load_graph(path)
+    matrix = attribute_matrix(graph, PROPERTIES, EX.Filme)
+    loaded = time.perf_counter()
+    table = compute_neighbours(matrix, k, chunk_size, n_jobs)
+    computed = time.perf_counter()
+    out = neighbours_path(path, GRAPH_CACHE.digest(path) or "")
+    table.save(out)
+    print(
+        f"filmes={len(table.nodes)} atributos={len(matrix.columns)} k={k}"
+        f"  grafo={loaded - start:.1f}s vizinhos={computed - loaded:.1f}s"
+    )
+    print(f"tabela gravada em {out}")
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default=DEFAULT_DUMP)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+    build(args.path, args.k, args.chunk_size, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
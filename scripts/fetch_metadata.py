@@ -1,59 +1,201 @@
+"""Baixa do Wikidata os metadados de todos os filmes do dump local.
+
+Para cada filme são obtidos label, ano de lançamento (P577) e imagem (P18),
+e também os labels dos gêneros (P136), diretores (P57) e elenco (P161). Os
+QIDs são agrupados em consultas ``VALUES`` enviadas em paralelo por
+:class:`metadata.service.MetadataService`, com limite de requisições por
+segundo e novas tentativas com espera exponencial.
+
+Cada bloco resolvido é gravado no cache de metadados em disco
+(:mod:`metadata.cache`), que serve de checkpoint: se a execução for
+interrompida, a próxima só busca o que falta. O mesmo cache é lido pelas
+interfaces. Ao final, os itens resolvidos são exportados para
+``data/metadata.json``; os que falharam ficam de fora e são contados.
+
+Uso::
+
+    python scripts/fetch_metadata.py
+    python scripts/fetch_metadata.py --workers 8 --rate 5 --no-entities
+"""
+
+import argparse
 import json
-import gzip
+import sys
+import time
 from pathlib import Path
+from typing import Dict, List
+
 from rdflib import Graph, URIRef
-import requests
+from rdflib.namespace import RDF
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from metadata.cache import MetadataCache  # noqa: E402
+from metadata.service import (  # noqa: E402
+    WIKIDATA_URL,
+    Metadata,
+    MetadataService,
+    qid,
+)
+from ontology.graph_cache import GRAPH_CACHE  # noqa: E402
 
 DATA_PATH = Path("data/raw/serendipity_films_full.ttl.gz")
 OUT_PATH = Path("data/metadata.json")
-WIKIDATA_URL = "https://query.wikidata.org/sparql"
+FILME = URIRef("http://ex.org/stream#Filme")
+PROP = "http://www.wikidata.org/prop/direct/"
+ENTITY_PROPERTIES = [URIRef(PROP + p) for p in ("P136", "P57", "P161")]
+
+
+def load_graph(path: Path) -> Graph:
+    """Grafo do dump local, compartilhado pelo cache de grafos."""
+    return GRAPH_CACHE.get(str(path), "raw")
 
 
-def load_uris(path: Path) -> list[str]:
+def load_uris(path: Path) -> List[str]:
     """Extrai URIs de filmes do dump local."""
-    g = Graph()
-    with gzip.open(path, "rt", encoding="utf-8") as f:
-        data = f.read()
-    g.parse(data=data, format="turtle")
-    ex = "http://ex.org/stream#"
-    query = "PREFIX ex: <http://ex.org/stream#> SELECT DISTINCT ?f WHERE { ?f a ex:Filme . }"
-    return [str(r.f) for r in g.query(query)]
-
-
-def fetch_label_year(uri: str) -> tuple[str, str | None]:
-    """Consulta label e ano de lançamento no Wikidata."""
-    qid = uri.split("/")[-1]
-    sparql = f"SELECT ?l ?date WHERE {{ OPTIONAL {{ wd:{qid} rdfs:label ?l FILTER(lang(?l)='en') }} OPTIONAL {{ wd:{qid} wdt:P577 ?date }} }} LIMIT 1"
-    try:
-        resp = requests.get(
-            WIKIDATA_URL,
-            params={"query": sparql},
-            headers={"Accept": "application/sparql-results+json"},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        bindings = resp.json().get("results", {}).get("bindings", [])
-        if bindings:
-            b = bindings[0]
-            label = b.get("l", {}).get("value", qid)
-            date = b.get("date", {}).get("value")
-            return label, date[:4] if date else None
-    except Exception:
-        pass
-    return qid, None
-
-
-def build_metadata() -> None:
-    """Gera arquivo JSON com labels e anos."""
-    uris = load_uris(DATA_PATH)
-    data = {}
-    for uri in uris:
-        label, year = fetch_label_year(uri)
-        data[uri.split("/")[-1]] = {"label": label, "year": year}
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with OUT_PATH.open("w", encoding="utf-8") as fh:
+    g = load_graph(path)
+    return sorted({str(f) for f in g.subjects(RDF.type, FILME)})
+
+
+def entity_uris(g: Graph, films: List[str]) -> List[str]:
+    """Gêneros, diretores e atores dos filmes, sem repetição."""
+    found = {
+        str(o)
+        for f in films
+        for p in ENTITY_PROPERTIES
+        for o in g.objects(URIRef(f), p)
+    }
+    return sorted(found)
+
+
+def fetch_all(
+    service: MetadataService,
+    uris: List[str],
+    chunk_size: int,
+) -> Dict[str, Metadata]:
+    """Resolve ``uris`` em blocos, gravando cada bloco no cache.
+
+    Mostra o progresso e a vazão (itens por segundo) a cada bloco. Itens
+    sem resposta do Wikidata, por falha ou por não existirem, não entram
+    no resultado.
+    """
+    found: Dict[str, Metadata] = {}
+    start = time.perf_counter()
+    for i in range(0, len(uris), chunk_size):
+        chunk = uris[i : i + chunk_size]  # noqa: E203
+        resolved = service.resolve(qid(u) for u in chunk)
+        for uri in chunk:
+            if qid(uri) in resolved:
+                found[uri] = resolved[qid(uri)]
+        done = min(i + chunk_size, len(uris))
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else float("inf")
+        speed = f"{elapsed:6.1f}s  {rate:8.1f} itens/s"
+        print(f"  {done}/{len(uris)} itens  {speed}", flush=True)
+    return found
+
+
+def build_metadata(
+    data_path: Path = DATA_PATH,
+    out_path: Path = OUT_PATH,
+    service: MetadataService | None = None,
+    entities: bool = True,
+    chunk_size: int = 2000,
+) -> Dict[str, Dict[str, str | None]]:
+    """Gera arquivo JSON com labels, anos e imagens, indexado por QID.
+
+    Só entram os itens resolvidos; as interfaces mostram o QID dos demais.
+
+    Parameters
+    ----------
+    data_path : Path
+        Dump local com os filmes.
+    out_path : Path
+        Arquivo JSON gerado.
+    service : MetadataService, optional
+        Cliente usado; por padrão, o Wikidata com o cache em disco.
+    entities : bool
+        Inclui gêneros, diretores e elenco dos filmes.
+    chunk_size : int
+        Itens resolvidos (e gravados no cache) por vez.
+    """
+    if service is None:
+        service = default_service()
+    films = load_uris(data_path)
+    uris = list(films)
+    if entities:
+        uris += entity_uris(load_graph(data_path), films)
+    print(f"{len(films)} filmes, {len(uris)} itens")
+
+    found = fetch_all(service, uris, chunk_size)
+    data = {
+        qid(uri): {"label": m.label, "year": m.year, "image": m.image}
+        for uri, m in found.items()
+    }
+    missing = len(uris) - len(found)
+    if missing:
+        print(f"itens sem metadados: {missing} (nova execução tenta de novo)")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
         json.dump(data, fh, ensure_ascii=False, indent=2)
+    tmp.replace(out_path)
+    return data
+
+
+def default_service(
+    batch_size: int = 200,
+    workers: int = 4,
+    rate: float | None = 5.0,
+    retries: int = 5,
+) -> MetadataService:
+    """Cliente do Wikidata para a carga completa.
+
+    Falhas não ficam no cache (``negative_ttl=0``): uma nova execução
+    tenta de novo os itens que faltaram.
+    """
+    return MetadataService(
+        WIKIDATA_URL,
+        batch_size=batch_size,
+        max_workers=workers,
+        timeout=60.0,
+        cache=MetadataCache(negative_ttl=0),
+        retries=retries,
+        max_rate=rate,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", type=Path, default=DATA_PATH)
+    parser.add_argument("--out", type=Path, default=OUT_PATH)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=5.0,
+        help="requisições por segundo (0 para não limitar)",
+    )
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--no-entities", action="store_true")
+    args = parser.parse_args()
+
+    service = default_service(
+        args.batch_size,
+        args.workers,
+        args.rate or None,
+        args.retries,
+    )
+    chunk_size = args.batch_size * args.workers * 2
+    build_metadata(
+        args.data,
+        args.out,
+        service,
+        not args.no_entities,
+        chunk_size,
+    )
 
 
 if __name__ == "__main__":
-    build_metadata()
+    main()
@@ -1,8 +1,254 @@
+import math
+import random
+from collections import deque
+
 import networkx as nx
-from typing import Dict, Any
+import numpy as np
+from scipy.sparse import csgraph
+from typing import Dict, Any, Iterable, Optional
+
+from serendipity.compact import CompactGraph
+
+
+def compute_betweenness(
+    graph: nx.Graph,
+    k: Optional[int] = None,
+    epsilon: Optional[float] = None,
+    delta: float = 0.1,
+    seed: Optional[int] = None,
+    nodes: Optional[Iterable[Any]] = None,
+) -> Dict[Any, float]:
+    """Compute (optionally approximate) betweenness centrality for all nodes.
+
+    Scores are normalized as in ``nx.betweenness_centrality``.
+
+    Parameters
+    ----------
+    graph : nx.Graph or CompactGraph
+        Undirected graph. A :class:`CompactGraph` runs Brandes' algorithm
+        as sparse matrix products over blocks of sources.
+    k : int, optional
+        Use ``k`` sampled source pivots instead of every node.
+    epsilon : float, optional
+        Use shortest-path sampling with an additive error bound: with
+        probability ``1 - delta`` every returned score, in the
+        ``networkx`` normalization, is within ``epsilon`` of the exact one
+        (Riondato & Kornaropoulos). Takes precedence over ``k``.
+    delta : float
+        Failure probability of the ``epsilon`` guarantee.
+    seed : int, optional
+        Seed of the random sampling.
+    nodes : Iterable[Any], optional
+        Only return these nodes. Betweenness is a global measure, so the
+        shortest paths of the whole graph are still explored; use ``k`` or
+        ``epsilon`` to bound that work.
+
+    Returns
+    -------
+    Dict[Any, float]
+        Mapping ``{node: betweenness}``.
+    """
+
+    if epsilon is not None:
+        scores = _sampled_path_betweenness(graph, epsilon, delta, seed)
+    elif isinstance(graph, CompactGraph):
+        scores = _compact_betweenness(graph, k, seed)
+    elif k is not None and k < graph.number_of_nodes():
+        scores = nx.betweenness_centrality(graph, k=k, seed=seed)
+    else:
+        scores = nx.betweenness_centrality(graph)
+    if nodes is None:
+        return scores
+    return {n: scores[n] for n in nodes if n in scores}
+
+
+def vertex_diameter_bound(graph: nx.Graph) -> int:
+    """Upper bound on the number of nodes in any shortest path.
+
+    One BFS per connected component gives the eccentricity ``e`` of an
+    arbitrary node; no shortest path in that component has more than
+    ``2 * e + 1`` nodes.
+    """
+
+    if isinstance(graph, CompactGraph):
+        adj = graph.adjacency()
+        _, labels = csgraph.connected_components(adj, directed=False)
+        _, roots = np.unique(labels, return_index=True)
+        # one BFS from every component root at once
+        frontier = np.zeros(len(graph), dtype=bool)
+        frontier[roots] = True
+        visited = frontier.copy()
+        ecc = 0
+        while True:
+            reached = (adj @ frontier.astype(float)) > 0
+            reached &= ~visited
+            if not reached.any():
+                return 2 * ecc + 1
+            ecc += 1
+            visited |= reached
+            frontier = reached
+
+    bound = 1
+    for component in nx.connected_components(graph):
+        root = next(iter(component))
+        ecc = max(nx.single_source_shortest_path_length(graph, root).values())
+        bound = max(bound, 2 * ecc + 1)
+    return bound
+
+
+def sample_size(graph: nx.Graph, epsilon: float, delta: float) -> int:
+    """Number of sampled paths for an ``(epsilon, delta)`` guarantee.
+
+    ``epsilon`` bounds the error of the estimate normalized by the
+    ``n(n-1)`` ordered pairs, as in Riondato & Kornaropoulos.
+    """
+
+    vd = vertex_diameter_bound(graph)
+    log_vd = math.floor(math.log2(vd - 2)) if vd > 2 else 0
+    return math.ceil(0.5 / epsilon**2 * (log_vd + 1 + math.log(1 / delta)))
+
+
+def _sampled_path_betweenness(
+    graph: nx.Graph,
+    epsilon: float,
+    delta: float,
+    seed: Optional[int],
+) -> Dict[Any, float]:
+    """Estimate betweenness by sampling uniform random shortest paths."""
+
+    labels = list(graph.nodes)
+    n = len(labels)
+    if n <= 2:
+        return dict.fromkeys(labels, 0.0)
+
+    # scores are rescaled by n / (n - 2) below, and so is their error
+    r = sample_size(graph, epsilon * (n - 2) / n, delta)
+    if isinstance(graph, CompactGraph):
+        # walk integer ids; ``graph[v]`` yields neighbour ids
+        graph = _IdAdjacency(graph)
+    nodes = list(graph.nodes)
+    scores: Dict[Any, float] = dict.fromkeys(nodes, 0.0)
+
+    rng = random.Random(seed)
+    # the estimator averages over ordered pairs (normalized by n(n-1));
+    # ``networkx`` divides unordered pair sums by (n-1)(n-2)/2
+    weight = n / ((n - 2) * r)
+    for _ in range(r):
+        source, target = rng.sample(nodes, 2)
+        sigma, preds = _bfs_to(graph, source, target)
+        if target not in sigma:
+            continue
+        node = target
+        while True:
+            options = preds[node]
+            total = sigma[node]
+            pick = rng.random() * total
+            for node in options:
+                pick -= sigma[node]
+                if pick < 0:
+                    break
+            if node == source:
+                break
+            scores[node] += weight
+    return dict(zip(labels, scores.values()))
+
+
+def _bfs_to(graph: nx.Graph, source: Any, target: Any):
+    """BFS from ``source`` counting shortest paths, stopping at ``target``."""
+
+    sigma = {source: 1}
+    dist = {source: 0}
+    preds: Dict[Any, list] = {source: []}
+    queue = deque([source])
+    while queue:
+        v = queue.popleft()
+        if target in dist and dist[v] >= dist[target]:
+            break
+        for w in graph[v]:
+            if w not in dist:
+                dist[w] = dist[v] + 1
+                sigma[w] = 0
+                preds[w] = []
+                queue.append(w)
+            if dist[w] == dist[v] + 1:
+                sigma[w] += sigma[v]
+                preds[w].append(v)
+    return sigma, preds
+
+
+class _IdAdjacency:
+    """``graph[v]`` view of a :class:`CompactGraph` over integer ids."""
+
+    def __init__(self, graph: CompactGraph) -> None:
+        self._graph = graph
+        self.nodes = range(len(graph))
+
+    def __getitem__(self, node_id: int) -> list:
+        return self._graph.neighbors(node_id).tolist()
+
+
+def _compact_betweenness(
+    graph: CompactGraph,
+    k: Optional[int],
+    seed: Optional[int],
+    chunk_size: int = 32,
+) -> Dict[Any, float]:
+    """Brandes' betweenness over CSR arrays, normalized like ``networkx``.
+
+    A block of sources is explored level by level: the shortest-path
+    counts of the next level are ``A @ sigma`` restricted to unvisited
+    nodes, and the dependencies flow back one level at a time with
+    ``delta_v = sigma_v * sum_w (1 + delta_w) / sigma_w`` over the
+    children ``w`` of ``v``. With ``k`` the pivots are drawn exactly as
+    ``nx.betweenness_centrality(seed=...)`` draws them.
+    """
+
+    n = len(graph)
+    if k is not None and k < n:
+        sources = np.array(random.Random(seed).sample(range(n), k))
+    else:
+        k = None
+        sources = np.arange(n)
 
+    adj = graph.adjacency()
+    raw = np.zeros(n)
+    for start in range(0, len(sources), chunk_size):
+        chunk = sources[start : start + chunk_size]  # noqa: E203
+        columns = np.arange(len(chunk))
+        sigma = np.zeros((n, len(chunk)))
+        sigma[chunk, columns] = 1.0
+        depth = np.full((n, len(chunk)), -1, dtype=np.int32)
+        depth[chunk, columns] = 0
+        frontier = sigma
+        level = 0
+        while True:
+            paths = adj @ frontier
+            paths[depth >= 0] = 0.0
+            reached = paths > 0
+            if not reached.any():
+                break
+            level += 1
+            depth[reached] = level
+            sigma = sigma + paths
+            frontier = paths
 
-def compute_betweenness(graph: nx.Graph) -> Dict[Any, float]:
-    """Compute betweenness centrality for all nodes."""
+        delta = np.zeros_like(sigma)
+        for d in range(level, 0, -1):
+            child = depth == d
+            coeff = np.zeros_like(sigma)
+            np.divide(1.0 + delta, sigma, out=coeff, where=child)
+            parent = depth == d - 1
+            delta[parent] = (sigma * (adj @ coeff))[parent]
+        delta[chunk, columns] = 0.0
+        raw += delta.sum(axis=1)
 
-    return nx.betweenness_centrality(graph)
+    # ``networkx`` rescaling for normalized scores without endpoints
+    if n > 2:
+        if k is None:
+            raw /= (n - 1) * (n - 2)
+        else:
+            source = np.zeros(n, dtype=bool)
+            source[sources] = True
+            scale_source = 1 / ((k - 1) * (n - 2)) if k > 1 else math.nan
+            raw *= np.where(source, scale_source, 1 / (k * (n - 2)))
+    return dict(zip(graph.nodes, raw.tolist()))
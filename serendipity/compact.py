@@ -0,0 +1,185 @@
+"""Compact integer-indexed graph shared by the novelty metrics.
+
+Nodes are interned once into a table ``node ↔ int32 id`` and the undirected
+adjacency is stored as CSR arrays (``indptr``/``indices``), a few bytes per
+edge instead of the per-node dictionaries of ``networkx``. The metric
+functions in :mod:`serendipity` accept a :class:`CompactGraph` wherever they
+accept an ``nx.Graph`` and then work on the integer arrays directly.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import networkx as nx
+import numpy as np
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF
+from scipy import sparse
+
+
+class CompactGraph:
+    """Undirected graph with interned nodes and CSR adjacency.
+
+    Parameters
+    ----------
+    nodes : Iterable[Any]
+        Node table; the position of a node is its integer id.
+    indptr : np.ndarray
+        CSR row pointers, ``len(nodes) + 1`` entries.
+    indices : np.ndarray
+        Neighbour ids (``int32``), sorted within each row.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[Any],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+    ) -> None:
+        self.nodes: List[Any] = list(nodes)
+        self.index: Dict[Any, int] = {n: i for i, n in enumerate(self.nodes)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self._adjacency: Dict[bool, sparse.csr_array] = {}
+
+    @classmethod
+    def from_edges(
+        cls,
+        nodes: Iterable[Any],
+        src: Iterable[int],
+        dst: Iterable[int],
+    ) -> "CompactGraph":
+        """Build from parallel arrays of edge endpoint ids.
+
+        Edges are symmetrized and duplicates are dropped, as adding them to
+        an ``nx.Graph`` would.
+        """
+
+        nodes = list(nodes)
+        n = len(nodes)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        keys = np.unique(
+            np.concatenate([src * n + dst, dst * n + src]),
+        )
+        rows, cols = np.divmod(keys, max(n, 1))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(nodes, indptr, cols.astype(np.int32))
+
+    @classmethod
+    def from_rdflib(
+        cls,
+        rdf_graph: Graph,
+        predicates: Optional[Iterable[URIRef]] = None,
+    ) -> "CompactGraph":
+        """Project an ``rdflib.Graph`` on its resource-to-resource triples.
+
+        Without ``predicates`` every triple except ``rdf:type`` whose object
+        is a URI becomes an edge, the projection used by the pipeline.
+        """
+
+        if predicates is None:
+            triples = rdf_graph.triples((None, None, None))
+        else:
+            triples = (
+                triple
+                for p in predicates
+                for triple in rdf_graph.triples((None, p, None))
+            )
+        index: Dict[Any, int] = {}
+        src: List[int] = []
+        dst: List[int] = []
+        for s, p, o in triples:
+            if p == RDF.type or not isinstance(o, URIRef):
+                continue
+            src.append(index.setdefault(s, len(index)))
+            dst.append(index.setdefault(o, len(index)))
+        return cls.from_edges(index, src, dst)
+
+    @classmethod
+    def from_networkx(cls, graph: nx.Graph) -> "CompactGraph":
+        """Intern the nodes and edges of an undirected ``networkx`` graph."""
+
+        nodes = list(graph.nodes)
+        index = {n: i for i, n in enumerate(nodes)}
+        edges = np.array(
+            [(index[u], index[v]) for u, v in graph.edges()],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        return cls.from_edges(nodes, edges[:, 0], edges[:, 1])
+
+    def to_networkx(self, labels: bool = True) -> nx.Graph:
+        """Expand into an ``nx.Graph`` (integer ids when not ``labels``)."""
+
+        graph = nx.Graph()
+        graph.add_nodes_from(self.nodes if labels else range(len(self)))
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        upper = rows <= self.indices
+        pairs = zip(rows[upper].tolist(), self.indices[upper].tolist())
+        if labels:
+            pairs = ((self.nodes[u], self.nodes[v]) for u, v in pairs)
+        graph.add_edges_from(pairs)
+        return graph
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.nodes)
+
+    def __contains__(self, node: Any) -> bool:
+        return node in self.index
+
+    def is_directed(self) -> bool:
+        return False
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return int((rows <= self.indices).sum())
+
+    def degree(self) -> np.ndarray:
+        """Number of neighbours of every node (a self-loop counts once)."""
+
+        return np.diff(self.indptr)
+
+    def neighbors(self, node_id: int) -> np.ndarray:
+        """Neighbour ids of ``node_id``."""
+
+        start, end = self.indptr[node_id], self.indptr[node_id + 1]
+        return self.indices[start:end]
+
+    def ids(self, nodes: Iterable[Any]) -> np.ndarray:
+        """Ids of the given nodes, skipping those not in the graph."""
+
+        rows = [self.index[n] for n in nodes if n in self.index]
+        return np.asarray(rows, dtype=np.int64)
+
+    def adjacency(self, loops: bool = True) -> sparse.csr_array:
+        """Adjacency matrix as a ``float64`` CSR array.
+
+        Parameters
+        ----------
+        loops : bool
+            Keep self-loops on the diagonal.
+        """
+
+        if loops not in self._adjacency:
+            n = len(self)
+            indptr, indices = self.indptr, self.indices
+            if not loops:
+                rows = np.repeat(np.arange(n), np.diff(indptr))
+                keep = rows != indices
+                indices = indices[keep]
+                indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(rows[keep], minlength=n), out=indptr[1:])
+            data = np.ones(len(indices))
+            self._adjacency[loops] = sparse.csr_array(
+                (data, indices, indptr),
+                shape=(n, n),
+            )
+        return self._adjacency[loops]
@@ -1,32 +1,129 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import networkx as nx
-from typing import Dict, Any
+import numpy as np
+from typing import Dict, Any, Iterable, Optional
+
+from serendipity.compact import CompactGraph
+
+# CSR adjacency shared with the worker processes
+_WORKER_ADJ = None
 
 
 def compute_avg_shortest_path_length(
     graph: nx.Graph,
+    nodes: Optional[Iterable[Any]] = None,
+    n_jobs: Optional[int] = 1,
+    chunk_size: int = 128,
 ) -> Dict[Any, float]:
     """Compute the mean shortest path length for every node.
 
     For each node, all reachable nodes are considered when averaging the
-    shortest path lengths.
+    shortest path lengths. The graph is converted once to a CSR adjacency
+    matrix and the BFS advances ``chunk_size`` sources together, one sparse
+    matrix product per level; each chunk is reduced to distance sums and
+    counts, so no per-node distance lists are built.
 
     Parameters
     ----------
-    graph : nx.Graph
+    graph : nx.Graph or CompactGraph
         Undirected graph.
+    nodes : Iterable[Any], optional
+        Only run the BFS from these nodes. Defaults to every node.
+    n_jobs : int, optional
+        Number of worker processes. The default, ``1``, runs in the
+        current process, so a library call never forks on its own;
+        ``None`` uses one per CPU.
+    chunk_size : int
+        Sources per BFS batch. Memory grows with
+        ``chunk_size * number_of_nodes``.
 
     Returns
     -------
     Dict[Any, float]
         Mapping ``{node: mean_distance, ...}``.
     """
+    order = list(graph.nodes)
+    if isinstance(graph, CompactGraph):
+        position = graph.index
+    else:
+        position = {node: i for i, node in enumerate(order)}
+    if nodes is None:
+        sources = np.arange(len(order))
+    else:
+        rows = [position[n] for n in nodes if n in position]
+        sources = np.asarray(rows, dtype=np.int64)
+    if not len(sources):
+        return {}
+
+    if isinstance(graph, CompactGraph):
+        adj = graph.adjacency()
+    else:
+        adj = nx.to_scipy_sparse_array(graph, nodelist=order, format="csr")
+    if graph.is_directed():
+        # frontiers expand along out-edges: next = A^T @ frontier
+        adj = adj.T.tocsr()
+    adj = adj.astype(np.float32)
+    adj.data[:] = 1
+    chunks = [
+        sources[i : i + chunk_size]  # noqa: E203
+        for i in range(0, len(sources), chunk_size)
+    ]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(chunks))
+
+    if n_jobs == 1:
+        parts = [_chunk_distances(adj, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(adj,),
+        ) as pool:
+            parts = list(pool.map(_worker_distances, chunks))
+
     results: Dict[Any, float] = {}
-    for node in graph.nodes:
-        lengths = nx.single_source_shortest_path_length(graph, node)
-        # discard distance to the node itself
-        distances = [d for target, d in lengths.items() if target != node]
-        if distances:
-            results[node] = sum(distances) / len(distances)
-        else:
-            results[node] = 0.0
+    for chunk, (totals, counts) in zip(chunks, parts):
+        for row, total, count in zip(chunk, totals, counts):
+            results[order[row]] = total / count if count else 0.0
     return results
+
+
+def _chunk_distances(adj, chunk: np.ndarray):
+    """Distance sums and reachable counts for the sources in ``chunk``.
+
+    Level-synchronous BFS from all sources at once: column ``j`` of the
+    frontier holds the nodes first reached from ``chunk[j]`` at the current
+    depth, and one sparse product expands every frontier by a level.
+    """
+
+    n = adj.shape[0]
+    columns = np.arange(len(chunk))
+    frontier = np.zeros((n, len(chunk)), dtype=np.float32)
+    frontier[chunk, columns] = 1
+    visited = frontier.astype(bool)
+    totals = np.zeros(len(chunk), dtype=np.int64)
+    counts = np.zeros(len(chunk), dtype=np.int64)
+    depth = 0
+    while True:
+        reached = (adj @ frontier) > 0
+        reached &= ~visited
+        found = reached.sum(axis=0)
+        if not found.any():
+            break
+        depth += 1
+        visited |= reached
+        totals += depth * found
+        counts += found
+        frontier = reached.astype(np.float32)
+    return totals.tolist(), counts.tolist()
+
+
+def _init_worker(adj) -> None:
+    global _WORKER_ADJ
+    _WORKER_ADJ = adj
+
+
+def _worker_distances(chunk: np.ndarray):
+    return _chunk_distances(_WORKER_ADJ, chunk)
@@ -1,21 +1,26 @@
 from rdflib import Graph, URIRef
 import networkx as nx
 
+from serendipity.projection import projection
+
+PREDICATES = (
+    URIRef("http://ex.org/stream#assiste"),
+    URIRef("http://ex.org/stream#pertenceAGenero"),
+)
 
-def build_graph(rdf_graph: Graph) -> nx.Graph:
-    """Create an undirected ``networkx`` graph from two predicates."""
 
-    grafo = nx.Graph()
+def build_graph(rdf_graph: Graph) -> nx.Graph:
+    """Create an undirected ``networkx`` graph from two predicates.
 
-    predicates = [
-        URIRef("http://ex.org/stream#assiste"),
-        URIRef("http://ex.org/stream#pertenceAGenero"),
-    ]
+    Edges between resources are read from the projection shared with the
+    pipeline. The projection leaves out blank node and literal objects,
+    which this graph has always included, so those edges are added here.
+    The graph returned is a copy owned by the caller.
+    """
 
-    for predicate_uri in predicates:
+    grafo = nx.Graph(projection(rdf_graph).networkx(PREDICATES))
+    for predicate_uri in PREDICATES:
         for s, _, o in rdf_graph.triples((None, predicate_uri, None)):
-            grafo.add_node(s)
-            grafo.add_node(o)
-            grafo.add_edge(s, o)
-
+            if not isinstance(o, URIRef):
+                grafo.add_edge(s, o)
     return grafo
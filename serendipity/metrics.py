@@ -1,24 +1,83 @@
 # arquivo: serendipity/metrics.py
 """Novelty metrics based on complex networks."""
 
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
 
 import networkx as nx
+import numpy as np
+from scipy import sparse
 
+from serendipity.compact import CompactGraph
 
-def compute_clustering_coefficient(graph: nx.Graph) -> Dict[Any, float]:
-    """Return the clustering coefficient of each node."""
+
+def _present(graph: nx.Graph, nodes: Iterable[Any]) -> list:
+    return [n for n in nodes if n in graph]
+
+
+def _rows(graph: CompactGraph, nodes: Optional[Iterable[Any]]) -> np.ndarray:
+    if nodes is None:
+        return np.arange(len(graph))
+    return graph.ids(nodes)
+
+
+def compute_clustering_coefficient(
+    graph: nx.Graph,
+    nodes: Optional[Iterable[Any]] = None,
+    chunk_size: int = 4096,
+) -> Dict[Any, float]:
+    """Return the clustering coefficient of each node (or of ``nodes``).
+
+    On a :class:`CompactGraph` the triangles through each node are counted
+    as ``((A @ A) * A).sum(axis=1) / 2`` over blocks of ``chunk_size`` rows.
+    """
+    if isinstance(graph, CompactGraph):
+        adj = graph.adjacency(loops=False)
+        rows = _rows(graph, nodes)
+        degree = np.diff(adj.indptr)[rows].astype(float)
+        pairs = np.zeros(len(rows))
+        for start in range(0, len(rows), chunk_size):
+            block = adj[rows[start : start + chunk_size]]  # noqa: E203
+            closed = (block @ adj).multiply(block).sum(axis=1)
+            pairs[start : start + chunk_size] = closed  # noqa: E203
+        possible = degree * (degree - 1)
+        clustering = np.divide(
+            pairs,
+            possible,
+            out=np.zeros_like(pairs),
+            where=possible > 0,
+        )
+        return {graph.nodes[r]: c for r, c in zip(rows, clustering.tolist())}
+    if nodes is not None:
+        return nx.clustering(graph, _present(graph, nodes))
     return nx.clustering(graph)
 
 
-def compute_pagerank(graph: nx.Graph, **kwargs: Any) -> Dict[Any, float]:
-    """Return the PageRank of each node."""
-    return nx.pagerank(graph, **kwargs)
+def compute_pagerank(
+    graph: nx.Graph,
+    nodes: Optional[Iterable[Any]] = None,
+    **kwargs: Any,
+) -> Dict[Any, float]:
+    """Return the PageRank of each node.
+
+    PageRank is global, so ``nodes`` only filters the returned mapping.
+    A :class:`CompactGraph` is solved with :class:`PageRank`; keep a
+    solver instance instead to reuse the matrix and warm-start.
+    """
+    if isinstance(graph, CompactGraph):
+        alpha = kwargs.pop("alpha", 0.85)
+        scores = PageRank(graph, alpha).solve(**kwargs)
+    else:
+        scores = nx.pagerank(graph, **kwargs)
+    if nodes is None:
+        return scores
+    return {n: scores[n] for n in _present(graph, nodes)}
 
 
 def compute_hhi(
     graph: nx.Graph,
-    communities: Dict[Any, int],
+    communities: Mapping[Any, int],
+    nodes: Optional[Iterable[Any]] = None,
 ) -> Dict[Any, float]:
     """Compute the Herfindahl-Hirschman index (HHI) of each node.
 
@@ -26,16 +85,20 @@ def compute_hhi(
     ----------
     graph : nx.Graph
         Graph to analyze.
-    communities : Dict[Any, int]
+    communities : Mapping[Any, int]
         Mapping ``node → community_id``.
+    nodes : Iterable[Any], optional
+        Only compute the index of these nodes.
 
     Returns
     -------
     Dict[Any, float]
-        ``{node: hhi}`` for all nodes in the graph.
+        ``{node: hhi}`` for all nodes in the graph, or for ``nodes``.
     """
+    if isinstance(graph, CompactGraph):
+        return _compact_hhi(graph, communities, nodes)
     hhi: Dict[Any, float] = {}
-    for node in graph:
+    for node in graph if nodes is None else _present(graph, nodes):
         neigh = list(graph.neighbors(node))
         total = len(neigh)
         if total == 0:
@@ -48,3 +111,346 @@ def compute_hhi(
         hhi_val = sum((cnt / total) ** 2 for cnt in counts.values())
         hhi[node] = hhi_val
     return hhi
+
+
+class PageRank:
+    """Sparse power-iteration PageRank over a :class:`CompactGraph`.
+
+    The transition matrix is built once from the cached CSR adjacency and
+    each :meth:`solve` starts from the previous solution, so solving again
+    with another personalization, or after :meth:`update_graph`, only
+    takes the few iterations needed to move from the old fixed point.
+
+    Parameters
+    ----------
+    graph : CompactGraph
+        Graph to rank.
+    alpha : float
+        Damping factor.
+
+    Attributes
+    ----------
+    last_stats : Dict[str, Any]
+        ``iterations``, final ``error``, ``warm_start`` and ``seconds`` of
+        the last :meth:`solve`.
+    """
+
+    def __init__(self, graph: CompactGraph, alpha: float = 0.85) -> None:
+        self.alpha = alpha
+        self.last_stats: Dict[str, Any] = {}
+        self._x: Optional[np.ndarray] = None
+        self._set_graph(graph)
+
+    def _set_graph(self, graph: CompactGraph) -> None:
+        self.graph = graph
+        adj = graph.adjacency()
+        out = np.asarray(adj.sum(axis=1)).ravel()
+        self._dangling = out == 0
+        self._inv_out = np.divide(
+            1.0,
+            out,
+            out=np.zeros(len(out)),
+            where=~self._dangling,
+        )
+        self._transition = adj.T.tocsr()
+
+    def update_graph(self, graph: CompactGraph) -> None:
+        """Switch to an updated graph, keeping the solution as warm start.
+
+        Nodes still present keep their previous score; new nodes start at
+        ``1 / n``.
+        """
+
+        previous, nodes = self._x, self.graph.nodes
+        self._set_graph(graph)
+        self._x = None
+        n = len(graph)
+        if previous is None or n == 0:
+            return
+        rows = np.fromiter(
+            (graph.index.get(node, -1) for node in nodes),
+            dtype=np.int64,
+            count=len(nodes),
+        )
+        kept = rows >= 0
+        x = np.full(n, 1.0 / n)
+        x[rows[kept]] = previous[kept]
+        self._x = x / x.sum()
+
+    def _vector(self, values: Mapping[Any, float]) -> np.ndarray:
+        vector = np.zeros(len(self.graph))
+        for node, value in values.items():
+            row = self.graph.index.get(node)
+            if row is not None:
+                vector[row] += value
+        return vector
+
+    def solve(
+        self,
+        personalization: Optional[Mapping[Any, float]] = None,
+        nstart: Optional[Mapping[Any, float]] = None,
+        max_iter: int = 100,
+        tol: float = 1.0e-6,
+    ) -> Dict[Any, float]:
+        """Return ``{node: pagerank}``, as ``nx.pagerank`` would.
+
+        Parameters
+        ----------
+        personalization : Mapping[Any, float], optional
+            Teleport weights, e.g. the films a user watched; uniform when
+            omitted.
+        nstart : Mapping[Any, float], optional
+            Starting vector. Defaults to the previous solution, or uniform
+            on the first solve.
+        max_iter : int
+            Maximum number of iterations.
+        tol : float
+            Convergence tolerance on the L1 change, per node.
+
+        Raises
+        ------
+        ZeroDivisionError
+            If ``personalization`` has no weight on the graph.
+        nx.PowerIterationFailedConvergence
+            If the iteration does not converge within ``max_iter``.
+        """
+
+        n = len(self.graph)
+        if n == 0:
+            return {}
+        started = time.perf_counter()
+
+        if personalization is None:
+            p = np.full(n, 1.0 / n)
+        else:
+            p = self._vector(personalization)
+            if p.sum() == 0:
+                raise ZeroDivisionError
+            p /= p.sum()
+        warm = nstart is None and self._x is not None
+        if nstart is not None:
+            x = self._vector(nstart)
+            x = x / x.sum() if x.sum() > 0 else np.full(n, 1.0 / n)
+        elif warm:
+            x = self._x
+        else:
+            x = np.full(n, 1.0 / n)
+
+        alpha = self.alpha
+        error, iteration = float("inf"), 0
+        for iteration in range(1, max_iter + 1):
+            xlast = x
+            spread = self._transition @ (x * self._inv_out)
+            spread += x[self._dangling].sum() * p
+            x = alpha * spread + (1 - alpha) * p
+            error = float(np.absolute(x - xlast).sum())
+            if error < n * tol:
+                break
+        self.last_stats = {
+            "iterations": iteration,
+            "error": error,
+            "warm_start": warm,
+            "seconds": time.perf_counter() - started,
+        }
+        if error >= n * tol:
+            raise nx.PowerIterationFailedConvergence(max_iter)
+        self._x = x
+        return dict(zip(self.graph.nodes, x.tolist()))
+
+    def personalized(
+        self,
+        seeds: Iterable[Any],
+        **kwargs: Any,
+    ) -> Dict[Any, float]:
+        """PageRank teleporting uniformly to ``seeds`` (e.g. watched films)."""
+
+        return self.solve(dict.fromkeys(seeds, 1.0), **kwargs)
+
+    def solve_many(
+        self,
+        personalizations: Sequence[Mapping[Any, float]],
+        max_iter: int = 100,
+        tol: float = 1.0e-6,
+    ) -> np.ndarray:
+        """Solve one personalized PageRank per mapping at once.
+
+        The vectors are the columns of an ``n × m`` matrix and every
+        iteration is a single sparse-matrix by dense-matrix product.
+        Converged columns leave the product; a mapping with no weight on
+        the graph teleports uniformly.
+
+        Returns
+        -------
+        np.ndarray
+            ``n × m`` array; row ``i`` belongs to ``graph.nodes[i]``.
+
+        Raises
+        ------
+        nx.PowerIterationFailedConvergence
+            If some column does not converge within ``max_iter``.
+        """
+
+        n, m = len(self.graph), len(personalizations)
+        if n == 0:
+            return np.zeros((0, m))
+        started = time.perf_counter()
+        p = np.zeros((n, m))
+        for column, values in enumerate(personalizations):
+            p[:, column] = self._vector(values)
+        p[:, p.sum(axis=0) == 0] = 1.0
+        p /= p.sum(axis=0)
+
+        # iterate on the unconverged columns only, compacted as they finish
+        x = np.empty((n, m))
+        active = np.arange(m)
+        xa = np.full((n, m), 1.0 / n)
+        teleport = (1 - self.alpha) * p
+        inv_out = self._inv_out[:, None]
+        buffer = np.empty_like(xa)
+        iteration = 0
+        while len(active) and iteration < max_iter:
+            iteration += 1
+            xlast = xa
+            xa = self._transition @ np.multiply(xlast, inv_out, out=buffer)
+            xa += xlast[self._dangling].sum(axis=0) * p
+            xa *= self.alpha
+            xa += teleport
+            np.subtract(xa, xlast, out=buffer)
+            done = np.absolute(buffer, out=buffer).sum(axis=0) < n * tol
+            if done.any():
+                x[:, active[done]] = xa[:, done]
+                keep = ~done
+                active, xa = active[keep], xa[:, keep]
+                p, teleport = p[:, keep], teleport[:, keep]
+                buffer = np.empty_like(xa)
+        self.last_stats = {
+            "iterations": iteration,
+            "unconverged": len(active),
+            "warm_start": False,
+            "seconds": time.perf_counter() - started,
+        }
+        if len(active):
+            raise nx.PowerIterationFailedConvergence(max_iter)
+        return x
+
+
+def compute_personalized_pagerank_novelty(
+    graph: CompactGraph,
+    seeds: Mapping[Any, Iterable[Any]],
+    nodes: Optional[Iterable[Any]] = None,
+    solver: Optional[PageRank] = None,
+    batch_size: int = 64,
+    **kwargs: Any,
+) -> Dict[Any, Dict[Any, float]]:
+    """Per-user novelty from PageRank personalized on the user's items.
+
+    A node that the random walk restarting at a user's items visits often
+    is familiar to that user, so the novelty is ``1 / (1 + n * ppr)``:
+    close to ``0`` around the user's items, ``0.5`` at the uniform share
+    and ``1`` where the walk never goes.
+
+    PageRank is linear in the teleport vector (up to the dangling mass),
+    so one vector is solved per distinct seed item, ``batch_size`` at a
+    time with :meth:`PageRank.solve_many`, and all users are combined with
+    a single sparse ``items × users`` weight matrix. The cost grows with
+    the number of distinct items, not with the number of users.
+
+    Parameters
+    ----------
+    graph : CompactGraph
+        Projection of the knowledge graph.
+    seeds : Mapping[Any, Iterable[Any]]
+        ``{user: items}``, e.g. the films each user rated. Users without
+        items in the graph get the global PageRank.
+    nodes : Iterable[Any], optional
+        Only return the scores of these nodes.
+    solver : PageRank, optional
+        Solver to reuse; built for ``graph`` when omitted.
+    batch_size : int
+        Seed vectors solved together.
+    **kwargs : Any
+        ``max_iter`` and ``tol`` for :meth:`PageRank.solve_many`.
+
+    Returns
+    -------
+    Dict[Any, Dict[Any, float]]
+        ``{user: {node: novelty}}``.
+    """
+
+    if solver is None:
+        solver = PageRank(graph)
+    graph = solver.graph
+    n = len(graph)
+    rows = _rows(graph, nodes)
+    users = list(seeds)
+
+    # weight[i, u]: share of seed ``items[i]`` in the teleport of user ``u``
+    user_items = [graph.ids(dict.fromkeys(seeds[u])) for u in users]
+    items, owners = np.unique(
+        np.concatenate([np.zeros(0, np.int64), *user_items]),
+        return_inverse=True,
+    )
+    sizes = np.array([len(ids) for ids in user_items], dtype=np.int64)
+    columns = np.repeat(np.arange(len(users)), sizes)
+    shares = np.repeat(1.0 / np.maximum(sizes, 1), sizes)
+    weight = sparse.csr_array(
+        (shares, (owners, columns)),
+        shape=(len(items), len(users)),
+    )
+
+    # x(p) ∝ sum_i p_i * x(e_i) / c_i, with c_i the restart mass of x(e_i)
+    scores = np.zeros((len(rows), len(users)))
+    mass = np.zeros(len(users))
+    for start in range(0, len(items), batch_size):
+        chunk = items[start : start + batch_size]  # noqa: E203
+        teleport = [{graph.nodes[i]: 1.0} for i in chunk]
+        x = solver.solve_many(teleport, **kwargs)
+        restart = solver.alpha * x[solver._dangling].sum(axis=0)
+        restart += 1 - solver.alpha
+        block = weight[start : start + len(chunk)]  # noqa: E203
+        scores += (block.T @ (x[rows] / restart).T).T
+        mass += block.T @ (1.0 / restart)
+
+    empty = sizes == 0
+    if empty.any():
+        scores[:, empty] = solver.solve_many([{}], **kwargs)[rows]
+        mass[empty] = 1.0
+    novelty = 1.0 / (1.0 + n * scores / mass)
+
+    labels = [graph.nodes[r] for r in rows]
+    return {
+        user: dict(zip(labels, novelty[:, column].tolist()))
+        for column, user in enumerate(users)
+    }
+
+
+def _compact_hhi(
+    graph: CompactGraph,
+    communities: Mapping[Any, int],
+    nodes: Optional[Iterable[Any]],
+) -> Dict[Any, float]:
+    """HHI of the neighbour communities, grouped with array operations."""
+
+    labels = np.fromiter(
+        (communities.get(n, -1) for n in graph.nodes),
+        dtype=np.int64,
+        count=len(graph),
+    )
+    # shift so the ``-1`` of nodes without a community is a valid key
+    labels += 1
+    rows = _rows(graph, nodes)
+    starts, ends = graph.indptr[rows], graph.indptr[rows + 1]
+    degree = ends - starts
+    owner = np.repeat(np.arange(len(rows)), degree)
+    first = np.repeat(np.cumsum(degree) - degree, degree)
+    offsets = np.arange(len(owner)) - first
+    neighbours = graph.indices[np.repeat(starts, degree) + offsets]
+    width = int(labels.max()) + 1 if len(labels) else 1
+    keys, counts = np.unique(
+        owner * width + labels[neighbours],
+        return_counts=True,
+    )
+    shares = counts / degree[keys // width]
+    hhi = np.zeros(len(rows))
+    np.add.at(hhi, keys // width, shares**2)
+    return {graph.nodes[r]: h for r, h in zip(rows, hhi.tolist())}
@@ -0,0 +1,372 @@
+"""Precomputed novelty scores for every node of a graph.
+
+The novelty metrics only depend on the graph, so they are computed once per
+graph version and stored as one ``float64`` column per metric, aligned to a
+node table. Lookups are dictionary hits on the node table plus array reads,
+and the table can be written next to the graph snapshot so a restart does
+not recompute centrality either.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import networkx as nx
+import numpy as np
+from rdflib import BNode, URIRef
+
+from ontology.snapshot import decode_strings, encode_strings
+from serendipity.compact import CompactGraph
+
+# version of the file written by :meth:`NoveltyIndex.save`
+FORMAT_VERSION = 2
+
+METRICS = ("betweenness", "avg_shortest_path", "clustering", "pagerank", "hhi")
+# metrics whose score at a node can be computed without the whole graph
+LOCAL_METRICS = frozenset({"avg_shortest_path", "clustering", "hhi"})
+# metrics that depend on the user as well, so they are not in the table
+USER_METRICS = frozenset({"personalized_pagerank"})
+
+
+def column_name(metric: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Name of the table column holding ``metric`` computed with ``params``.
+
+    Parameters change the scores (e.g. approximate betweenness), so each
+    combination gets its own column.
+    """
+
+    if not params:
+        return metric
+    args = ",".join(f"{k}={params[k]!r}" for k in sorted(params))
+    return f"{metric}[{args}]"
+
+
+def detect_communities(graph: nx.Graph) -> Dict[Any, int]:
+    """Louvain communities used by the HHI metric, as ``{node: id}``.
+
+    The partition depends on the order of nodes and neighbours. The
+    pipeline passes the labelled projection
+    (:meth:`serendipity.projection.Projection.networkx`), built in the
+    order of the triples; a :class:`CompactGraph` is expanded with its
+    neighbours sorted by id, which may group nodes differently.
+    """
+
+    from networkx.algorithms import community
+
+    if isinstance(graph, CompactGraph):
+        graph = graph.to_networkx()
+    communities: Dict[Any, int] = {}
+    louvain = community.louvain_communities(graph, seed=42)
+    for cid, comm in enumerate(louvain):
+        for node in comm:
+            communities[node] = cid
+    return communities
+
+
+def compute_novelty(
+    graph: nx.Graph,
+    metric: str,
+    params: Optional[Dict[str, Any]] = None,
+    nodes: Optional[Iterable[Any]] = None,
+    communities: Optional[Mapping[Any, int]] = None,
+) -> Dict[Any, float]:
+    """Compute a novelty metric for the nodes of ``graph``.
+
+    Parameters
+    ----------
+    graph : nx.Graph
+        Projection of the knowledge graph.
+    metric : str
+        One of :data:`METRICS`.
+    params : Dict[str, Any], optional
+        Keyword arguments for the metric function, e.g. ``{"k": 256}`` or
+        ``{"epsilon": 0.01}`` for approximate betweenness.
+    nodes : Iterable[Any], optional
+        Restrict the computation to these nodes. Local metrics
+        (:data:`LOCAL_METRICS`) then only do candidate-sized work.
+    communities : Mapping[Any, int], optional
+        Precomputed communities for ``"hhi"``.
+
+    Returns
+    -------
+    Dict[Any, float]
+        Mapping ``{node: score}``.
+
+    Raises
+    ------
+    ValueError
+        If ``metric`` is unknown.
+    """
+
+    from serendipity.centrality import compute_betweenness
+    from serendipity.metrics import (
+        compute_clustering_coefficient,
+        compute_pagerank,
+        compute_hhi,
+    )
+
+    params = dict(params or {})
+    if nodes is not None:
+        params["nodes"] = nodes
+    if metric == "betweenness":
+        return compute_betweenness(graph, **params)
+    if metric == "avg_shortest_path":
+        from serendipity.distance import compute_avg_shortest_path_length
+
+        return compute_avg_shortest_path_length(graph, **params)
+    if metric == "clustering":
+        return compute_clustering_coefficient(graph, **params)
+    if metric == "pagerank":
+        return compute_pagerank(graph, **params)
+    if metric == "hhi":
+        if communities is None:
+            communities = detect_communities(graph)
+        return compute_hhi(graph, communities, **params)
+    raise ValueError(f"Unknown novelty_metric: {metric}")
+
+
+class _ArrayMapping(Mapping):
+    """Read-only ``{node: value}`` view over a node table and an array."""
+
+    def __init__(self, index: Dict[Any, int], values: np.ndarray) -> None:
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, node: Any) -> int:
+        return int(self._values[self._index[node]])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class NoveltyIndex:
+    """Array-backed table ``node → score`` for each novelty metric.
+
+    Columns of local metrics may be filled lazily, only for the nodes that
+    were asked for; rows not computed yet hold ``NaN``.
+
+    Parameters
+    ----------
+    nodes : Iterable[Any]
+        Nodes of the graph, defining the row order.
+    columns : Dict[str, np.ndarray], optional
+        Already computed columns aligned to ``nodes``.
+    communities : np.ndarray, optional
+        Community id of each node, used by ``"hhi"``.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[Any],
+        columns: Optional[Dict[str, np.ndarray]] = None,
+        communities: Optional[np.ndarray] = None,
+    ) -> None:
+        self.nodes: List[Any] = list(nodes)
+        self.index: Dict[Any, int] = {n: i for i, n in enumerate(self.nodes)}
+        self.columns: Dict[str, np.ndarray] = dict(columns or {})
+        self.communities = communities
+        self._complete = set()
+        for name, column in self.columns.items():
+            if not np.isnan(column).any():
+                self._complete.add(name)
+
+    @classmethod
+    def build(
+        cls,
+        graph: nx.Graph,
+        metrics: Iterable[str] = METRICS,
+    ) -> "NoveltyIndex":
+        """Compute ``metrics`` for all nodes of ``graph``."""
+
+        index = cls(graph.nodes)
+        for metric in metrics:
+            index.ensure(graph, metric)
+        return index
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._complete
+
+    def covers(
+        self,
+        metric: str,
+        params: Optional[Dict[str, Any]] = None,
+        nodes: Optional[Iterable[Any]] = None,
+    ) -> bool:
+        """Whether ``metric`` is known for ``nodes`` (default: all nodes)."""
+
+        name = column_name(metric, params)
+        if name in self._complete:
+            return True
+        if nodes is None or name not in self.columns:
+            return False
+        return not np.isnan(self.columns[name][self._rows(nodes)]).any()
+
+    def ensure(
+        self,
+        graph: nx.Graph,
+        metric: str,
+        params: Optional[Dict[str, Any]] = None,
+        nodes: Optional[Iterable[Any]] = None,
+        warm_start: Optional["NoveltyIndex"] = None,
+        communities: Optional[Mapping[Any, int]] = None,
+    ) -> bool:
+        """Compute the missing ``metric`` scores.
+
+        Parameters
+        ----------
+        graph : nx.Graph
+            Graph the table was built from.
+        metric : str
+            One of :data:`METRICS`.
+        params : Dict[str, Any], optional
+            Metric arguments, see :func:`compute_novelty`.
+        nodes : Iterable[Any], optional
+            Nodes that must be covered. For local metrics only their
+            missing rows are computed; global metrics always fill the
+            whole column.
+        warm_start : NoveltyIndex, optional
+            Table of a previous version of the graph. Its ``"pagerank"``
+            column seeds the power iteration, which then only has to
+            absorb the change.
+        communities : Mapping[Any, int], optional
+            Communities for ``"hhi"`` when the table has none yet; by
+            default they are detected on ``graph``.
+
+        Returns
+        -------
+        bool
+            ``True`` when new scores were computed.
+        """
+
+        name = column_name(metric, params)
+        if name in self._complete:
+            return False
+
+        if metric in LOCAL_METRICS and nodes is not None:
+            column = self.columns.get(name)
+            if column is None:
+                column = np.full(len(self.nodes), np.nan)
+                self.columns[name] = column
+            rows = self._rows(nodes)
+            rows = rows[np.isnan(column[rows])]
+            if not len(rows):
+                return False
+            targets = [self.nodes[r] for r in rows]
+        else:
+            column = np.full(len(self.nodes), np.nan)
+            rows = np.arange(len(self.nodes))
+            targets = None
+
+        if metric == "hhi":
+            communities = self._communities(graph, communities)
+        warm = warm_start is not None and name in warm_start
+        if metric == "pagerank" and warm:
+            scores = warm_start.columns[name].tolist()
+            nstart = dict(zip(warm_start.nodes, scores))
+            params = dict(params or {}, nstart=nstart)
+        scores = compute_novelty(graph, metric, params, targets, communities)
+        column[rows] = [scores.get(self.nodes[r], 0.0) for r in rows]
+        self.columns[name] = column
+        if targets is None or not np.isnan(column).any():
+            self._complete.add(name)
+        return True
+
+    def lookup(
+        self,
+        items: Iterable[Any],
+        metric: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[Any, float]:
+        """Return ``{item: score}``; items outside the graph score ``0.0``."""
+
+        column = self.columns[column_name(metric, params)]
+        result: Dict[Any, float] = {}
+        for item in items:
+            row = self.index.get(item)
+            result[item] = float(column[row]) if row is not None else 0.0
+        return result
+
+    def _rows(self, nodes: Iterable[Any]) -> np.ndarray:
+        rows = [self.index[n] for n in nodes if n in self.index]
+        return np.asarray(rows, dtype=np.int64)
+
+    def _communities(
+        self,
+        graph: nx.Graph,
+        found: Optional[Mapping[Any, int]] = None,
+    ) -> Mapping[Any, int]:
+        if self.communities is None:
+            if found is None:
+                found = detect_communities(graph)
+            self.communities = np.fromiter(
+                (found.get(n, -1) for n in self.nodes),
+                dtype=np.int32,
+                count=len(self.nodes),
+            )
+        return _ArrayMapping(self.index, self.communities)
+
+    def save(self, path: str) -> None:
+        """Write the table to ``path`` as an ``.npz`` file.
+
+        Node names are stored as UTF-8 with offsets, as in the graph
+        snapshots (see :func:`ontology.snapshot.encode_strings`).
+        """
+
+        kinds = np.fromiter(
+            (isinstance(n, BNode) for n in self.nodes),
+            dtype=np.uint8,
+            count=len(self.nodes),
+        )
+        offsets, blob = encode_strings(str(n) for n in self.nodes)
+        header = {
+            "format": FORMAT_VERSION,
+            "metrics": sorted(self.columns),
+            "communities": self.communities is not None,
+        }
+        arrays = {f"col_{m}": c for m, c in self.columns.items()}
+        if self.communities is not None:
+            arrays["communities"] = self.communities
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(
+                fh,
+                header=np.frombuffer(json.dumps(header).encode(), np.uint8),
+                offsets=offsets,
+                blob=blob,
+                kinds=kinds,
+                **arrays,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NoveltyIndex":
+        """Read a table written by :meth:`save`.
+
+        Raises
+        ------
+        ValueError
+            If the file was written in another format.
+        """
+
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode())
+            if header.get("format") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported novelty table format in {path}")
+            names = decode_strings(data["offsets"], data["blob"])
+            kinds = data["kinds"].tolist()
+            columns = {m: data[f"col_{m}"] for m in header["metrics"]}
+            communities = None
+            if header.get("communities"):
+                communities = data["communities"]
+        nodes = []
+        for name, kind in zip(names, kinds):
+            nodes.append(BNode(name) if kind else URIRef(name))
+        return cls(nodes, columns, communities)
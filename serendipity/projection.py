@@ -0,0 +1,210 @@
+"""Memoized graph projection of an RDF graph.
+
+The novelty metrics work on a projection of the knowledge graph: every
+triple whose object is a resource, except ``rdf:type``, becomes an
+undirected edge. :func:`projection` builds it once per graph and keeps it in
+step with in-place updates reported through :mod:`ontology.versioning`,
+applying the delta instead of walking every triple again. The pipeline and
+:func:`serendipity.graph_builder.build_graph` both read their graphs from
+it, restricted or not to a set of predicates.
+"""
+
+from __future__ import annotations
+
+import weakref
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF
+
+from ontology.versioning import Triple, add_listener, graph_key, graph_state
+from serendipity.compact import CompactGraph
+
+Predicates = Optional[FrozenSet[URIRef]]
+
+# graph serial -> (graph state, projection)
+_PROJECTIONS: Dict[int, Tuple[Tuple[int, int], "Projection"]] = {}
+
+
+def _is_edge(triple: Triple) -> bool:
+    _, p, o = triple
+    return p != RDF.type and isinstance(o, URIRef)
+
+
+class Projection:
+    """Undirected resource graph of an RDF graph, grouped by predicate.
+
+    Each predicate keeps a count of the triples behind every edge, so
+    removing one of two triples linking the same nodes keeps the edge, and
+    the position of the triple that first added it, so views list nodes and
+    edges in the order of the triples. Views (:meth:`compact`,
+    :meth:`networkx`) are built on demand and cached until the next update.
+
+    Parameters
+    ----------
+    triples : Iterable[Triple]
+        Triples of the graph; those that are not edges are skipped.
+    """
+
+    def __init__(self, triples: Iterable[Triple]) -> None:
+        self.index: Dict[Any, int] = {}
+        self.nodes: List[Any] = []
+        self._edges: Dict[URIRef, Counter] = {}
+        # (predicate, source id, target id) -> position of its first triple
+        self._order: Dict[Tuple[URIRef, int, int], int] = {}
+        self._added = 0
+        self._views: Dict[Tuple[str, Predicates], Any] = {}
+        self.update(added=triples)
+
+    def update(
+        self,
+        added: Iterable[Triple] = (),
+        removed: Iterable[Triple] = (),
+    ) -> None:
+        """Apply a delta of triples, as reported by ``mark_changed``."""
+
+        for s, p, o in filter(_is_edge, added):
+            edges = self._edges.setdefault(p, Counter())
+            key = (self._intern(s), self._intern(o))
+            edges[key] += 1
+            self._order.setdefault((p, *key), self._added)
+            self._added += 1
+        for s, p, o in filter(_is_edge, removed):
+            edges = self._edges.get(p)
+            key = (self.index.get(s), self.index.get(o))
+            if edges is not None and edges.get(key):
+                edges[key] -= 1
+                if not edges[key]:
+                    del edges[key]
+                    del self._order[(p, *key)]
+        self._views.clear()
+
+    def compact(
+        self,
+        predicates: Optional[Iterable[URIRef]] = None,
+    ) -> CompactGraph:
+        """The projection as a :class:`CompactGraph`.
+
+        Parameters
+        ----------
+        predicates : Iterable[URIRef], optional
+            Only keep edges of these predicates; nodes without edges are
+            left out.
+
+        Returns
+        -------
+        CompactGraph
+            Shared, cached graph; do not modify its arrays.
+        """
+
+        key = ("compact", self._key(predicates))
+        if key not in self._views:
+            ends, live = self._ends(key[1])
+            remap = np.zeros(len(self.nodes), dtype=np.int64)
+            remap[live] = np.arange(len(live))
+            nodes = [self.nodes[i] for i in live.tolist()]
+            self._views[key] = CompactGraph.from_edges(
+                nodes, remap[ends[:, 0]], remap[ends[:, 1]]
+            )
+        return self._views[key]
+
+    def networkx(
+        self,
+        predicates: Optional[Iterable[URIRef]] = None,
+    ) -> nx.Graph:
+        """The projection as a frozen ``nx.Graph``.
+
+        Nodes and edges are added in the order of the triples, so
+        order-dependent algorithms such as Louvain see the graph a direct
+        conversion would give. The graph is shared by every caller; use
+        ``nx.Graph(graph)`` for a copy that can be modified.
+        """
+
+        key = ("networkx", self._key(predicates))
+        if key not in self._views:
+            ends, live = self._ends(key[1], ordered=True)
+            graph = nx.Graph()
+            graph.add_nodes_from(self.nodes[i] for i in live.tolist())
+            graph.add_edges_from(
+                (self.nodes[u], self.nodes[v]) for u, v in ends.tolist()
+            )
+            self._views[key] = nx.freeze(graph)
+        return self._views[key]
+
+    def _ends(
+        self,
+        predicates: Predicates,
+        ordered: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Edge endpoint ids and the ids of the nodes that have edges.
+
+        Nodes come in order of first appearance, as in a fresh build, and
+        with ``ordered`` so do the edges; nodes whose edges were all
+        removed are dropped.
+        """
+
+        if predicates is None:
+            chosen = list(self._edges)
+        else:
+            chosen = [p for p in self._edges if p in predicates]
+        keys = [(p, *pair) for p in chosen for pair in self._edges[p]]
+        if ordered:
+            keys.sort(key=self._order.__getitem__)
+        pairs = [key[1:] for key in keys]
+        ends = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        return ends, np.unique(ends)
+
+    def _intern(self, node: Any) -> int:
+        idx = self.index.setdefault(node, len(self.nodes))
+        if idx == len(self.nodes):
+            self.nodes.append(node)
+        return idx
+
+    @staticmethod
+    def _key(predicates: Optional[Iterable[URIRef]]) -> Predicates:
+        return None if predicates is None else frozenset(predicates)
+
+
+def projection(rdf_graph: Graph) -> Projection:
+    """Return the :class:`Projection` of ``rdf_graph``, built once.
+
+    The projection follows updates reported with
+    :func:`ontology.versioning.mark_changed`. It is rebuilt when the
+    number of triples changed without a report; an unreported edit that
+    leaves the size unchanged is not noticed.
+    """
+
+    serial, _ = graph_key(rdf_graph)
+    state = graph_state(rdf_graph)
+    cached = _PROJECTIONS.get(serial)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    if cached is None:
+        weakref.finalize(rdf_graph, _PROJECTIONS.pop, serial, None)
+    result = Projection(rdf_graph.triples((None, None, None)))
+    _PROJECTIONS[serial] = (state, result)
+    return result
+
+
+def clear_cache() -> None:
+    """Forget every memoized projection."""
+
+    _PROJECTIONS.clear()
+
+
+def _on_change(
+    graph: Graph,
+    added: Iterable[Triple],
+    removed: Iterable[Triple],
+) -> None:
+    serial, version = graph_key(graph)
+    cached = _PROJECTIONS.get(serial)
+    if cached is not None and cached[0][0] == version - 1:
+        cached[1].update(added, removed)
+        _PROJECTIONS[serial] = (graph_state(graph), cached[1])
+
+
+add_listener(_on_change)
@@ -11,3 +11,19 @@ def test_compute_betweenness_path():
     assert result[2] == pytest.approx(1.0)
     assert result[1] == pytest.approx(0.0)
     assert result[3] == pytest.approx(0.0)
+
+
+def test_compute_betweenness_pivots_match_exact_with_all_sources():
+    g = nx.karate_club_graph()
+    exact = compute_betweenness(g)
+    approx = compute_betweenness(g, k=g.number_of_nodes(), seed=1)
+    for node in g:
+        assert approx[node] == pytest.approx(exact[node])
+
+
+def test_compute_betweenness_epsilon_bound():
+    g = nx.karate_club_graph()
+    exact = compute_betweenness(g)
+    approx = compute_betweenness(g, epsilon=0.05, delta=0.1, seed=7)
+    assert set(approx) == set(exact)
+    assert max(abs(approx[n] - exact[n]) for n in g) <= 0.05
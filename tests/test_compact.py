@@ -0,0 +1,71 @@
+import networkx as nx
+import pytest
+from rdflib import Graph
+
+from pipeline.generate_recommendations import _build_graph
+from serendipity.centrality import compute_betweenness
+from serendipity.compact import CompactGraph
+from serendipity.distance import compute_avg_shortest_path_length
+from serendipity.metrics import (
+    compute_clustering_coefficient,
+    compute_pagerank,
+    compute_hhi,
+)
+
+TTL = """\
+@prefix : <http://ex.org/stream#> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+
+:videoA a :Filme ; :tematica :acao ; :dirigidoPor :Spielberg ; :titulo "A" .
+:videoB a :Filme ; :tematica :acao ; :dirigidoPor :Spielberg .
+:user1 :assiste :videoA , :videoB .
+:videoA :relacionado :videoA .
+"""
+
+
+@pytest.fixture
+def graphs():
+    g = nx.Graph(nx.karate_club_graph().edges())
+    g.add_edge(0, 0)
+    g.add_node("isolado")
+    return g, CompactGraph.from_networkx(g)
+
+
+def _assert_close(actual, expected):
+    assert set(actual) == set(expected)
+    for node, value in expected.items():
+        assert actual[node] == pytest.approx(value, abs=1e-9)
+
+
+def test_from_rdflib_matches_pipeline_projection():
+    rdf = Graph()
+    rdf.parse(data=TTL, format="turtle")
+    expected = _build_graph(rdf)
+    compact = CompactGraph.from_rdflib(rdf)
+
+    assert compact.nodes == list(expected.nodes)
+    assert compact.number_of_edges() == expected.number_of_edges()
+    edges = {frozenset(e) for e in compact.to_networkx().edges()}
+    assert edges == {frozenset(e) for e in expected.edges()}
+
+
+def test_metrics_match_networkx(graphs):
+    g, compact = graphs
+    _assert_close(compute_betweenness(compact), compute_betweenness(g))
+    _assert_close(
+        compute_betweenness(compact, k=10, seed=3),
+        compute_betweenness(g, k=10, seed=3),
+    )
+    _assert_close(
+        compute_clustering_coefficient(compact),
+        compute_clustering_coefficient(g),
+    )
+    _assert_close(compute_pagerank(compact), compute_pagerank(g))
+    communities = {n: n % 3 for n in g if n != "isolado"}
+    _assert_close(
+        compute_hhi(compact, communities, nodes=[0, 5, "isolado"]),
+        compute_hhi(g, communities, nodes=[0, 5, "isolado"]),
+    )
+    assert compute_avg_shortest_path_length(
+        compact, n_jobs=1
+    ) == compute_avg_shortest_path_length(g, n_jobs=1)
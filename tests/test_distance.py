@@ -16,3 +16,20 @@ def test_compute_avg_shortest_path_length_path():
     assert dist[1] == pytest.approx(1.5)
     assert dist[2] == pytest.approx(1.0)
     assert dist[3] == pytest.approx(1.5)
+
+
+def test_chunked_parallel_bfs_matches_networkx():
+    G = nx.gnp_random_graph(60, 0.04, seed=1)
+    G.add_node("isolado")
+
+    expected = {}
+    for node in G:
+        lengths = nx.single_source_shortest_path_length(G, node)
+        dists = [d for target, d in lengths.items() if target != node]
+        expected[node] = sum(dists) / len(dists) if dists else 0.0
+
+    assert compute_avg_shortest_path_length(G, n_jobs=1) == expected
+    parallel = compute_avg_shortest_path_length(G, n_jobs=2, chunk_size=16)
+    assert parallel == expected
+    subset = compute_avg_shortest_path_length(G, nodes=[3, "isolado"])
+    assert subset == {3: expected[3], "isolado": 0.0}
@@ -0,0 +1,45 @@
+import numpy as np
+
+from collaborative_recommender.embedding_index import EmbeddingIndex
+from collaborative_recommender.surprise_rs import SurpriseRS
+
+
+def test_embedding_index_modes_match_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 16))
+    queries = rng.normal(size=(5, 16))
+    keys = [f"i{i}" for i in range(len(vectors))]
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+
+    exact = EmbeddingIndex(keys, vectors, block_size=64)
+    for query, expected in zip(queries, truth):
+        found = [key for key, _ in exact.search(query, 10)]
+        assert found == [keys[i] for i in expected]
+
+    # probing every list makes the IVF search exhaustive
+    ivf = EmbeddingIndex(keys, vectors, n_lists=16, n_probe=16)
+    for query in queries:
+        found = [key for key, _ in ivf.search(query, 10)]
+        assert found == [key for key, _ in exact.search(query, 10)]
+
+    quantized = EmbeddingIndex(keys, vectors, quantize=True)
+    for query, expected in zip(queries, truth):
+        found = {key for key, _ in quantized.search(query, 10)}
+        assert len(found & {keys[i] for i in expected}) >= 8
+
+
+def test_surprise_rs_top_k_follows_predict():
+    rng = np.random.default_rng(1)
+    ratings = {
+        (f"u{u}", f"i{i}"): float(rng.integers(1, 6))
+        for u, i in rng.integers(30, size=(400, 2))
+    }
+    for algorithm in ("mean", "svd"):
+        rs = SurpriseRS(algorithm, n_factors=4, seed=0)
+        rs.fit(ratings)
+        scores = rs.predict("u3", list(rs.item_index))
+        best = sorted(scores, key=scores.get, reverse=True)[:5]
+        assert rs.top_k("u3", 5) == best
+
+        rs.add_rating("u3", "new", 5.0)
+        assert "new" in rs.embedding_index().keys
@@ -1,3 +1,5 @@
+import numpy as np
+
 from pipeline.engine import rerank
 
 
@@ -31,3 +33,16 @@ def test_rerank_extreme_weights():
         "c",
         "b",
     ]
+
+
+def test_rerank_top_n_matches_full_ranking():
+    rng = np.random.default_rng(0)
+    candidates = list(range(1000))
+    # few distinct values, so many ties straddle the cut
+    relevance = dict(zip(candidates, rng.integers(5, size=1000) / 4))
+    novelty = rng.integers(5, size=1000) / 4
+
+    full = rerank(candidates, relevance, novelty)
+    for top_n in (0, 1, 10, 333, 1000, 2000):
+        top = rerank(candidates, relevance, novelty, top_n=top_n)
+        assert top == full[:top_n]
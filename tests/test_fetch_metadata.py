@@ -0,0 +1,72 @@
+import importlib.util
+import json
+import pathlib
+
+from metadata.cache import MetadataCache
+from metadata.fake_sparql import FakeSparqlServer
+from metadata.service import MetadataService
+
+# fmt: off
+MODULE_PATH = (
+    pathlib.Path(__file__).resolve().parents[1]
+    / "scripts"
+    / "fetch_metadata.py"
+)
+# fmt: on
+spec = importlib.util.spec_from_file_location("fetch_metadata", MODULE_PATH)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+TTL = """
+@prefix ex: <http://ex.org/stream#> .
+@prefix wd: <http://www.wikidata.org/entity/> .
+@prefix prop: <http://www.wikidata.org/prop/direct/> .
+
+wd:Q1 a ex:Filme ; prop:P57 wd:Q10 ; prop:P136 wd:Q20 .
+wd:Q2 a ex:Filme ; prop:P57 wd:Q10 ; prop:P161 wd:Q30 .
+wd:Q3 a ex:Filme .
+"""
+ITEMS = {
+    "Q1": {"label": "Um", "date": "1999-05-01", "image": "http://img/1"},
+    "Q2": {"label": "Dois"},
+    "Q10": {"label": "Diretora"},
+    "Q20": {"label": "Drama"},
+    "Q30": {"label": "Ator"},
+}
+
+
+def _service(url, path, **kwargs):
+    cache = MetadataCache(path, negative_ttl=0)
+    return MetadataService(url, batch_size=2, cache=cache, **kwargs)
+
+
+def test_build_is_retried_and_resumable(tmp_path, capsys):
+    data = tmp_path / "films.ttl"
+    data.write_text(TTL, encoding="utf-8")
+    out = tmp_path / "metadata.json"
+    path = str(tmp_path / "meta.sqlite")
+
+    # the first two requests are throttled, then retried
+    with FakeSparqlServer(ITEMS, failures=2) as server:
+        service = _service(server.url, path, retries=2, backoff=0)
+        built = module.build_metadata(data, out, service, chunk_size=4)
+        assert server.requests == 5
+
+    assert json.loads(out.read_text(encoding="utf-8")) == built
+    assert built["Q1"] == {
+        "label": "Um",
+        "year": "1999",
+        "image": "http://img/1",
+    }
+    assert built["Q10"]["label"] == "Diretora"
+    # Q3 is unknown to the endpoint: left out, and counted
+    assert set(built) == {"Q1", "Q2", "Q10", "Q20", "Q30"}
+    printed = capsys.readouterr().out
+    assert "6/6 itens" in printed
+    assert "itens sem metadados: 1" in printed
+
+    # a rerun only asks for what is missing: Q3
+    with FakeSparqlServer(ITEMS) as server:
+        service = _service(server.url, path)
+        assert module.build_metadata(data, out, service) == built
+        assert server.requests == 1
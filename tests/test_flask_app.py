@@ -3,6 +3,8 @@ import pathlib
 
 from rdflib import Graph
 
+from ontology.graph_cache import GRAPH_CACHE
+
 # fmt: off
 MODULE_PATH = (
     pathlib.Path(__file__).resolve().parents[1]
@@ -41,6 +43,8 @@ def test_load_graph_and_catalog(tmp_path):
         "http://ex.org/stream#f1",
         "http://ex.org/stream#f2",
     }
+    # the pipelines get the very same graph
+    assert GRAPH_CACHE.get(str(f), "inferred") is g
 
 
 def test_load_graph_invalid_path():
@@ -48,3 +52,100 @@ def test_load_graph_invalid_path():
 
     with pytest.raises(Exception):
         load_graph(path="no_such_file.ttl")
+
+
+def test_api_catalog_pages_search_results(tmp_path):
+    from metadata.cache import MetadataCache
+    from metadata.service import MetadataService
+
+    f = tmp_path / "g.ttl"
+    f.write_text(TTL + "ex:f10 a ex:Filme .\n", encoding="utf-8")
+    module.graph = load_graph(path=str(f))
+    module.catalog_df = load_catalog()
+    module.metadata = MetadataService(cache=MetadataCache(None))
+    uris = module.catalog_df["uri"].tolist()
+    module.search_index = module.build_search_index(uris)
+
+    client = module.app.test_client()
+    body = client.get("/api/catalog?q=F1&per_page=1&page=2").get_json()
+    assert (body["page"], body["pages"], body["total"]) == (2, 2, 2)
+    assert len(body["items"]) == 1
+    assert body["items"][0]["uri"] in {
+        "http://ex.org/stream#f1",
+        "http://ex.org/stream#f10",
+    }
+    # past the last page: the last page is served
+    body = client.get("/api/catalog?q=f2&page=9").get_json()
+    assert [i["uri"] for i in body["items"]] == ["http://ex.org/stream#f2"]
+
+
+def test_film_api_serves_results_from_the_worker_pool(monkeypatch):
+    import threading
+
+    release = threading.Event()
+
+    def slow(uri):
+        release.wait(5)
+        return [{"uri": uri}]
+
+    module.results.clear()
+    # the graph is not needed: skip loading it on the first request
+    monkeypatch.setattr(module, "graph", Graph())
+    monkeypatch.setitem(module.TASKS, "logical", slow)
+    monkeypatch.setattr(module, "API_WAIT", 0.01)
+    client = module.app.test_client()
+
+    resp = client.get("/api/logical?uri=http://ex.org/stream%23f1")
+    assert resp.status_code == 202
+    release.set()
+    key = ("logical", "http://ex.org/stream#f1")
+    module.results.submit(key, slow).result(5)
+    resp = client.get("/api/logical?uri=http://ex.org/stream%23f1")
+    assert resp.get_json() == [{"uri": "http://ex.org/stream#f1"}]
+
+    assert client.get("/api/logical").status_code == 400
+    assert client.get("/api/nothing?uri=x").status_code == 404
+
+
+def test_film_api_hides_failures(monkeypatch):
+    def broken(uri):
+        raise RuntimeError("secret path /srv/data")
+
+    module.results.clear()
+    monkeypatch.setattr(module, "graph", Graph())
+    monkeypatch.setitem(module.TASKS, "details", broken)
+    client = module.app.test_client()
+
+    resp = client.get("/api/details?uri=http://ex.org/stream%23f1")
+    assert resp.status_code == 500
+    assert resp.get_json() == {"error": "internal error"}
+
+
+def test_details_are_served_while_serendipity_runs(monkeypatch):
+    import threading
+
+    release = threading.Event()
+
+    def slow(uri):
+        release.wait(5)
+        return []
+
+    module.results.clear()
+    module.slow_results.clear()
+    monkeypatch.setattr(module, "graph", Graph())
+    monkeypatch.setitem(module.TASKS, "serendipitous", slow)
+    monkeypatch.setitem(module.TASKS, "details", lambda uri: {"uri": uri})
+    monkeypatch.setattr(module, "API_WAIT", 0.01)
+    client = module.app.test_client()
+
+    try:
+        # as many slow tasks as there are fast workers
+        for i in range(module.WORKERS):
+            resp = client.get(f"/api/serendipitous?uri=x{i}")
+            assert resp.status_code == 202
+        monkeypatch.setattr(module, "API_WAIT", 2.0)
+        resp = client.get("/api/details?uri=x0")
+        assert resp.status_code == 200
+        assert resp.get_json() == {"uri": "x0"}
+    finally:
+        release.set()
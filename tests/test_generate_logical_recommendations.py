@@ -1,4 +1,5 @@
 import pytest
+from rdflib import Graph
 from pipeline.generate_logical_recommendations import recommend_logical
 
 TTL = """
@@ -48,3 +49,43 @@ def test_recommend_logical_invalid_path():
             "http://ex.org/stream#f1",
             ontology_path="no_file.ttl",
         )
+
+
+def test_recommend_logical_ranks_by_shared_attributes():
+    g = Graph().parse(
+        data=TTL + """
+ex:f4 a ex:Filme ; prop:P136 ex:g1 .
+ex:f5 prop:P136 ex:g1 ; prop:P57 ex:d1 .
+""",
+        format="turtle",
+    )
+    uri = "http://ex.org/stream#f1"
+
+    recs = recommend_logical(uri, "", top_n=5, rdf_graph=g)
+    # f2 shares genre and director, f4 only the genre; f5 is not a Filme
+    assert recs == ["http://ex.org/stream#f2", "http://ex.org/stream#f4"]
+    sparql = recommend_logical(uri, "", 5, g, method="sparql")
+    assert set(sparql) == set(recs)
+    assert recommend_logical(uri, "", top_n=1, rdf_graph=g) == recs[:1]
+
+
+def test_recommend_logical_weighted_prefers_rare_attributes():
+    g = Graph().parse(
+        data=TTL + """
+ex:f4 a ex:Filme ; prop:P136 ex:g1 .
+ex:f5 a ex:Filme ; prop:P57 ex:d1 .
+ex:f6 a ex:Filme ; prop:P136 ex:g1 .
+""",
+        format="turtle",
+    )
+    uri = "http://ex.org/stream#f1"
+
+    recs = recommend_logical(uri, "", 5, g, method="weighted")
+    # d1 is rarer than g1, so sharing it outweighs sharing the genre
+    assert recs == [
+        "http://ex.org/stream#f2",
+        "http://ex.org/stream#f5",
+        "http://ex.org/stream#f4",
+        "http://ex.org/stream#f6",
+    ]
+    assert recommend_logical(uri, "", 2, g, method="weighted") == recs[:2]
@@ -48,3 +48,18 @@ def test_build_graph(tmp_path):
     # as duas arestas devem estar lá
     assert g_nx.has_edge(u, v), "Aresta user1--video1 faltando"
     assert g_nx.has_edge(v, c), "Aresta video1--genre1 faltando"
+
+
+def test_build_graph_keeps_blank_node_objects():
+    g_rdf = Graph()
+    g_rdf.parse(data=TEST_TTL, format="turtle")
+    g_rdf.parse(
+        data=f'<{BASE}user1> <{BASE}assiste> [ <{BASE}titulo> "x" ] .',
+        format="turtle",
+    )
+
+    g_nx = build_graph(g_rdf)
+    u = URIRef(BASE + "user1")
+    blank = [n for n in g_nx[u] if not isinstance(n, URIRef)]
+    assert len(blank) == 1
+    assert g_nx.has_edge(URIRef(BASE + "video1"), URIRef(BASE + "genre1"))
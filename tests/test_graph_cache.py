@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from ontology.graph_cache import BYTES_PER_TRIPLE, GraphCache
+
+TTL = """\
+@prefix : <http://ex.org/stream#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+:Filme rdfs:subClassOf :Obra .
+:f1 a :Filme ; :titulo "Um" .
+"""
+
+
+def _write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_raw_graph_is_derived_from_inferred(tmp_path):
+    path = _write(tmp_path / "g.ttl", TTL)
+    cache = GraphCache(snapshots=False)
+
+    inferred = cache.get(path, "inferred")
+    raw = cache.get(path, "raw")
+    assert cache.get(path, "raw") is raw
+    assert len(raw) == 3 < len(inferred)
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["derived"]) == (2, 1, 1)
+    assert stats["entries"] == 2 and stats["bytes"] == cache.size
+    with pytest.raises(ValueError):
+        cache.get(path, "closed")
+
+
+def test_rewritten_file_invalidates_both_forms(tmp_path):
+    path = _write(tmp_path / "g.ttl", TTL)
+    cache = GraphCache(snapshots=False)
+    raw = cache.get(path, "raw")
+    cache.get(path, "inferred")
+
+    # a touch without a content change keeps the graphs
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(path, "raw") is raw
+    assert cache.stats()["invalidations"] == 0
+
+    _write(tmp_path / "g.ttl", TTL + ':f2 a :Filme ; :titulo "Dois" .\n')
+    assert len(cache.get(path, "raw")) == 5
+    assert cache.stats()["invalidations"] == 2
+    assert (path, "inferred") not in cache
+
+
+def test_least_recently_used_graph_is_evicted(tmp_path):
+    paths = [_write(tmp_path / f"g{i}.ttl", TTL) for i in range(3)]
+    cache = GraphCache(max_bytes=7 * BYTES_PER_TRIPLE, snapshots=False)
+    cache.get(paths[0], "raw")
+    cache.get(paths[1], "raw")
+    cache.get(paths[0], "raw")
+    cache.get(paths[2], "raw")
+
+    assert (paths[1], "raw") not in cache
+    assert (paths[0], "raw") in cache and (paths[2], "raw") in cache
+    assert cache.stats()["evictions"] == 1
+
+    # a graph larger than the budget is still kept on its own
+    cache.max_bytes = 1
+    cache.get(paths[1], "raw")
+    assert len(cache) == 1 and (paths[1], "raw") in cache
+
+
+def test_file_is_hashed_once_per_load(tmp_path, monkeypatch):
+    import ontology.build_ontology
+    import ontology.graph_cache
+
+    calls = []
+
+    def digest(path):
+        calls.append(path)
+        return "d" * 64
+
+    monkeypatch.setattr(ontology.graph_cache, "source_digest", digest)
+    monkeypatch.setattr(ontology.build_ontology, "source_digest", digest)
+    path = _write(tmp_path / "g.ttl", TTL)
+    GraphCache().get(path, "inferred")
+    assert len(calls) == 1
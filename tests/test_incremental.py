@@ -0,0 +1,91 @@
+from owlrl import DeductiveClosure, OWLRL_Semantics
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS
+
+from ontology.incremental import IncrementalReasoner
+from ontology.versioning import graph_version
+
+BASE = "http://ex.org/stream#"
+
+TTL = """\
+@prefix : <http://ex.org/stream#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+
+:Documentario rdfs:subClassOf :Filme .
+:assiste rdfs:domain :Usuario ;
+         rdfs:range :Filme ;
+         owl:inverseOf :assistidoPor .
+:segue a owl:TransitiveProperty .
+
+:u1 :assiste :f1 .
+:f1 a :Documentario .
+:u1 :segue :u2 .
+:u2 :segue :u3 .
+"""
+
+
+def _uri(name):
+    return URIRef(BASE + name)
+
+
+def _closure(triples):
+    g = Graph()
+    for t in triples:
+        g.add(t)
+    DeductiveClosure(OWLRL_Semantics).expand(g)
+    return set(g)
+
+
+def _reasoner():
+    g = Graph()
+    g.parse(data=TTL, format="turtle")
+    asserted = set(g)
+    DeductiveClosure(OWLRL_Semantics).expand(g)
+    return IncrementalReasoner(g, asserted)
+
+
+def test_add_triples_matches_full_closure():
+    r = _reasoner()
+    version = graph_version(r.graph)
+
+    new = [
+        (_uri("u3"), _uri("assiste"), _uri("f2")),
+        (_uri("u3"), _uri("segue"), _uri("u4")),
+        (_uri("f2"), _uri("ano"), Literal(2001)),
+    ]
+    r.add_triples(new)
+
+    assert set(r.graph) == _closure(r.asserted)
+    assert (_uri("f2"), _uri("assistidoPor"), _uri("u3")) in r.graph
+    assert (_uri("u1"), _uri("segue"), _uri("u4")) in r.graph
+    assert not r.last_stats["full_closure"]
+    assert graph_version(r.graph) == version + 1
+
+
+def test_remove_triples_retracts_inferences():
+    r = _reasoner()
+
+    r.remove_triples([(_uri("u2"), _uri("segue"), _uri("u3"))])
+    r.remove_triples([(_uri("u1"), _uri("assiste"), _uri("f1"))])
+
+    assert set(r.graph) == _closure(r.asserted)
+    assert (_uri("u1"), _uri("segue"), _uri("u3")) not in r.graph
+    # still a Filme through its asserted subclass
+    assert (_uri("f1"), RDF.type, _uri("Filme")) in r.graph
+    assert (_uri("u1"), RDF.type, _uri("Usuario")) not in r.graph
+
+
+def test_schema_change_falls_back_to_full_closure():
+    r = _reasoner()
+
+    r.add_triples(
+        [
+            (_uri("Curta"), RDFS.subClassOf, _uri("Filme")),
+            (_uri("f3"), RDF.type, _uri("Curta")),
+        ]
+    )
+
+    assert r.last_stats["full_closure"]
+    assert (_uri("f3"), RDF.type, _uri("Filme")) in r.graph
+    assert set(r.graph) == _closure(r.asserted)
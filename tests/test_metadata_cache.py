@@ -0,0 +1,54 @@
+from metadata.cache import MetadataCache
+from metadata.fake_sparql import ENTITY, FakeSparqlServer
+from metadata.service import Metadata, MetadataService
+
+ITEMS = {f"Q{i}": {"label": f"Filme {i}"} for i in range(1, 21)}
+URIS = [ENTITY + q for q in ITEMS]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_answers_persist_across_services(tmp_path):
+    path = str(tmp_path / "meta.sqlite")
+    with FakeSparqlServer(ITEMS) as server:
+        cache = MetadataCache(path, max_items=5)
+        first = MetadataService(server.url, cache=cache).fetch(URIS)
+        cache.close()
+        assert server.requests == 1
+
+        # a new process: empty memory tier, answers read from the file
+        cache = MetadataCache(path, max_items=5)
+        again = MetadataService(server.url, cache=cache).fetch(URIS)
+        assert again == first and server.requests == 1
+        assert len(cache._memory) == 5
+        assert (cache.hits, cache.misses) == (20, 0)
+
+
+def test_misses_are_cached_for_the_negative_ttl(tmp_path):
+    clock = Clock()
+    cache = MetadataCache(None, ttl=100, negative_ttl=10, clock=clock)
+    uris = URIS[:2] + [ENTITY + "Q404"]
+    with FakeSparqlServer(ITEMS, fail=True) as server:
+        service = MetadataService(server.url, cache=cache)
+        assert service.fetch(uris)[URIS[0]] == Metadata("Q1")
+        assert service.fetch(uris)[URIS[0]] == Metadata("Q1")
+        assert server.requests == 1
+
+        server.fail = False
+        clock.now += 11
+        assert service.fetch(uris)[URIS[0]].label == "Filme 1"
+        # unknown to the endpoint: cached as a miss again
+        assert cache.get_many(["Q404"]) == {"Q404": None}
+        clock.now += 11
+        service.fetch(uris)
+        assert server.requests == 3
+
+        clock.now += 100
+        assert cache.get_many(["Q1", "Q404"]) == {}
+        assert cache.purge() == 3
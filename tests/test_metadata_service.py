@@ -0,0 +1,33 @@
+from metadata.fake_sparql import ENTITY, FakeSparqlServer
+from metadata.service import PLACEHOLDER_IMG, Metadata, MetadataService
+
+ITEMS = {
+    f"Q{i}": {
+        "label": f"Filme {i}",
+        "date": f"{1900 + i % 100}-01-01T00:00:00Z",
+        "image": f"http://img/{i}.jpg",
+    }
+    for i in range(1, 451)
+}
+
+
+def test_fetch_resolves_items_in_batches():
+    uris = [ENTITY + q for q in ITEMS] + [ENTITY + "Q999", "http://ex/f1"]
+    with FakeSparqlServer(ITEMS) as server:
+        service = MetadataService(server.url, batch_size=200, max_workers=3)
+        found = service.fetch(uris + uris[:10])
+        assert server.requests == 3
+
+    assert list(found) == uris
+    expected = Metadata("Filme 7", "1907", "http://img/7.jpg")
+    assert found[ENTITY + "Q7"] == expected
+    # unknown items and non-Wikidata URIs keep their identifier
+    assert found[ENTITY + "Q999"] == Metadata("Q999", None, PLACEHOLDER_IMG)
+    assert found["http://ex/f1"].label == "f1"
+
+
+def test_failed_batch_falls_back_to_identifiers():
+    with FakeSparqlServer(ITEMS, fail=True) as server:
+        service = MetadataService(server.url)
+        assert service.label_year(ENTITY + "Q1") == ("Q1", None)
+        assert service.image(ENTITY + "Q1") == PLACEHOLDER_IMG
@@ -0,0 +1,67 @@
+import numpy as np
+from rdflib import Graph
+
+from ontology.attribute_index import attribute_matrix
+from ontology.neighbours import NeighbourTable, compute_neighbours
+from pipeline.generate_logical_recommendations import (
+    EX,
+    PROPERTIES,
+    clear_cache,
+    neighbours_path,
+    recommend_logical,
+)
+
+TTL = """
+@prefix ex: <http://ex.org/stream#> .
+@prefix prop: <http://www.wikidata.org/prop/direct/> .
+
+ex:f1 a ex:Filme ; prop:P136 ex:g1 ; prop:P57 ex:d1 .
+ex:f2 a ex:Filme ; prop:P136 ex:g1 ; prop:P57 ex:d1 .
+ex:f3 a ex:Filme ; prop:P136 ex:g2 .
+ex:f4 a ex:Filme ; prop:P136 ex:g1 ; prop:P161 ex:a1 .
+ex:f5 a ex:Filme ; prop:P57 ex:d1 ; prop:P161 ex:a1 .
+ex:f6 a ex:Filme ; prop:P136 ex:g1 .
+"""
+
+
+def test_neighbour_table_serves_the_weighted_ranking(tmp_path):
+    path = tmp_path / "graph.ttl"
+    path.write_text(TTL)
+    clear_cache()
+    g = Graph().parse(str(path), format="turtle")
+    matrix = attribute_matrix(g, PROPERTIES, EX.Filme)
+
+    table = compute_neighbours(matrix, k=3, chunk_size=2, n_jobs=1)
+    parallel = compute_neighbours(matrix, k=3, chunk_size=4, n_jobs=2)
+    assert np.array_equal(parallel.neighbours, table.neighbours)
+    table.save(neighbours_path(str(path)))
+    loaded = NeighbourTable.load(neighbours_path(str(path)))
+    assert isinstance(loaded.neighbours, np.memmap)
+
+    for movie in matrix.subjects:
+        uri = str(movie)
+        weighted = recommend_logical(uri, str(path), 3, g, method="weighted")
+        served = recommend_logical(uri, str(path), 3, method="table")
+        assert served == weighted
+        assert [str(n) for n, _ in loaded.lookup(movie, 3)] == weighted
+    # beyond the stored k the ranking is computed
+    uri = "http://ex.org/stream#f1"
+    assert len(recommend_logical(uri, str(path), 4, method="table")) == 4
+
+
+def test_table_built_later_is_picked_up(tmp_path):
+    path = tmp_path / "graph.ttl"
+    path.write_text(TTL)
+    clear_cache()
+    uri = "http://ex.org/stream#f1"
+    # no table yet: the ranking is computed and the miss is not kept
+    computed = recommend_logical(uri, str(path), 3, method="table")
+
+    g = Graph().parse(str(path), format="turtle")
+    matrix = attribute_matrix(g, PROPERTIES, EX.Filme)
+    table = compute_neighbours(matrix, k=3, n_jobs=1)
+    # a table that disagrees with the ranking shows where answers come from
+    table.neighbours[:] = table.neighbours[:, ::-1]
+    table.save(neighbours_path(str(path)))
+    served = recommend_logical(uri, str(path), 3, method="table")
+    assert served == computed[::-1]
@@ -0,0 +1,172 @@
+import networkx as nx
+import numpy as np
+import pytest
+from rdflib import URIRef
+from rdflib.namespace import RDF
+
+from pipeline.generate_recommendations import generate_recommendations
+from serendipity.centrality import compute_betweenness
+from serendipity.novelty_index import NoveltyIndex
+
+BASE = "http://ex.org/stream#"
+
+TTL = """\
+@prefix : <http://ex.org/stream#> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+
+:Filme a rdf:Class .
+:videoA a :Filme ; :tematica :acao ; :dirigidoPor :Spielberg .
+:videoB a :Filme ; :tematica :Drama ; :dirigidoPor :Spielberg .
+"""
+
+
+def _uri_path_graph():
+    return nx.path_graph([URIRef(BASE + n) for n in ("a", "b", "c")])
+
+
+def test_index_matches_metric_and_roundtrips(tmp_path):
+    g = _uri_path_graph()
+    index = NoveltyIndex.build(g, metrics=["betweenness", "clustering"])
+    expected = compute_betweenness(g)
+
+    nodes = list(g.nodes) + [URIRef(BASE + "missing")]
+    scores = index.lookup(nodes, "betweenness")
+    for node in g.nodes:
+        assert scores[node] == pytest.approx(expected[node])
+    assert scores[URIRef(BASE + "missing")] == 0.0
+
+    path = str(tmp_path / "novelty.npz")
+    index.save(path)
+    loaded = NoveltyIndex.load(path)
+    assert "clustering" in loaded
+    reloaded = loaded.lookup(g.nodes, "betweenness")
+    assert reloaded == {node: scores[node] for node in g.nodes}
+
+
+def test_pipeline_computes_novelty_once(tmp_path, monkeypatch):
+    path = tmp_path / "g.ttl"
+    path.write_text(TTL)
+    calls = {"count": 0}
+
+    def fake_betweenness(graph):
+        calls["count"] += 1
+        return {node: 0.0 for node in graph}
+
+    monkeypatch.setattr(
+        "serendipity.centrality.compute_betweenness",
+        fake_betweenness,
+    )
+    from pipeline import generate_recommendations as mod
+
+    mod.clear_cache()
+    ratings = {("user1", "videoA"): 5.0}
+    generate_recommendations("user1", ratings, str(path), top_n=1)
+    generate_recommendations("user1", ratings, str(path), top_n=1)
+    assert calls["count"] == 1
+
+    # a restart reads the table persisted next to the graph snapshot
+    mod.clear_cache()
+    generate_recommendations("user1", ratings, str(path), top_n=1)
+    assert calls["count"] == 1
+
+
+def test_local_metric_only_computed_for_candidates():
+    g = nx.karate_club_graph()
+    full = NoveltyIndex.build(g, metrics=["clustering", "avg_shortest_path"])
+
+    index = NoveltyIndex(g.nodes)
+    for metric in ("clustering", "avg_shortest_path"):
+        assert index.ensure(g, metric, nodes=[0, 5])
+        assert index.covers(metric, nodes=[5, 0])
+        assert not index.covers(metric, nodes=[1])
+        assert metric not in index
+        assert not index.ensure(g, metric, nodes=[5])
+        expected = full.lookup([0, 5], metric)
+        assert index.lookup([0, 5], metric) == pytest.approx(expected)
+
+
+def _random_rdf(seed=1, n=120, m=400):
+    import random
+
+    from rdflib import Graph
+
+    rng = random.Random(seed)
+    predicates = [URIRef(BASE + p) for p in ("assiste", "genero", "ator")]
+    rdf = Graph()
+    for _ in range(m):
+        s, o = rng.sample(range(n), 2)
+        p = rng.choice(predicates)
+        rdf.add((URIRef(f"{BASE}n{s}"), p, URIRef(f"{BASE}n{o}")))
+    return rdf
+
+
+def _baseline_graph(rdf):
+    # the conversion the pipeline used before the shared projection
+    graph = nx.Graph()
+    for s, p, o in rdf.triples((None, None, None)):
+        if p == RDF.type or not isinstance(o, URIRef):
+            continue
+        graph.add_node(s)
+        graph.add_node(o)
+        graph.add_edge(s, o)
+    return graph
+
+
+def test_hhi_matches_the_baseline_projection():
+    from networkx.algorithms import community
+
+    from pipeline import generate_recommendations as mod
+    from serendipity.metrics import compute_hhi
+
+    rdf = _random_rdf()
+    baseline = _baseline_graph(rdf)
+    louvain = community.louvain_communities(baseline, seed=42)
+    communities = {n: cid for cid, comm in enumerate(louvain) for n in comm}
+    candidates = list(baseline.nodes)[::7]
+    expected = compute_hhi(baseline, communities, nodes=candidates)
+
+    mod.clear_cache()
+    scores = mod._novelty_scores(rdf, candidates, "hhi")
+    assert scores == pytest.approx(expected)
+
+
+def test_local_scores_are_saved_once_the_column_is_complete(tmp_path):
+    from pipeline import generate_recommendations as mod
+
+    rdf = _random_rdf(n=30, m=60)
+    nodes = list(mod._build_graph(rdf).nodes)
+    path = tmp_path / "novelty.npz"
+    mod.clear_cache()
+    for start in range(0, len(nodes) - 5, 5):
+        chunk = nodes[start : start + 5]  # noqa: E203
+        mod._novelty_scores(rdf, chunk, "clustering", index_path=str(path))
+        assert not path.exists()
+
+    mod._novelty_scores(rdf, nodes, "clustering", index_path=str(path))
+    assert "clustering" in NoveltyIndex.load(str(path))
+    written = path.stat().st_mtime_ns
+    mod._novelty_scores(rdf, nodes[:3], "clustering", index_path=str(path))
+    assert path.stat().st_mtime_ns == written
+
+
+def test_node_table_roundtrips_and_bad_files_are_skipped(tmp_path, caplog):
+    from rdflib import BNode
+
+    from pipeline import generate_recommendations as mod
+
+    nodes = [URIRef(BASE + "São_Paulo"), BNode("b1"), URIRef(BASE + "x")]
+    index = NoveltyIndex(nodes, {"pagerank": np.array([0.5, 0.25, 0.25])})
+    path = tmp_path / "novelty.npz"
+    index.save(str(path))
+    loaded = NoveltyIndex.load(str(path))
+    assert loaded.nodes == nodes
+    assert isinstance(loaded.nodes[1], BNode)
+
+    path.write_bytes(b"not a table")
+    rdf = _random_rdf(n=10, m=15)
+    mod.clear_cache()
+    with caplog.at_level("WARNING"):
+        mod._novelty_scores(
+            rdf, [URIRef(BASE + "n1")], "pagerank", index_path=str(path)
+        )
+    assert "novelty table" in caplog.text
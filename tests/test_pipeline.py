@@ -1,4 +1,7 @@
-from pipeline.generate_recommendations import generate_recommendations
+from pipeline.generate_recommendations import (
+    generate_recommendations,
+    generate_recommendations_batch,
+)
 
 BASE = "http://ex.org/stream#"
 TTL = """\
@@ -50,3 +53,61 @@ def test_generate_recommendations_basic(tmp_path, monkeypatch):
 
     assert recs[0] == "videoB"
     assert recs[1] == "videoA"
+
+
+def test_personalized_novelty_depends_on_rated_items(tmp_path):
+    path = tmp_path / "ont.ttl"
+    path.write_text(TTL)
+    ratings = {("user1", "videoA"): 5.0, ("user2", "videoB"): 5.0}
+
+    recs = {
+        user: generate_recommendations(
+            user,
+            ratings,
+            str(path),
+            top_n=2,
+            alpha=1.0,
+            beta=0.0,
+            novelty_metric="personalized_pagerank",
+        )
+        for user in ("user1", "user2")
+    }
+
+    # the film a user already rated is the least novel for that user
+    assert recs["user1"] == ["videoB", "videoA"]
+    assert recs["user2"] == ["videoA", "videoB"]
+
+
+def test_candidate_k_bounds_the_collaborative_fallback(tmp_path):
+    path = tmp_path / "ont.ttl"
+    path.write_text(TTL)
+    # user2 has no preferences, so content filtering finds nothing
+    ratings = {("user1", "videoA"): 5.0, ("user1", "videoB"): 1.0}
+
+    recs = generate_recommendations(
+        "user2",
+        ratings,
+        str(path),
+        top_n=5,
+        candidate_k=1,
+    )
+
+    assert recs == ["videoA"]
+
+
+def test_batch_matches_single_user_calls(tmp_path):
+    path = tmp_path / "ont.ttl"
+    path.write_text(TTL)
+    ratings = {("user1", "videoA"): 5.0, ("user2", "videoB"): 4.0}
+    users = ["user1", "user2", "user3"]
+
+    for metric in ("clustering", "personalized_pagerank"):
+        kwargs = dict(top_n=2, novelty_metric=metric)
+        batch = generate_recommendations_batch(
+            users, ratings, str(path), n_jobs=2, chunk_size=2, **kwargs
+        )
+        single = {
+            user: generate_recommendations(user, ratings, str(path), **kwargs)
+            for user in users
+        }
+        assert dict(batch) == single
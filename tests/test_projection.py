@@ -0,0 +1,67 @@
+from rdflib import Graph, URIRef
+
+from ontology.versioning import mark_changed
+from pipeline.generate_recommendations import _build_graph
+from serendipity.compact import CompactGraph
+from serendipity.graph_builder import PREDICATES, build_graph
+from serendipity.projection import Projection, projection
+
+EX = "http://ex.org/stream#"
+TTL = """\
+@prefix : <http://ex.org/stream#> .
+:u1 :assiste :v1 , :v2 ; :avaliou :v1 .
+:v1 :pertenceAGenero :g1 ; :temAtor :a1 .
+:v2 :pertenceAGenero :g1 ; :titulo "Dois" .
+"""
+
+
+def _edges(graph):
+    return {frozenset(e) for e in graph.edges()}
+
+
+def test_projection_follows_reported_changes():
+    rdf = Graph()
+    rdf.parse(data=TTL, format="turtle")
+    shared = projection(rdf)
+    assert projection(rdf) is shared
+    assert list(shared.compact().nodes) == CompactGraph.from_rdflib(rdf).nodes
+    # the pipeline and graph_builder read views of the same projection
+    assert _build_graph(rdf) is shared.networkx()
+    built = build_graph(rdf)
+    assert _edges(built) == _edges(shared.networkx(PREDICATES))
+
+    ex = {name: URIRef(EX + name) for name in ("u1", "v1", "g2")}
+    added = {(ex["v1"], URIRef(EX + "pertenceAGenero"), ex["g2"])}
+    # u1 -- v1 is also supported by ``:avaliou``
+    removed = {(ex["u1"], URIRef(EX + "assiste"), ex["v1"])}
+    for triple in added:
+        rdf.add(triple)
+    for triple in removed:
+        rdf.remove(triple)
+    mark_changed(rdf, added, removed)
+
+    updated = projection(rdf)
+    assert updated is shared
+    fresh = Projection(rdf.triples((None, None, None)))
+    assert _edges(updated.networkx()) == _edges(fresh.networkx())
+    assert _edges(build_graph(rdf)) == _edges(fresh.networkx(PREDICATES))
+    compact = updated.compact()
+    assert _edges(compact.to_networkx()) == _edges(fresh.networkx())
+    assert ex["g2"] in compact
+    assert updated.networkx().has_edge(ex["u1"], ex["v1"])
+    assert not build_graph(rdf).has_edge(ex["u1"], ex["v1"])
+
+
+def test_projection_notices_unreported_additions():
+    rdf = Graph()
+    rdf.parse(data=TTL, format="turtle")
+    shared = projection(rdf)
+    built = build_graph(rdf)
+    # the caller owns the graph it was given
+    built.add_edge("x", "y")
+    assert not build_graph(rdf).has_edge("x", "y")
+
+    g2 = URIRef(EX + "g2")
+    rdf.add((URIRef(EX + "v2"), URIRef(EX + "pertenceAGenero"), g2))
+    assert projection(rdf) is not shared
+    assert g2 in build_graph(rdf)
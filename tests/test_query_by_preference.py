@@ -43,3 +43,31 @@ def test_query_by_preference_extended(tmp_path):
     results = query_by_preference(g, BASE + "user1")
     assert set(results) == {"filmeA", "filmeB", "filmeC"}
     # (filmeA: tema+ator, filmeB: ator+diretor, filmeC: diretor)
+    assert results == ["filmeA", "filmeB", "filmeC"]
+    sparql = query_by_preference(g, BASE + "user1", method="sparql")
+    assert set(sparql) == set(results)
+
+
+def test_query_by_preference_binds_the_user_uri():
+    g = Graph().parse(data=TTL, format="turtle")
+
+    # the URI is bound as a term, never spliced into the query text
+    injected = BASE + "nobody> . ?user ?p ?o . <" + BASE + "x"
+    assert query_by_preference(g, injected) == []
+    assert set(query_by_preference(g, BASE + "user1")) == {
+        "filmeA",
+        "filmeB",
+        "filmeC",
+    }
+
+
+def test_query_by_preference_sees_unreported_additions():
+    g = Graph().parse(data=TTL, format="turtle")
+    assert "filmeE" not in query_by_preference(g, BASE + "user1")
+
+    # added without ontology.versioning.mark_changed
+    g.parse(
+        data=f"<{BASE}filmeE> <{BASE}tematica> <{BASE}Acao> .",
+        format="turtle",
+    )
+    assert "filmeE" in query_by_preference(g, BASE + "user1")
@@ -0,0 +1,36 @@
+from metadata.search import SearchIndex
+
+TITLES = [
+    "O Poderoso Chefão Q47703",
+    "Cidade de Deus Q220735",
+    "Central do Brasil Q1124339",
+    "Chef Q15732796",
+]
+
+
+def test_search_ignores_case_and_accents():
+    index = SearchIndex(TITLES)
+    assert index.search("CHEFAO") == [0]
+    assert index.search("chef") == [0, 3]
+    assert index.search("de deus") == [1]
+    assert index.search("q22") == [1]
+    assert index.search("xyz") == []
+    assert index.search("") == [0, 1, 2, 3]
+
+
+def test_short_queries_match_word_prefixes():
+    index = SearchIndex(TITLES)
+    assert index.search("c") == [0, 1, 2, 3]
+    assert index.search("de") == [1]
+    assert index.search("do") == [2]
+    assert index.search("eu") == []
+
+
+def test_update_replaces_a_document_text():
+    index = SearchIndex(["Q1", "Q2"])
+    assert index.search("matrix") == []
+    index.update({1: "The Matrix Q2", 0: "Q1"})
+    assert index.search("matrix") == [1]
+    assert index.search("ma") == [1]
+    index.update({1: "Q2"})
+    assert index.search("matrix") == index.search("ma") == []
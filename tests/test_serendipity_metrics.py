@@ -28,3 +28,55 @@ def test_hhi(simple_graph):
     hhi = compute_hhi(simple_graph, communities)
     assert pytest.approx(hhi[1], rel=1e-6) == 0.5
     assert pytest.approx(hhi[0], rel=1e-6) == 1.0
+
+
+def test_pagerank_solver_matches_networkx_and_warm_starts():
+    from serendipity.compact import CompactGraph
+    from serendipity.metrics import PageRank
+
+    g = nx.barabasi_albert_graph(200, 2, seed=1)
+    solver = PageRank(CompactGraph.from_networkx(g))
+    seeds = {0: 1.0, 7: 1.0}
+
+    expected = nx.pagerank(g, personalization=seeds, tol=1e-10)
+    scores = solver.personalized([0, 7], tol=1e-10)
+    assert scores == pytest.approx(expected, abs=1e-8)
+    expected = nx.pagerank(g, tol=1e-10)
+    scores = solver.solve(tol=1e-10)
+    assert scores == pytest.approx(expected, abs=1e-8)
+    assert solver.solve(tol=1e-10) == pytest.approx(scores)
+    assert solver.last_stats["iterations"] <= 2
+
+    g.add_edge(3, 150)
+    g.add_edge(199, "novo")
+    cold = PageRank(CompactGraph.from_networkx(g))
+    cold.solve(tol=1e-10)
+    solver.update_graph(CompactGraph.from_networkx(g))
+    warm = solver.solve(tol=1e-10)
+    assert solver.last_stats["warm_start"]
+    assert solver.last_stats["iterations"] < cold.last_stats["iterations"]
+    expected = nx.pagerank(g, tol=1e-10)
+    assert warm == pytest.approx(expected, abs=1e-8)
+
+
+def test_personalized_pagerank_novelty_batches_users():
+    from serendipity.compact import CompactGraph
+    from serendipity.metrics import compute_personalized_pagerank_novelty
+
+    g = nx.barabasi_albert_graph(100, 2, seed=3)
+    seeds = {"u1": [0, 5], "u2": [5, 42, 77], "u3": ["fora"]}
+    novelty = compute_personalized_pagerank_novelty(
+        CompactGraph.from_networkx(g),
+        seeds,
+        nodes=[0, 5, 60, "fora"],
+        batch_size=2,
+        tol=1e-12,
+        max_iter=500,
+    )
+
+    for user, items in seeds.items():
+        teleport = {i: 1.0 for i in items if i in g} or None
+        ppr = nx.pagerank(g, personalization=teleport, tol=1e-12, max_iter=500)
+        expected = {n: 1 / (1 + len(g) * ppr[n]) for n in (0, 5, 60)}
+        assert novelty[user] == pytest.approx(expected, abs=1e-8)
+    assert novelty["u1"][0] < novelty["u2"][0]
@@ -0,0 +1,65 @@
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, XSD
+
+from ontology.build_ontology import build_ontology_graph
+from ontology.snapshot import load_snapshot, save_snapshot
+
+TTL = """\
+@prefix : <http://ex.org/stream#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+:Filme        a rdfs:Class .
+:Documentario a rdfs:Class ; rdfs:subClassOf :Filme .
+:doc1         a :Documentario .
+"""
+
+DOC1 = URIRef("http://ex.org/stream#doc1")
+FILME = URIRef("http://ex.org/stream#Filme")
+
+
+def test_snapshot_roundtrip(tmp_path):
+    g = Graph()
+    g.add((DOC1, RDF.type, FILME))
+    g.add((DOC1, URIRef("http://ex.org/stream#ano"), Literal(1999)))
+    g.add((DOC1, URIRef("http://ex.org/stream#nome"), Literal("Doc", "pt")))
+    path = str(tmp_path / "g.npz")
+
+    save_snapshot(path, g, asserted=[(DOC1, RDF.type, FILME)])
+    loaded, asserted = load_snapshot(path)
+
+    assert set(loaded) == set(g)
+    assert asserted == {(DOC1, RDF.type, FILME)}
+    year = next(loaded.objects(DOC1, URIRef("http://ex.org/stream#ano")))
+    assert year.datatype == XSD.integer
+
+
+def test_build_ontology_graph_uses_snapshot(tmp_path, monkeypatch):
+    ttl = tmp_path / "g.ttl"
+    ttl.write_text(TTL, encoding="utf-8")
+    cache = tmp_path / "cache"
+
+    first = build_ontology_graph(str(ttl), cache_dir=str(cache))
+    assert len(list(cache.iterdir())) == 1
+
+    def fail_expand(self, graph):
+        raise AssertionError("reasoner should not run")
+
+    monkeypatch.setattr("owlrl.DeductiveClosure.expand", fail_expand)
+    second = build_ontology_graph(str(ttl), cache_dir=str(cache))
+
+    assert set(second) == set(first)
+    assert (DOC1, RDF.type, FILME) in second
+
+
+def test_snapshot_invalidated_when_source_changes(tmp_path):
+    ttl = tmp_path / "g.ttl"
+    ttl.write_text(TTL, encoding="utf-8")
+    cache = tmp_path / "cache"
+    build_ontology_graph(str(ttl), cache_dir=str(cache))
+
+    ttl.write_text(TTL + ":doc2 a :Documentario .\n", encoding="utf-8")
+    g = build_ontology_graph(str(ttl), cache_dir=str(cache))
+
+    doc2 = URIRef("http://ex.org/stream#doc2")
+    assert (doc2, RDF.type, FILME) in g
+    assert len(list(cache.iterdir())) == 1
@@ -19,3 +19,56 @@ def test_surprise_rs_basic():
     global_mean = sum(ratings.values()) / len(ratings)
     assert pytest.approx(preds["i3"], rel=1e-2) == global_mean
     assert set(preds.keys()) == {"i1", "i2", "i3"}
+
+
+def test_surprise_rs_incremental_matches_refit():
+    ratings = {("u1", "i1"): 4.0, ("u2", "i1"): 3.0}
+    rs = SurpriseRS()
+    rs.fit({})
+    assert rs.predict("u1", ["i1"]) == {"i1": 0.0}
+
+    rs.partial_fit(ratings)
+    for i in range(20):
+        rs.add_rating("u3", f"novo{i}", float(i % 5))
+    rs.add_rating("u1", "i1", 1.0)  # replaces the previous rating
+
+    expected = dict(ratings)
+    expected.update({("u3", f"novo{i}"): float(i % 5) for i in range(20)})
+    expected[("u1", "i1")] = 1.0
+    refit = SurpriseRS()
+    refit.fit(expected)
+
+    items = ["i1", "novo3", "novo19", "ausente"]
+    assert rs.predict("u1", items) == pytest.approx(refit.predict("u1", items))
+    assert rs.global_mean == pytest.approx(refit.global_mean)
+    assert rs.predict("u1", ["i1"])["i1"] == pytest.approx(2.0)
+
+
+def test_surprise_rs_svd_predict_batch():
+    # two taste groups: even users like even items, odd users odd items
+    ratings = {
+        (f"u{u}", f"i{i}"): 5.0 if (u + i) % 2 == 0 else 1.0
+        for u in range(20)
+        for i in range(10)
+        if (u * 7 + i) % 3
+    }
+    rs = SurpriseRS("svd", n_factors=4, n_epochs=60, lr=0.02, seed=0)
+    rs.fit(ratings)
+
+    users, items = ["u0", "u1", "novo"], ["i0", "i1", "ausente"]
+    scores = rs.predict_batch(users, items)
+    assert scores.shape == (3, 3)
+    expected = dict(zip(items, scores[0]))
+    assert rs.predict("u0", items) == pytest.approx(expected)
+    # pairs left out of ``ratings`` follow the groups
+    assert ("u0", "i6") not in ratings and ("u0", "i3") not in ratings
+    assert rs.predict("u0", ["i6"])["i6"] > 3.0
+    assert rs.predict("u0", ["i3"])["i3"] < 3.0
+    # unknown user and item only use what is known
+    assert scores[2, 2] == pytest.approx(rs.global_mean)
+
+    rs.add_rating("novo", "ausente", 5.0)
+    assert rs.predict_batch(["novo"], ["ausente"]).shape == (1, 1)
+
+    with pytest.raises(ValueError):
+        SurpriseRS("knn")
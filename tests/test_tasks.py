@@ -0,0 +1,47 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from interface.tasks import ResultCache
+
+
+def test_requests_share_one_computation():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        started.set()
+        release.wait(5)
+        return x * 2
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        cache = ResultCache(pool)
+        first = cache.submit("a", slow, 1)
+        started.wait(5)
+        assert cache.submit("a", slow, 1) is first
+        release.set()
+        assert first.result(5) == 2
+        assert cache.submit("a", slow, 1) is first
+    assert calls == [1]
+
+
+def test_failures_are_retried_and_old_results_evicted():
+    attempts = []
+
+    def flaky(x):
+        attempts.append(x)
+        if len(attempts) == 1:
+            raise RuntimeError("down")
+        return x
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        cache = ResultCache(pool, max_items=2)
+        failed = cache.submit("a", flaky, 1)
+        assert isinstance(failed.exception(5), RuntimeError)
+        assert "a" not in cache
+        assert cache.submit("a", flaky, 1).result(5) == 1
+
+        cache.submit("b", flaky, 2).result(5)
+        cache.submit("c", flaky, 3).result(5)
+        assert "a" not in cache and len(cache) == 2